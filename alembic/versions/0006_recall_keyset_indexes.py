@@ -0,0 +1,28 @@
+"""add keyset pagination indexes on recalls"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_recalls_keyset',
+        'recalls',
+        [sa.text("coalesce(recall_date, '')"), 'id', 'source'],
+    )
+    op.create_index(
+        'ix_recalls_source_keyset',
+        'recalls',
+        ['source', sa.text("coalesce(recall_date, '')"), 'id'],
+    )
+    op.create_index('ix_recalls_fetched_at', 'recalls', ['fetched_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recalls_fetched_at', table_name='recalls')
+    op.drop_index('ix_recalls_source_keyset', table_name='recalls')
+    op.drop_index('ix_recalls_keyset', table_name='recalls')
@@ -0,0 +1,30 @@
+"""store partner api keys as sha256 digests"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('api_keys', sa.Column('key_hash', sa.String(), nullable=True))
+    conn = op.get_bind()
+    rows = conn.execute(sa.text('SELECT id, key FROM api_keys WHERE key IS NOT NULL')).fetchall()
+    for key_id, key in rows:
+        conn.execute(
+            sa.text('UPDATE api_keys SET key_hash=:h, key=NULL WHERE id=:i'),
+            {'h': hashlib.sha256(key.encode()).hexdigest(), 'i': key_id},
+        )
+    op.create_unique_constraint('uq_api_keys_key_hash', 'api_keys', ['key_hash'])
+    op.alter_column('api_keys', 'key', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    # plaintext keys cannot be recovered from their digests, so ``key`` stays
+    # nullable and hashed-only keys have to be reissued after a downgrade
+    op.drop_constraint('uq_api_keys_key_hash', 'api_keys', type_='unique')
+    op.drop_column('api_keys', 'key_hash')
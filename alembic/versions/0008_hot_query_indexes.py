@@ -0,0 +1,34 @@
+"""add secondary indexes for hot query predicates
+
+push_tokens(user_id) is already served by the UNIQUE(user_id, token)
+constraint, so no separate index is created for it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_subscriptions_recall_source', 'subscriptions', ['recall_source']),
+    ('ix_products_lower_name', 'products', [sa.text('lower(name)')]),
+    ('ix_alerts_user_sent_at', 'alerts', ['user_id', 'sent_at']),
+    ('ix_email_unsub_tokens_user_id', 'email_unsub_tokens', ['user_id']),
+    ('ix_user_items_user_id', 'user_items', ['user_id']),
+    ('ix_sent_notifications_recall_id', 'sent_notifications', ['recall_id']),
+    ('ix_recalls_recall_date', 'recalls', ['recall_date']),
+    ('ix_recalls_source_recall_date', 'recalls', ['source', 'recall_date']),
+    ('ix_webhooks_source', 'webhooks', ['source']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,120 @@
+"""partition alerts by month and track sent_notifications age
+
+On Postgres ``alerts`` becomes a table range partitioned on ``created_at``
+with one partition per month of existing history, the current and next
+three months, and a default partition. Other dialects only gain the new
+columns.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+ALERT_COLUMNS = 'id, user_id, recall_id, channel, sent_at, read_at, error, created_at'
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.add_column(
+        'sent_notifications',
+        sa.Column('sent_at', sa.String(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+    op.create_index('ix_sent_notifications_sent_at', 'sent_notifications', ['sent_at'])
+    op.add_column(
+        'alerts',
+        sa.Column('created_at', sa.String(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+    # best available age for existing rows
+    op.execute('UPDATE alerts SET created_at = sent_at WHERE sent_at IS NOT NULL')
+    op.create_table(
+        'alerts_archive',
+        sa.Column('id', sa.Integer, nullable=False),
+        sa.Column('user_id', sa.Integer, nullable=False),
+        sa.Column('recall_id', sa.String(), nullable=False),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('sent_at', sa.String()),
+        sa.Column('read_at', sa.String()),
+        sa.Column('error', sa.Text()),
+        sa.Column('created_at', sa.String(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_alerts_created_at', 'alerts', ['created_at'])
+        return
+
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text('SELECT min(created_at) FROM alerts')).scalar()
+    op.execute('ALTER TABLE alerts RENAME TO alerts_unpartitioned')
+    op.execute('ALTER INDEX ix_alerts_user_sent_at RENAME TO ix_alerts_unpartitioned_user_sent_at')
+    op.execute(
+        """
+        CREATE TABLE alerts (
+            id integer NOT NULL DEFAULT nextval('alerts_id_seq'),
+            user_id integer NOT NULL REFERENCES users(id),
+            recall_id varchar NOT NULL,
+            channel varchar NOT NULL,
+            sent_at varchar,
+            read_at varchar,
+            error text,
+            created_at varchar NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute('ALTER SEQUENCE alerts_id_seq OWNED BY alerts.id')
+    op.execute('CREATE INDEX ix_alerts_user_sent_at ON alerts (user_id, sent_at)')
+    op.execute('CREATE INDEX ix_alerts_created_at ON alerts (created_at)')
+
+    this_month = _add_months(date.today(), 0)
+    month = _add_months(date.fromisoformat(oldest[:10]), 0) if oldest else this_month
+    while month <= _add_months(this_month, 3):
+        op.execute(
+            f"CREATE TABLE alerts_p{month:%Y%m} PARTITION OF alerts "
+            f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+        )
+        month = _add_months(month, 1)
+    op.execute('CREATE TABLE alerts_default PARTITION OF alerts DEFAULT')
+
+    op.execute(f'INSERT INTO alerts ({ALERT_COLUMNS}) SELECT {ALERT_COLUMNS} FROM alerts_unpartitioned')
+    op.execute('DROP TABLE alerts_unpartitioned')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE alerts RENAME TO alerts_partitioned')
+        op.execute('ALTER INDEX ix_alerts_user_sent_at RENAME TO ix_alerts_partitioned_user_sent_at')
+        op.execute('ALTER INDEX ix_alerts_created_at RENAME TO ix_alerts_partitioned_created_at')
+        op.execute(
+            """
+            CREATE TABLE alerts (
+                id integer PRIMARY KEY DEFAULT nextval('alerts_id_seq'),
+                user_id integer NOT NULL REFERENCES users(id),
+                recall_id varchar NOT NULL,
+                channel varchar NOT NULL,
+                sent_at varchar,
+                read_at varchar,
+                error text,
+                created_at varchar NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        op.execute('ALTER SEQUENCE alerts_id_seq OWNED BY alerts.id')
+        op.execute('CREATE INDEX ix_alerts_user_sent_at ON alerts (user_id, sent_at)')
+        op.execute(f'INSERT INTO alerts ({ALERT_COLUMNS}) SELECT {ALERT_COLUMNS} FROM alerts_partitioned')
+        op.execute('DROP TABLE alerts_partitioned')
+    else:
+        op.drop_index('ix_alerts_created_at', table_name='alerts')
+    # archived rows are not restored into alerts
+    op.drop_table('alerts_archive')
+    op.drop_column('alerts', 'created_at')
+    op.drop_index('ix_sent_notifications_sent_at', table_name='sent_notifications')
+    op.drop_column('sent_notifications', 'sent_at')
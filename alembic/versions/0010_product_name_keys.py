@@ -0,0 +1,48 @@
+"""add normalised product name keys for recall matching"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.utils.names import product_key
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _backfill(conn, select_sql: str, update_sql: str, name_col: str) -> None:
+    rows = [dict(r._mapping) for r in conn.execute(sa.text(select_sql))]
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        for row in batch:
+            row['key'] = product_key(row[name_col])
+        conn.execute(sa.text(update_sql), batch)
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('name_key', sa.String(), nullable=True))
+    op.add_column('recalls', sa.Column('product_key', sa.String(), nullable=True))
+    conn = op.get_bind()
+    _backfill(
+        conn,
+        'SELECT id, name FROM products',
+        'UPDATE products SET name_key=:key WHERE id=:id',
+        'name',
+    )
+    _backfill(
+        conn,
+        'SELECT id, source, product FROM recalls',
+        'UPDATE recalls SET product_key=:key WHERE id=:id AND source=:source',
+        'product',
+    )
+    op.create_index('ix_products_name_key', 'products', ['name_key', 'user_id'])
+    op.create_index('ix_recalls_product_key', 'recalls', ['product_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recalls_product_key', table_name='recalls')
+    op.drop_index('ix_products_name_key', table_name='products')
+    op.drop_column('recalls', 'product_key')
+    op.drop_column('products', 'name_key')
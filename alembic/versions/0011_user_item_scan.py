@@ -0,0 +1,22 @@
+"""add task watermarks and index user_items by upc"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_watermarks',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('value', sa.String(), nullable=False),
+    )
+    op.create_index('ix_user_items_upc', 'user_items', ['upc'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_items_upc', table_name='user_items')
+    op.drop_table('task_watermarks')
@@ -0,0 +1,22 @@
+"""schedule remedy page checks and keep HTTP validators"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('recalls', sa.Column('next_remedy_check_at', sa.String(), nullable=True))
+    op.add_column('recalls', sa.Column('remedy_etag', sa.String(), nullable=True))
+    op.add_column('recalls', sa.Column('remedy_last_modified', sa.String(), nullable=True))
+    op.create_index('ix_recalls_next_remedy_check_at', 'recalls', ['next_remedy_check_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recalls_next_remedy_check_at', table_name='recalls')
+    op.drop_column('recalls', 'remedy_last_modified')
+    op.drop_column('recalls', 'remedy_etag')
+    op.drop_column('recalls', 'next_remedy_check_at')
@@ -0,0 +1,23 @@
+"""add digest delivery preference and alert priority"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('digest_frequency', sa.String(), nullable=False, server_default='immediate'),
+    )
+    op.add_column('alerts', sa.Column('priority', sa.String(), nullable=True))
+    op.create_index('ix_alerts_priority_sent_at', 'alerts', ['priority', 'sent_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_alerts_priority_sent_at', table_name='alerts')
+    op.drop_column('alerts', 'priority')
+    op.drop_column('users', 'digest_frequency')
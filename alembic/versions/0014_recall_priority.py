@@ -0,0 +1,48 @@
+"""store recall priority classification"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# frozen copy of backend.utils.priority's default keywords, so later changes
+# to the live rules don't alter what this revision backfills
+URGENT_HAZARD = re.compile('fire|burn|choking|death', re.IGNORECASE)
+
+
+def _priority(hazard):
+    # recalls don't store the FDA classification, so Class I recalls without
+    # a keyword are backfilled as digest and corrected by the next refresh
+    return 'urgent' if hazard and URGENT_HAZARD.search(hazard) else 'digest'
+
+
+def upgrade() -> None:
+    op.add_column('recalls', sa.Column('priority', sa.String(), nullable=True))
+    conn = op.get_bind()
+    last = None
+    while True:
+        sql = 'SELECT id, source, hazard FROM recalls'
+        params = {'limit': BATCH_SIZE}
+        if last:
+            sql += ' WHERE (source > :source) OR (source = :source AND id > :id)'
+            params.update(source=last[0], id=last[1])
+        rows = conn.execute(sa.text(sql + ' ORDER BY source, id LIMIT :limit'), params).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text('UPDATE recalls SET priority=:priority WHERE id=:id AND source=:source'),
+            [{'id': r.id, 'source': r.source, 'priority': _priority(r.hazard)} for r in rows],
+        )
+        last = (rows[-1].source, rows[-1].id)
+    op.create_index('ix_recalls_priority_fetched_at', 'recalls', ['priority', 'fetched_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recalls_priority_fetched_at', table_name='recalls')
+    op.drop_column('recalls', 'priority')
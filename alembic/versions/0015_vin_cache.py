@@ -0,0 +1,30 @@
+"""cache VIN decodes and recall campaigns"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'vin_decodes',
+        sa.Column('vin_prefix', sa.String(), primary_key=True),
+        sa.Column('make', sa.String()),
+        sa.Column('model', sa.String()),
+        sa.Column('model_year', sa.String()),
+        sa.Column('decoded_at', sa.String(), nullable=False),
+    )
+    op.create_table(
+        'vin_campaigns',
+        sa.Column('vin', sa.String(), primary_key=True),
+        sa.Column('recalls', sa.Text(), nullable=False),
+        sa.Column('fetched_at', sa.String(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('vin_campaigns')
+    op.drop_table('vin_decodes')
@@ -0,0 +1,25 @@
+"""store the recall source on alerts"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('alerts', sa.Column('recall_source', sa.String(), nullable=True))
+    op.add_column('alerts_archive', sa.Column('recall_source', sa.String(), nullable=True))
+    # existing alerts only know the recall id; where an id is shared by
+    # several sources one of them is picked
+    op.execute(
+        'UPDATE alerts SET recall_source = '
+        '(SELECT min(r.source) FROM recalls r WHERE r.id = alerts.recall_id) '
+        'WHERE recall_source IS NULL'
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('alerts_archive', 'recall_source')
+    op.drop_column('alerts', 'recall_source')
@@ -14,14 +14,16 @@ from .billing import bp as billing_bp
 from backend.utils.logging import configure_logging
 from .recalls import fetch_all
 from backend.utils.refresh import refresh_recalls
-from backend.utils.nhtsa_vin import get_recalls_for_vin
+from backend.utils.nhtsa_vin import VIN_BULK_MAX, get_recalls_for_vin, get_recalls_for_vins
 from .alerts import check_user_items, generate_summary
 from backend.db import init_db
 from backend.utils import db as db_utils
 from backend.utils.auth import (
+    PasswordHasherBusy,
+    PasswordHashTimeout,
     create_access_token,
     hash_password,
-    verify_password,
+    verify_and_update,
     jwt_required,
     track_quota,
 )
@@ -29,6 +31,7 @@ from backend.db.models import invites
 from backend.utils.email_utils import send_email, parse_language
 from urllib.parse import quote
 import os
+import requests
 
 # simple in-memory store for user items
 USER_ITEMS: list[str] = []
@@ -40,6 +43,16 @@ def create_app() -> Flask:
     configure_logging()
     init_db()
 
+    def _busy() -> tuple:
+        resp = jsonify({"error": "busy, retry shortly"})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
+
+    def _upstream_unavailable() -> tuple:
+        resp = jsonify({"error": "upstream unavailable, retry later"})
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+
     @app.post("/api/auth/signup")
     def signup() -> tuple:
         data = request.get_json(force=True)
@@ -47,6 +60,10 @@ def create_app() -> Flask:
         password = data.get("password")
         if not email or not password:
             return jsonify({"error": "invalid"}), 400
+        try:
+            password_hash = hash_password(password)
+        except (PasswordHasherBusy, PasswordHashTimeout):
+            return _busy()
         conn = db_utils.connect()
         try:
             cur = conn.execute(
@@ -55,7 +72,7 @@ def create_app() -> Flask:
                 ),
                 {
                     "e": email,
-                    "p": hash_password(password),
+                    "p": password_hash,
                     "c": datetime.utcnow().isoformat(),
                 },
             )
@@ -79,8 +96,21 @@ def create_app() -> Flask:
         ).fetchone()
         conn.close()
         mapping = row._mapping if row is not None else None
-        if not mapping or not verify_password(password, mapping["password_hash"]):
+        if not mapping:
             return jsonify({"error": "invalid credentials"}), 401
+        try:
+            ok, new_hash = verify_and_update(password, mapping["password_hash"])
+        except (PasswordHasherBusy, PasswordHashTimeout):
+            return _busy()
+        if not ok:
+            return jsonify({"error": "invalid credentials"}), 401
+        if new_hash:
+            with db_utils.connect() as conn:
+                conn.execute(
+                    text("UPDATE users SET password_hash=:p WHERE id=:u"),
+                    {"p": new_hash, "u": mapping["id"]},
+                )
+                conn.commit()
 
         token = create_access_token({"user_id": mapping["id"]})
         return jsonify({"token": token, "user_id": mapping["id"]})
@@ -111,7 +141,7 @@ def create_app() -> Flask:
     @jwt_required
     @track_quota
     def recent_recalls() -> tuple:
-        conn = db_utils.connect()
+        conn = db_utils.connect_read()
         rows = conn.execute(
             text(
                 "SELECT id, product, hazard, recall_date, source FROM recalls ORDER BY recall_date DESC LIMIT 25"
@@ -127,7 +157,7 @@ def create_app() -> Flask:
         rows = conn.execute(
             text(
                 "SELECT r.id, r.product, r.hazard, r.recall_date, r.source "
-                "FROM recalls r JOIN products p ON lower(r.product)=lower(p.name) "
+                "FROM recalls r JOIN products p ON r.product_key=p.name_key "
                 "WHERE p.user_id=:u ORDER BY r.recall_date DESC"
             ),
             {"u": user_id},
@@ -141,14 +171,37 @@ def create_app() -> Flask:
     def vin_recalls(vin: str):
         if len(vin) != 17 or not vin.isalnum():
             return jsonify({"error": "invalid VIN"}), 400
-        recalls = get_recalls_for_vin(vin)
+        try:
+            recalls = get_recalls_for_vin(vin)
+        except requests.RequestException:
+            return _upstream_unavailable()
         return jsonify(recalls)
 
+    @app.post("/api/recalls/vin/bulk")
+    @jwt_required
+    def vin_recalls_bulk():
+        # capped at what VIN_FETCH_WORKERS can fetch within VIN_BULK_DEADLINE_SECONDS;
+        # larger fleets should be split across requests
+        vins = (request.get_json(force=True) or {}).get("vins")
+        if not isinstance(vins, list) or not vins or len(vins) > VIN_BULK_MAX:
+            return jsonify({"error": f"vins must be a list of 1 to {VIN_BULK_MAX} VINs"}), 400
+        invalid = [v for v in vins if not isinstance(v, str) or len(v) != 17 or not v.isalnum()]
+        if invalid:
+            return jsonify({"error": "invalid VIN", "vins": invalid[:20]}), 400
+        # upstream failures and the overall deadline are reported per VIN
+        results = get_recalls_for_vins(vins)
+        return jsonify(
+            {
+                "recalls": {vin: r for vin, r in results.items() if r is not None},
+                "failed": [vin for vin, r in results.items() if r is None],
+            }
+        )
+
     @app.get("/api/check/<upc>")
     def check_upc(upc: str):
         if not upc.isdigit():
             return jsonify({"error": "invalid upc"}), 400
-        conn = db_utils.connect()
+        conn = db_utils.connect_read()
         info = conn.execute(text("PRAGMA table_info(recalls)")).fetchall()
         cols = {r[1] for r in info}
         query = "SELECT id, product, hazard"
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from backend.utils.auth import jwt_required, get_jwt_subject
 from backend.utils.session import SessionLocal
 from backend.db.models import stripe_customers
+from backend.utils.entitlements import invalidate_entitlement
 import os
 import stripe
 
@@ -79,6 +80,7 @@ def webhook():
                     values["quota"] = 100
                 db.execute(stripe_customers.insert().values(**values))
             db.commit()
+        invalidate_entitlement(uid)
     elif typ == "customer.subscription.deleted":
         with SessionLocal() as db:
             db.execute(
@@ -87,4 +89,5 @@ def webhook():
                 .values(plan="free", quota=100)
             )
             db.commit()
+        invalidate_entitlement(uid)
     return "", 200
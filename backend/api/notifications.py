@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 from datetime import datetime
 from flask import Blueprint, Response, stream_with_context, jsonify, request
-from sqlalchemy import text
+from sqlalchemy import select, text
 from queue import Queue
 
 from backend.utils.session import SessionLocal
@@ -27,7 +27,9 @@ def alerts_ws():
 @bp.route('/api/alerts')
 def list_alerts():
     with SessionLocal() as db:
-        rows = db.execute(alerts.select().limit(50)).fetchall()
+        rows = db.execute(
+            alerts.select().order_by(alerts.c.created_at.desc()).limit(50)
+        ).fetchall()
         return jsonify([dict(r._mapping) for r in rows])
 
 @bp.post('/api/alerts/<int:alert_id>/read')
@@ -91,6 +93,37 @@ def email_opt_in():
     return jsonify({'status': 'ok'})
 
 
+@bp.post('/api/digest-preference')
+@jwt_required
+def digest_preference():
+    user_id = get_jwt_subject()['user_id']
+    data = request.get_json(force=True)
+    frequency = data.get('frequency')
+    if frequency not in ('immediate', 'hourly', 'daily'):
+        return jsonify({'error': 'frequency must be immediate, hourly or daily'}), 400
+    with SessionLocal() as db:
+        db.execute(
+            text('UPDATE users SET digest_frequency=:f WHERE id=:u'),
+            {'f': frequency, 'u': user_id},
+        )
+        db.commit()
+        pending = []
+        if frequency == 'immediate':
+            # alerts held for the old digest would otherwise never be sent
+            pending = db.execute(
+                select(alerts.c.id).where(
+                    alerts.c.user_id == user_id,
+                    alerts.c.priority == 'digest',
+                    alerts.c.sent_at.is_(None),
+                )
+            ).scalars().all()
+    if pending:
+        from backend.tasks import dispatch_alerts
+
+        dispatch_alerts(pending, 'digest')
+    return jsonify({'status': 'ok'})
+
+
 @bp.post('/api/push/register')
 @jwt_required
 def register_push() -> tuple:
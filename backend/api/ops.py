@@ -3,13 +3,12 @@ from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_
 from time import time
 from datetime import datetime
 from sqlalchemy import text
-from backend.utils.session import get_engine
+from backend.utils.session import get_engine, get_read_engine
 
 bp = Blueprint('ops', __name__)
 
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'http_status'])
 REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency', ['endpoint'])
-SCHEDULER_JOBS = Counter('scheduler_jobs_total', 'Scheduled jobs executed')
 
 
 @bp.route('/healthz')
@@ -38,7 +37,7 @@ def metrics():
 
 @bp.route('/latency')
 def avg_latency():
-    engine = get_engine()
+    engine = get_read_engine()
     with engine.connect() as conn:
         rows = conn.execute(
             text("SELECT recall_date, fetched_at FROM recalls WHERE recall_date IS NOT NULL AND fetched_at IS NOT NULL")
@@ -1,48 +1,230 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
-from sqlalchemy import text
-from backend.db.models import api_keys, webhooks, recalls
+import base64
+import csv
+import io
+import json
+import zlib
+import os
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import select, text
+from backend.db.models import webhooks, recalls
+from backend.utils import db as db_utils
+from backend.utils.api_keys import lookup_api_key
+from backend.utils.quota import consume_api_key_quota
 from backend.utils.session import SessionLocal
 
 bp = Blueprint("partner", __name__)
 
+RECALL_FIELDS = (
+    "id",
+    "product",
+    "hazard",
+    "recall_date",
+    "source",
+    "fetched_at",
+    "summary_text",
+    "next_steps",
+)
+DEFAULT_FIELDS = ("id", "product", "hazard", "recall_date", "source")
+KEYSET_FIELDS = ("recall_date", "id", "source")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# rows are stamped with fetched_at before their refresh batch commits, so the
+# next delta has to start a little before this export did
+EXPORT_DELTA_MARGIN = timedelta(minutes=int(os.getenv("EXPORT_DELTA_MARGIN_MINUTES", "60")))
+
+
+def _encode_cursor(row) -> str:
+    """Return an opaque cursor pointing just past ``row``."""
+    raw = json.dumps([row["recall_date"] or "", row["id"], row["source"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str, str] | None:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        date, rid, src = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not all(isinstance(v, str) for v in (date, rid, src)):
+        return None
+    return date, rid, src
+
 
-def _get_api_key(db, key: str | None):
-    if not key:
+def _parse_fields(
+    raw: str | None, default: tuple[str, ...] = DEFAULT_FIELDS
+) -> tuple[str, ...] | None:
+    if not raw:
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    if not fields or any(f not in RECALL_FIELDS for f in fields):
         return None
-    row = db.execute(api_keys.select().where(api_keys.c.key == key)).fetchone()
-    return row._mapping if row else None
+    return fields
+
+
+def _parse_since(raw: str | None) -> str | None:
+    """Normalise an ISO timestamp for comparison with ``fetched_at``."""
+    return datetime.fromisoformat(raw).isoformat() if raw else None
 
 
 @bp.get("/v1/recalls")
 def list_recalls():
+    """List recalls newest first using keyset pagination.
+
+    The next page is requested by passing the ``X-Next-Cursor`` response
+    header back as ``cursor``. ``updated_since`` restricts results to rows
+    fetched at or after the given ISO timestamp and ``fields`` selects a
+    comma separated subset of columns.
+    """
     key = request.headers.get("X-Api-Key")
     q = request.args.get("q", "")
     source = request.args.get("source")
+    fields = _parse_fields(request.args.get("fields"))
+    if fields is None:
+        return jsonify({"error": "invalid fields"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "invalid limit"}), 400
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = _decode_cursor(request.args["cursor"])
+        if cursor is None:
+            return jsonify({"error": "invalid cursor"}), 400
+    try:
+        since = _parse_since(request.args.get("updated_since"))
+    except ValueError:
+        return jsonify({"error": "invalid updated_since"}), 400
     with SessionLocal() as db:
-        record = _get_api_key(db, key)
+        record = lookup_api_key(db, key)
         if not record:
             return jsonify({"error": "invalid key"}), 401
-        if record["requests_this_month"] >= record["monthly_quota"]:
+        if not consume_api_key_quota(db, record["id"]):
+            return jsonify({"error": "quota exceeded"}), 429
+        db.commit()
+    columns = list(dict.fromkeys(fields + KEYSET_FIELDS))
+    params = {"limit": limit + 1}
+    sql = f"SELECT {', '.join(columns)} FROM recalls WHERE 1=1"
+    if q:
+        sql += " AND lower(product) LIKE '%' || lower(:q) || '%'"
+        params["q"] = q
+    if source:
+        sql += " AND source=:src"
+        params["src"] = source
+    if since:
+        sql += " AND fetched_at >= :since"
+        params["since"] = since
+    if cursor:
+        sql += " AND (coalesce(recall_date, ''), id, source) < (:c_date, :c_id, :c_src)"
+        params.update(c_date=cursor[0], c_id=cursor[1], c_src=cursor[2])
+    sql += (
+        " ORDER BY coalesce(recall_date, '') DESC, id DESC, source DESC"
+        " LIMIT :limit"
+    )
+    with db_utils.connect_read() as conn:
+        rows = [dict(r._mapping) for r in conn.execute(text(sql), params).fetchall()]
+    resp = jsonify([{f: r[f] for f in fields} for r in rows[:limit]])
+    if len(rows) > limit:
+        resp.headers["X-Next-Cursor"] = _encode_cursor(rows[limit - 1])
+    return resp
+
+
+def _export_rows(columns: list[str], since: str | None):
+    """Yield recall rows over a server-side cursor in fetch order."""
+    stmt = select(*(recalls.c[c] for c in columns))
+    if since:
+        stmt = stmt.where(recalls.c.fetched_at >= since)
+    stmt = stmt.order_by(recalls.c.fetched_at, recalls.c.id, recalls.c.source)
+    conn = db_utils.connect_read()
+    try:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+        for row in result:
+            yield row._mapping
+    finally:
+        conn.close()
+
+
+def _encode_rows(rows, columns: list[str], fmt: str):
+    """Yield text chunks of roughly ``EXPORT_CHUNK_BYTES`` each."""
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+    for row in rows:
+        if writer:
+            writer.writerow([row[c] for c in columns])
+        else:
+            buf.write(json.dumps({c: row[c] for c in columns}, default=str))
+            buf.write("\n")
+        if buf.tell() >= EXPORT_CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@bp.get("/v1/recalls/export")
+def export_recalls():
+    """Stream the full recall dataset as NDJSON or CSV.
+
+    ``since`` limits the export to rows fetched at or after the given ISO
+    timestamp. ``X-Export-Next-Since`` is the ``since`` to use for the next
+    delta: it lies ``EXPORT_DELTA_MARGIN`` before this export started, to
+    cover refresh batches that commit late, so consecutive deltas overlap and
+    clients should dedupe on ``(id, source)``. The export counts as a single
+    request against the quota.
+    """
+    key = request.headers.get("X-Api-Key")
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "invalid format"}), 400
+    fields = _parse_fields(request.args.get("fields"), RECALL_FIELDS)
+    if fields is None:
+        return jsonify({"error": "invalid fields"}), 400
+    try:
+        since = _parse_since(request.args.get("since"))
+    except ValueError:
+        return jsonify({"error": "invalid since"}), 400
+    started = datetime.utcnow()
+    with SessionLocal() as db:
+        record = lookup_api_key(db, key)
+        if not record:
+            return jsonify({"error": "invalid key"}), 401
+        if not consume_api_key_quota(db, record["id"]):
             return jsonify({"error": "quota exceeded"}), 429
-        db.execute(
-            api_keys.update()
-            .where(api_keys.c.id == record["id"])
-            .values(requests_this_month=record["requests_this_month"] + 1)
-        )
-        params = {}
-        sql = "SELECT id, product, hazard, recall_date, source FROM recalls WHERE 1=1"
-        if q:
-            sql += " AND lower(product) LIKE '%' || lower(:q) || '%'"
-            params["q"] = q
-        if source:
-            sql += " AND source=:src"
-            params["src"] = source
-        sql += " ORDER BY recall_date DESC LIMIT 50"
-        rows = db.execute(text(sql), params).fetchall()
         db.commit()
-        return jsonify([dict(r._mapping) for r in rows])
+
+    columns = list(fields)
+    body = _encode_rows(_export_rows(columns, since), columns, fmt)
+    headers = {
+        "Content-Disposition": f"attachment; filename=recalls.{fmt}",
+        "X-Export-Started-At": started.isoformat(),
+        "X-Export-Next-Since": (started - EXPORT_DELTA_MARGIN).isoformat(),
+        "Vary": "Accept-Encoding",
+    }
+    # honours q-values, so "gzip;q=0" opts out
+    if request.accept_encodings["gzip"] > 0:
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(
+        stream_with_context(body), mimetype=EXPORT_FORMATS[fmt], headers=headers
+    )
 
 
 @bp.post("/v1/webhooks")
@@ -55,7 +237,7 @@ def create_webhook():
     if not url:
         return jsonify({"error": "missing url"}), 400
     with SessionLocal() as db:
-        record = _get_api_key(db, key)
+        record = lookup_api_key(db, key)
         if not record:
             return jsonify({"error": "invalid key"}), 401
         res = db.execute(
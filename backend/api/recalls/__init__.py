@@ -1,11 +1,25 @@
 """Recall fetcher utilities."""
 
-from .fetch_cpsc import fetch as fetch_cpsc
-from .fetch_fda import fetch as fetch_fda
-from .fetch_usda import fetch as fetch_usda
-from .fetch_nhtsa import fetch as fetch_nhtsa
+from .fetch_cpsc import fetch as fetch_cpsc, stream as stream_cpsc
+from .fetch_fda import fetch as fetch_fda, stream as stream_fda
+from .fetch_usda import fetch as fetch_usda, stream as stream_usda
+from .fetch_nhtsa import fetch as fetch_nhtsa, stream as stream_nhtsa
 from .scrape_misc import fetch as fetch_misc
 
+__all__ = [
+    "fetch_all",
+    "fetch_cpsc",
+    "fetch_fda",
+    "fetch_usda",
+    "fetch_nhtsa",
+    "fetch_misc",
+    "stream_cpsc",
+    "stream_fda",
+    "stream_usda",
+    "stream_nhtsa",
+    "router",
+]
+
 
 def fetch_all(use_cache: bool = True) -> list:
     """Return recalls from all available sources."""
@@ -2,17 +2,17 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
-import json
-import time
-import requests
+from typing import Dict, Iterable, Iterator, List
+
+from backend.utils.jsonstream import iter_file_items
+from backend.utils.records import RecallRecord
+from backend.utils.retry import request_items
 
 API_URL = "https://www.saferproducts.gov/RestWebServices/Recall"
 DATA_FILE = Path(__file__).resolve().parents[3] / "tests" / "data" / "cpsc_sample.json"
 
 
-def _parse(records: List[Dict]) -> List[Dict]:
-    parsed: List[Dict] = []
+def _parse(records: Iterable[Dict]) -> Iterator[RecallRecord]:
     for r in records:
         hazard = None
         hazards = r.get("Hazards") or r.get("Hazard")
@@ -25,50 +25,52 @@ def _parse(records: List[Dict]) -> List[Dict]:
             prods = r.get("Products")
             if isinstance(prods, list) and prods:
                 product = prods[0].get("Name")
-        parsed.append(
-            {
-                "source": "cpsc",
-                "id": r.get("RecallID"),
-                "product": product,
-                "hazard": hazard,
-                "recall_date": r.get("RecallDate"),
-                "url": r.get("URL"),
-            }
+        yield RecallRecord(
+            source="cpsc",
+            id=r.get("RecallID"),
+            product=product,
+            hazard=hazard,
+            recall_date=r.get("RecallDate"),
+            url=r.get("URL"),
         )
-    return parsed
 
 
-def _request(params: Dict) -> Dict:
-    for attempt in range(3):
-        try:
-            resp = requests.get(API_URL, params=params, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception:
-            if attempt == 2:
-                raise
-            time.sleep(2 ** attempt)
+def _request(params: Dict) -> Iterator[Dict]:
+    return request_items(API_URL, params, keys=("results", "Recalls"))
 
 
-def fetch(use_cache: bool = True) -> List[Dict]:
-    results: List[Dict] = []
-    seen: set[str] = set()
+def _records() -> Iterator[Dict]:
     offset = 0
+    while True:
+        count = 0
+        for record in _request({"format": "json", "offset": offset}):
+            count += 1
+            yield record
+        if count < 100:
+            return
+        offset += 100
+
+
+def stream(use_cache: bool = True) -> Iterator[RecallRecord]:
+    """Yield parsed recalls as they are decoded, page after page.
+
+    If the API fails, the sample file fills in whatever was not yielded.
+    """
+    seen: set[str] = set()
     try:
-        while True:
-            data = _request({"format": "json", "offset": offset})
-            records = data.get("results") or data.get("Recalls") or []
-            parsed = _parse(records)
-            new_records = [r for r in parsed if r["id"] not in seen]
-            results.extend(new_records)
-            seen.update(r["id"] for r in new_records)
-            if not records or len(records) < 100:
-                break
-            offset += 100
-        return results
+        for r in _parse(_records()):
+            if r["id"] not in seen:
+                seen.add(r["id"])
+                yield r
     except Exception:
         if not use_cache or not DATA_FILE.exists():
-            return []
-        with DATA_FILE.open("r", encoding="utf-8") as fh:
-            records = json.load(fh)
-        return _parse(records)
+            return
+        with DATA_FILE.open("rb") as fh:
+            for r in _parse(iter_file_items(fh)):
+                if r["id"] not in seen:
+                    seen.add(r["id"])
+                    yield r
+
+
+def fetch(use_cache: bool = True) -> List[RecallRecord]:
+    return list(stream(use_cache))
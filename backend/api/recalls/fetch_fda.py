@@ -2,68 +2,72 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
-import json
-import time
-import requests
+from typing import Dict, Iterable, Iterator, List
+
+from backend.utils.jsonstream import iter_file_items, write_items
+from backend.utils.records import RecallRecord
+from backend.utils.retry import request_items
 
 API_URL = "https://api.fda.gov/food/enforcement.json"
 CACHE_FILE = Path(__file__).resolve().parents[3] / "data" / "fda_cache.json"
 
 
-def _parse(records: List[Dict]) -> List[Dict]:
-    parsed: List[Dict] = []
+def _parse(records: Iterable[Dict]) -> Iterator[RecallRecord]:
     for r in records:
         recall_id = r.get("recall_number") or r.get("event_id")
         title = r.get("product_description")
-        parsed.append(
-            {
-                "source": "fda",
-                "id": recall_id,
-                "title": title,
-                "product": title,
-                "hazard": r.get("reason_for_recall"),
-                "recall_date": r.get("recall_initiation_date") or r.get("report_date"),
-                "url": r.get("more_code_info") or f"https://www.fda.gov/{recall_id}",
-            }
+        yield RecallRecord(
+            source="fda",
+            id=recall_id,
+            title=title,
+            product=title,
+            hazard=r.get("reason_for_recall"),
+            classification=r.get("classification"),
+            recall_date=r.get("recall_initiation_date") or r.get("report_date"),
+            url=r.get("more_code_info") or f"https://www.fda.gov/{recall_id}",
         )
-    return parsed
 
 
-def _request(params: Dict) -> Dict:
-    for attempt in range(3):
-        try:
-            resp = requests.get(API_URL, params=params, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception:
-            if attempt == 2:
-                raise
-            time.sleep(2 ** attempt)
+def _request(params: Dict) -> Iterator[Dict]:
+    return request_items(API_URL, params)
 
 
-def fetch(use_cache: bool = True) -> List[Dict]:
-    results: List[Dict] = []
-    seen: set[str] = set()
+def _records() -> Iterator[Dict]:
     skip = 0
+    while True:
+        count = 0
+        for record in _request({"search": "report_date:[2023-01-01+TO+2025-12-31]", "limit": 100, "skip": skip}):
+            count += 1
+            yield record
+        if count < 100:
+            return
+        skip += 100
+
+
+def stream(use_cache: bool = True) -> Iterator[RecallRecord]:
+    """Yield parsed recalls as they are decoded, page after page.
+
+    Raw records are written to ``CACHE_FILE`` on the way through; if the
+    API fails, the previous cache fills in whatever was not yielded.
+    """
+    seen: set[str] = set()
     try:
-        while True:
-            data = _request({"search": "report_date:[2023-01-01+TO+2025-12-31]", "limit": 100, "skip": skip})
-            records = data.get("results") or []
-            parsed = _parse(records)
-            new_records = [r for r in parsed if r["id"] not in seen]
-            results.extend(new_records)
-            seen.update(r["id"] for r in new_records)
-            if not records or len(records) < 100:
-                break
-            skip += 100
-        CACHE_FILE.write_text(json.dumps(records), encoding="utf-8")
-        return results
+        for r in _parse(write_items(_records(), CACHE_FILE)):
+            if r["id"] not in seen:
+                seen.add(r["id"])
+                yield r
     except Exception:
-        if use_cache and CACHE_FILE.exists():
-            try:
-                data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-                return _parse(data)
-            except Exception:
-                return []
-        return []
+        if not use_cache or not CACHE_FILE.exists():
+            return
+        try:
+            with CACHE_FILE.open("rb") as fh:
+                for r in _parse(iter_file_items(fh)):
+                    if r["id"] not in seen:
+                        seen.add(r["id"])
+                        yield r
+        except Exception:
+            return
+
+
+def fetch(use_cache: bool = True) -> List[RecallRecord]:
+    return list(stream(use_cache))
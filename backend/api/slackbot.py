@@ -6,6 +6,7 @@ from slack_bolt import App
 from slack_bolt.adapter.flask import SlackRequestHandler
 from sqlalchemy import text
 
+from backend.utils import db as db_utils
 from backend.utils.session import SessionLocal
 from backend.db.models import channel_subs, recalls
 
@@ -75,12 +76,13 @@ if slack_app:
                 respond(f"Unsubscribed {sid}")
             else:
                 query = text_arg
-                rows = db.execute(
-                    text(
-                        "SELECT product, recall_date, source FROM recalls WHERE lower(product) LIKE '%' || lower(:q) || '%' ORDER BY recall_date DESC LIMIT 5"
-                    ),
-                    {"q": query},
-                ).fetchall()
+                with db_utils.connect_read() as conn:
+                    rows = conn.execute(
+                        text(
+                            "SELECT product, recall_date, source FROM recalls WHERE lower(product) LIKE '%' || lower(:q) || '%' ORDER BY recall_date DESC LIMIT 5"
+                        ),
+                        {"q": query},
+                    ).fetchall()
                 if not rows:
                     respond(f"No recalls found for {query}")
                 else:
@@ -8,6 +8,13 @@ class Settings(BaseSettings):
     pg_pass: str = 'recallguard'
     pg_db: str = 'recallguard'
     env: str = 'dev'
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    replica_max_lag_seconds: float = 30
+    replica_lag_check_interval: float = 5
 
     model_config = {
         'extra': 'ignore'
@@ -20,4 +27,8 @@ class Settings(BaseSettings):
             return override
         return f"postgresql+psycopg2://{self.pg_user}:{self.pg_pass}@{self.pg_host}/{self.pg_db}"
 
+    @property
+    def database_replica_url(self) -> str | None:
+        return os.getenv('DATABASE_REPLICA_URL') or None
+
 settings = Settings(_env_file='.env', _env_file_encoding='utf-8')
@@ -97,7 +97,8 @@ def create_tables(conn: sqlite3.Connection) -> None:
         CREATE TABLE IF NOT EXISTS api_keys (
             id INTEGER PRIMARY KEY,
             org_name TEXT NOT NULL,
-            key TEXT NOT NULL UNIQUE,
+            key TEXT UNIQUE,
+            key_hash TEXT UNIQUE,
             plan TEXT DEFAULT 'free',
             monthly_quota INTEGER DEFAULT 5000,
             requests_this_month INTEGER DEFAULT 0,
@@ -8,6 +8,8 @@ from sqlalchemy import (
     ForeignKey,
     PrimaryKeyConstraint,
     UniqueConstraint,
+    Index,
+    func,
     text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
@@ -22,6 +24,8 @@ users = Table(
     Column("password_hash", String, nullable=False),
     Column("created_at", String, nullable=False),
     Column("email_opt_in", Integer, nullable=False, server_default=text("0")),
+    # "immediate", "hourly" or "daily" delivery of digest-class alerts
+    Column("digest_frequency", String, nullable=False, server_default=text("'immediate'")),
 )
 
 products = Table(
@@ -30,8 +34,13 @@ products = Table(
     Column("id", Integer, primary_key=True),
     Column("name", String, nullable=False),
     Column("user_id", Integer, ForeignKey("users.id")),
+    # backend.utils.names.product_key(name), kept in sync on write
+    Column("name_key", String),
 )
 
+Index("ix_products_lower_name", func.lower(products.c.name))
+Index("ix_products_name_key", products.c.name_key, products.c.user_id)
+
 recalls = Table(
     "recalls",
     metadata,
@@ -44,19 +53,73 @@ recalls = Table(
     Column("summary_text", Text),
     Column("next_steps", Text),
     Column("remedy_updates", JSONB, server_default=text("'[]'::jsonb")),
+    # backend.utils.names.product_key(product), kept in sync on write
+    Column("product_key", String),
+    # remedy page polling: next due time and HTTP validators
+    Column("next_remedy_check_at", String),
+    Column("remedy_etag", String),
+    Column("remedy_last_modified", String),
+    # backend.utils.priority classification, set on ingestion
+    Column("priority", String),
     PrimaryKeyConstraint("id", "source"),
 )
 
+# keyset pagination for the partner API orders by (recall_date, id, source);
+# recall_date is nullable so the sort key is coalesced to keep cursors total
+Index(
+    "ix_recalls_keyset",
+    func.coalesce(recalls.c.recall_date, ""),
+    recalls.c.id,
+    recalls.c.source,
+)
+Index(
+    "ix_recalls_source_keyset",
+    recalls.c.source,
+    func.coalesce(recalls.c.recall_date, ""),
+    recalls.c.id,
+)
+Index("ix_recalls_fetched_at", recalls.c.fetched_at)
+Index("ix_recalls_recall_date", recalls.c.recall_date)
+Index("ix_recalls_source_recall_date", recalls.c.source, recalls.c.recall_date)
+Index("ix_recalls_product_key", recalls.c.product_key)
+Index("ix_recalls_next_remedy_check_at", recalls.c.next_remedy_check_at)
+Index("ix_recalls_priority_fetched_at", recalls.c.priority, recalls.c.fetched_at)
+
 alerts = Table(
     "alerts",
     metadata,
     Column("id", Integer, primary_key=True),
     Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
     Column("recall_id", String, nullable=False),
+    # recall ids are only unique per source
+    Column("recall_source", String),
+    Column("channel", String, nullable=False),
+    Column("sent_at", String),
+    Column("read_at", String),
+    Column("error", Text),
+    # partition key on Postgres, where the primary key is (id, created_at)
+    Column("created_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
+    # classify_recall() result at creation; "digest" alerts may be batched
+    Column("priority", String),
+)
+
+Index("ix_alerts_user_sent_at", alerts.c.user_id, alerts.c.sent_at)
+Index("ix_alerts_priority_sent_at", alerts.c.priority, alerts.c.sent_at)
+Index("ix_alerts_created_at", alerts.c.created_at)
+
+# expired alert partitions are moved here by backend.utils.retention
+alerts_archive = Table(
+    "alerts_archive",
+    metadata,
+    Column("id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("recall_id", String, nullable=False),
+    Column("recall_source", String),
     Column("channel", String, nullable=False),
     Column("sent_at", String),
     Column("read_at", String),
     Column("error", Text),
+    Column("created_at", String, nullable=False),
 )
 
 subscriptions = Table(
@@ -69,13 +132,20 @@ subscriptions = Table(
     Column("created_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
 )
 
+Index("ix_subscriptions_recall_source", subscriptions.c.recall_source)
+
 sent_notifications = Table(
     "sent_notifications",
     metadata,
     Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
     Column("recall_id", String, primary_key=True),
+    Column("sent_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
 )
 
+# the primary key leads with user_id; fan-out looks up by recall
+Index("ix_sent_notifications_recall_id", sent_notifications.c.recall_id)
+Index("ix_sent_notifications_sent_at", sent_notifications.c.sent_at)
+
 user_items = Table(
     "user_items",
     metadata,
@@ -87,6 +157,9 @@ user_items = Table(
     Column("added_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
 )
 
+Index("ix_user_items_user_id", user_items.c.user_id)
+Index("ix_user_items_upc", user_items.c.upc)
+
 push_tokens = Table(
     "push_tokens",
     metadata,
@@ -107,12 +180,16 @@ email_unsub_tokens = Table(
     Column("created_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
 )
 
+Index("ix_email_unsub_tokens_user_id", email_unsub_tokens.c.user_id)
+
 api_keys = Table(
     "api_keys",
     metadata,
     Column("id", Integer, primary_key=True),
     Column("org_name", String, nullable=False),
-    Column("key", String, nullable=False, unique=True),
+    # legacy plaintext keys; new keys only store key_hash
+    Column("key", String, unique=True),
+    Column("key_hash", String, unique=True),
     Column("plan", String, server_default=text("'free'")),
     Column("monthly_quota", Integer, server_default=text("5000")),
     Column("requests_this_month", Integer, server_default=text("0")),
@@ -141,6 +218,8 @@ webhooks = Table(
     Column("created_at", String, nullable=False, server_default=text("CURRENT_TIMESTAMP")),
 )
 
+Index("ix_webhooks_source", webhooks.c.source)
+
 invites = Table(
     "invites",
     metadata,
@@ -161,3 +240,32 @@ stripe_customers = Table(
     Column("quota", Integer, server_default=text("100")),
     Column("seats", Integer, server_default=text("1")),
 )
+
+# high-water marks for incremental background jobs
+task_watermarks = Table(
+    "task_watermarks",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("value", String, nullable=False),
+)
+
+# vPIC decodes keyed by WMI + VDS + model-year character; see
+# backend.utils.vin_cache.vin_prefix
+vin_decodes = Table(
+    "vin_decodes",
+    metadata,
+    Column("vin_prefix", String, primary_key=True),
+    Column("make", String),
+    Column("model", String),
+    Column("model_year", String),
+    Column("decoded_at", String, nullable=False),
+)
+
+# recall campaigns per VIN as returned by get_recalls_for_vin (JSON list)
+vin_campaigns = Table(
+    "vin_campaigns",
+    metadata,
+    Column("vin", String, primary_key=True),
+    Column("recalls", Text, nullable=False),
+    Column("fetched_at", String, nullable=False),
+)
@@ -4,7 +4,10 @@ from pathlib import Path
 import sqlite3
 from sqlalchemy import text
 
+from backend.utils.api_keys import hash_api_key
 from backend.utils.auth import hash_password
+from backend.utils.names import product_key
+from backend.utils.priority import recall_priority
 from backend.utils.session import get_engine
 
 
@@ -17,18 +20,23 @@ def seed() -> None:
             ),
             {"e": "user@example.com", "p": hash_password("password"), "c": datetime.utcnow().isoformat()},
         )
-        conn.execute(text("INSERT INTO products (name, user_id) VALUES (:n, :u)"), {"n": "Widget", "u": 1})
+        conn.execute(
+            text("INSERT INTO products (name, name_key, user_id) VALUES (:n, :k, :u)"),
+            {"n": "Widget", "k": product_key("Widget"), "u": 1},
+        )
         conn.execute(
             text(
-                "INSERT INTO recalls (id, product, hazard, recall_date, source, fetched_at) VALUES (:i, :p, :h, :d, :s, :f)"
+                "INSERT INTO recalls (id, product, product_key, hazard, recall_date, source, fetched_at, priority) VALUES (:i, :p, :k, :h, :d, :s, :f, :pr)"
             ),
             {
                 "i": "demo-1",
                 "p": "Widget",
+                "k": product_key("Widget"),
                 "h": "Fire hazard",
                 "d": "2024-04-01",
                 "s": "cpsc",
                 "f": datetime.utcnow().isoformat(),
+                "pr": recall_priority({"hazard": "Fire hazard", "source": "cpsc"}),
             },
         )
         conn.execute(
@@ -38,9 +46,9 @@ def seed() -> None:
         )
         conn.execute(
             text(
-                "INSERT INTO api_keys (org_name, key, plan) VALUES (:n, :k, 'free')"
+                "INSERT INTO api_keys (org_name, key_hash, plan) VALUES (:n, :h, 'free')"
             ),
-            {"n": "Demo Org", "k": "demo-key"},
+            {"n": "Demo Org", "h": hash_api_key("demo-key")},
         )
         conn.execute(
             text(
@@ -70,8 +78,8 @@ def seed_path(db_path: Path) -> None:
         ),
     )
     cur.execute(
-        "INSERT INTO api_keys (org_name, key, plan) VALUES (?, ?, 'free')",
-        ("Demo Org", "demo-key"),
+        "INSERT INTO api_keys (org_name, key_hash, plan) VALUES (?, ?, 'free')",
+        ("Demo Org", hash_api_key("demo-key")),
     )
     cur.execute(
         "INSERT INTO stripe_customers (user_id, plan, quota, seats) VALUES (1, 'free', 100, 1)"
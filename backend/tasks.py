@@ -1,24 +1,30 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime
+from collections.abc import Mapping
+from datetime import datetime, timedelta
 
 from celery import Celery
-from backend.utils.email_utils import send_email
-from urllib.parse import quote
+from celery.signals import worker_process_init
+from backend.utils.email_utils import send_email, share_context
 
-from backend.utils.session import SessionLocal
+from backend.utils.session import SessionLocal, dispose_engines, set_process_role
 from backend.db.models import (
     alerts,
     email_unsub_tokens,
     recalls,
-    push_tokens,
     channel_subs,
+    sent_notifications,
+    users,
     webhooks,
 )
 from backend.api.notifications import listeners
 from backend.utils.notifications import queue_notifications
-from sqlalchemy import text
+from backend.utils.priority import recall_priority
+from backend.utils.push import send_push
+from backend.utils.retry import NO_RETRY, TASK_POLICY, task_countdown
+from backend.utils.metrics import ALERT_DELIVERY_LATENCY
+from sqlalchemy import select, text
 import requests
 import json
 from slack_sdk import WebClient
@@ -26,24 +32,52 @@ from slack_sdk import WebClient
 SLACK_URL = os.getenv("SLACK_WEBHOOK_URL")
 SLACK_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 slack_client = WebClient(token=SLACK_TOKEN) if SLACK_TOKEN else None
+USER_ITEM_SCAN = "user_item_scan"
+REMEDY_CHECK_INTERVAL = timedelta(hours=int(os.getenv("REMEDY_CHECK_INTERVAL_HOURS", "24")))
+REMEDY_POLL_BATCH = int(os.getenv("REMEDY_POLL_BATCH", "500"))
+ALERT_FANOUT_CHUNK = int(os.getenv("ALERT_FANOUT_CHUNK", "500"))
 
 celery = Celery(
     "tasks", broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 )
+# urgent alerts get their own queue and workers so a flood of digest-class
+# recalls cannot delay them; the digest task is rate limited per worker
+ALERT_QUEUES = {"urgent": "alerts_urgent", "digest": "alerts_digest"}
+DIGEST_RATE_LIMIT = os.getenv("DIGEST_ALERT_RATE_LIMIT", "30/m")
+celery.conf.task_routes = {
+    "backend.tasks.send_digest_alert_batch": {"queue": ALERT_QUEUES["digest"]},
+}
+celery.conf.worker_prefetch_multiplier = 1
 
 
-def _send_push(db, user_id: int, message: str) -> None:
-    tokens = db.execute(
-        push_tokens.select().where(push_tokens.c.user_id == user_id)
-    ).fetchall()
-    for t in tokens:
-        print("push", t._mapping["token"], message)
+@worker_process_init.connect
+def _init_worker_db(**_kwargs) -> None:
+    # forked workers must not share the parent's pooled connections
+    set_process_role("celery")
+    dispose_engines()
+
+
+def _observe_delivery(priority: str | None, fetched_at: str | None, sent_at: datetime) -> None:
+    """Record fetch-to-sent latency for one alert."""
+    if not fetched_at:
+        return
+    try:
+        fetched = datetime.fromisoformat(fetched_at.rstrip("Z"))
+    except ValueError:
+        return
+    ALERT_DELIVERY_LATENCY.labels(priority=priority or "unknown").observe(
+        max((sent_at - fetched).total_seconds(), 0)
+    )
+
+
+def _email_context(product: str | None) -> dict:
+    return share_context(f"Recall alert: {product} – stay safe with RecallHero")
 
 
 @celery.task(
     autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3}
 )
-def send_alert(alert_id: int, subject: str | None = None) -> None:
+def send_alert(alert_id: int, subject: str | None = None, priority: str | None = None) -> None:
     with SessionLocal() as db:
         row = db.execute(alerts.select().where(alerts.c.id == alert_id)).fetchone()
         if not row:
@@ -53,9 +87,10 @@ def send_alert(alert_id: int, subject: str | None = None) -> None:
             text("SELECT email FROM users WHERE id=:u"), {"u": mapping["user_id"]}
         ).fetchone()
         email = user_row._mapping["email"] if user_row else None
-        recall_row = db.execute(
-            recalls.select().where(recalls.c.id == mapping["recall_id"])
-        ).fetchone()
+        match = recalls.c.id == mapping["recall_id"]
+        if mapping["recall_source"] is not None:
+            match &= recalls.c.source == mapping["recall_source"]
+        recall_row = db.execute(recalls.select().where(match)).fetchone()
         summary = recall_row._mapping.get("summary_text") if recall_row else ""
         steps = recall_row._mapping.get("next_steps") if recall_row else ""
         # ensure an unsubscribe token exists
@@ -76,34 +111,182 @@ def send_alert(alert_id: int, subject: str | None = None) -> None:
         else:
             unsub_token = token_row._mapping["token"]
         base_url = os.getenv("BASE_URL", "")
-        share_url = f"{os.getenv('FRONTEND_ORIGIN', '')}/signup?src=share"
-        text_copy = (
-            f"Recall alert: {recall_row._mapping.get('product')} – stay safe with RecallHero"
-        )
-        context = {
-            "share_twitter": f"https://twitter.com/intent/tweet?text={quote(text_copy)}&url={quote(share_url)}",
-            "share_facebook": f"https://www.facebook.com/sharer/sharer.php?u={quote(share_url)}&quote={quote(text_copy)}",
-        }
         send_email(
             email,
             subject or "Recall Alert",
             "recall_alert.html",
-            context,
+            _email_context(recall_row._mapping.get("product")),
         )
+        sent_at = datetime.utcnow()
         db.execute(
             alerts.update()
             .where(alerts.c.id == alert_id)
-            .values(sent_at=datetime.utcnow().isoformat())
+            .values(sent_at=sent_at.isoformat())
         )
         db.commit()
+        _observe_delivery(priority, recall_row._mapping.get("fetched_at"), sent_at)
     for q in listeners:
         q.put({"type": "new_alert"})
 
 
+class AlertDeliveryError(RuntimeError):
+    """Some alerts of a batch could not be sent; they stay unsent for a retry."""
+
+
 @celery.task(
     autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3}
 )
-def send_notifications(new_recalls: list[dict]) -> int:
+def send_alert_batch(
+    alert_ids: list[int], subject: str | None = None, priority: str | None = None
+) -> int:
+    """Email a chunk of alerts with one lookup per table instead of per alert.
+
+    Each alert is marked sent and committed as soon as its email goes out,
+    so a retry only resends the alerts that failed. Failures are recorded
+    in ``alerts.error`` and raise :class:`AlertDeliveryError` once the rest
+    of the chunk has been sent.
+    """
+    import secrets
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(alerts.c.id, alerts.c.user_id, alerts.c.recall_id, alerts.c.recall_source).where(
+                alerts.c.id.in_(alert_ids), alerts.c.sent_at.is_(None)
+            )
+        ).fetchall()
+        if not rows:
+            return 0
+        user_ids = {r.user_id for r in rows}
+        emails = dict(
+            db.execute(select(users.c.id, users.c.email).where(users.c.id.in_(user_ids))).fetchall()
+        )
+        # recall ids are only unique per source
+        recall_rows = {
+            (r.id, r.source): r
+            for r in db.execute(
+                select(recalls.c.id, recalls.c.source, recalls.c.product, recalls.c.fetched_at).where(
+                    recalls.c.id.in_({r.recall_id for r in rows})
+                )
+            )
+        }
+        # alerts created before recall_source existed only carry the id
+        by_recall_id = {}
+        for key, recall in recall_rows.items():
+            by_recall_id.setdefault(key[0], recall)
+        # ensure an unsubscribe token exists for every recipient
+        have_token = set(
+            db.execute(
+                select(email_unsub_tokens.c.user_id).where(
+                    email_unsub_tokens.c.user_id.in_(user_ids)
+                )
+            ).scalars()
+        )
+        missing = user_ids - have_token
+        if missing:
+            db.execute(
+                email_unsub_tokens.insert(),
+                [{"user_id": u, "token": secrets.token_urlsafe(16)} for u in missing],
+            )
+            db.commit()
+        sent = 0
+        failed = []
+        for r in rows:
+            if r.recall_source is None:
+                recall = by_recall_id.get(r.recall_id)
+            else:
+                recall = recall_rows.get((r.recall_id, r.recall_source))
+            try:
+                send_email(
+                    emails.get(r.user_id),
+                    subject or "Recall Alert",
+                    "recall_alert.html",
+                    _email_context(recall.product if recall else None),
+                )
+            except Exception as exc:
+                db.execute(alerts.update().where(alerts.c.id == r.id).values(error=str(exc)))
+                db.commit()
+                failed.append(r.id)
+                continue
+            sent_at = datetime.utcnow()
+            db.execute(
+                alerts.update()
+                .where(alerts.c.id == r.id)
+                .values(sent_at=sent_at.isoformat(), error=None)
+            )
+            db.commit()
+            sent += 1
+            _observe_delivery(priority, recall.fetched_at if recall else None, sent_at)
+    if sent:
+        for q in listeners:
+            q.put({"type": "new_alert"})
+    if failed:
+        raise AlertDeliveryError(f"{len(failed)} of {len(rows)} alerts failed: {failed}")
+    return sent
+
+
+@celery.task(
+    rate_limit=DIGEST_RATE_LIMIT,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 3},
+)
+def send_digest_alert_batch(alert_ids: list[int], subject: str | None = None) -> int:
+    """Throttled variant of :func:`send_alert_batch` for digest-class alerts.
+
+    Only users who opted into immediate delivery are emailed; the rest are
+    collected by :func:`send_digest_emails`.
+    """
+    with SessionLocal() as db:
+        immediate = (
+            db.execute(
+                select(alerts.c.id)
+                .join(users, users.c.id == alerts.c.user_id)
+                .where(alerts.c.id.in_(alert_ids), users.c.digest_frequency == "immediate")
+            )
+            .scalars()
+            .all()
+        )
+    if not immediate:
+        return 0
+    return send_alert_batch(immediate, subject, "digest")
+
+
+@celery.task
+def send_digest_emails(frequency: str) -> int:
+    """Send the hourly or daily digest email to each subscriber."""
+    from backend.utils.digest import send_digests
+
+    with SessionLocal() as db:
+        return send_digests(db, frequency)
+
+
+def dispatch_alerts(alert_ids: list[int], priority: str, subject: str | None = None) -> None:
+    """Send alerts in chunks on the queue for ``priority``.
+
+    Without a broker the chunks are sent inline.
+    """
+    for start in range(0, len(alert_ids), ALERT_FANOUT_CHUNK):
+        chunk = alert_ids[start:start + ALERT_FANOUT_CHUNK]
+        if priority == "urgent" and not os.getenv("CELERY_BROKER_URL"):
+            send_alert_batch(chunk, subject, priority)
+        elif not os.getenv("CELERY_BROKER_URL"):
+            send_digest_alert_batch(chunk, subject)
+        elif priority == "urgent":
+            send_alert_batch.apply_async(
+                (chunk, subject, priority), queue=ALERT_QUEUES["urgent"]
+            )
+        else:
+            send_digest_alert_batch.delay(chunk, subject)
+
+
+@celery.task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3}
+)
+def send_notifications(new_recalls: list[Mapping]) -> int:
+    """Notify subscribers, Slack and partner webhooks of new recalls.
+
+    Accepts recall dicts (as Celery delivers them) or ``RecallRecord``s.
+    """
     sent = 0
     db = SessionLocal()
     try:
@@ -148,7 +331,7 @@ def send_notifications(new_recalls: list[dict]) -> int:
                 if q and q.lower() not in recall.get("product", "").lower():
                     continue
                 try:
-                    requests.post(wh._mapping["url"], json=recall, timeout=5)
+                    requests.post(wh._mapping["url"], json=dict(recall), timeout=5)
                 except Exception:
                     pass
     finally:
@@ -158,98 +341,227 @@ def send_notifications(new_recalls: list[dict]) -> int:
 
 
 @celery.task
-def check_user_items_and_alert() -> None:
-    """Placeholder daily scan of UserItem rows."""
-    from backend.db.models import user_items
+def check_user_items_and_alert() -> int:
+    """Alert users whose saved UPCs appear in recalls fetched since the last run."""
+    from backend.utils.alerts import create_alerts_for_user_items
+    from backend.utils.watermarks import get_watermark, set_watermark
 
+    until = datetime.utcnow().isoformat()
     with SessionLocal() as db:
-        rows = db.execute(user_items.select()).fetchall()
+        since = get_watermark(db, USER_ITEM_SCAN)
+        if since:
+            # rescan a margin for refreshes that committed late; dedup makes
+            # the overlap harmless
+            since = (datetime.fromisoformat(since) - timedelta(hours=1)).isoformat()
+        alert_ids = create_alerts_for_user_items(db, since, until)
+        set_watermark(db, USER_ITEM_SCAN, until)
+        db.commit()
+    if alert_ids:
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(alerts.c.id, alerts.c.priority).where(alerts.c.id.in_(alert_ids))
+            ).fetchall()
+        by_priority: dict[str, list[int]] = {}
         for r in rows:
-            upc = r._mapping["upc"]
-            status = db.execute(
-                text("SELECT 1 FROM recalls WHERE product=:p"), {"p": upc}
-            ).fetchone()
-            if status:
-                # In a real task we'd queue an alert
-                print(f"Alert user {r._mapping['user_id']} UPC {upc} recalled")
+            by_priority.setdefault(r.priority or "urgent", []).append(r.id)
+        for priority, ids in by_priority.items():
+            dispatch_alerts(ids, priority)
+    return len(alert_ids)
+
+
+def _due_remedy_checks(db, now: datetime) -> list[dict]:
+    stale = (now - REMEDY_CHECK_INTERVAL).isoformat()
+    rows = db.execute(
+        text(
+            "SELECT id, source, product, hazard, priority, remedy_updates, url, remedy_etag, remedy_last_modified "
+            "FROM recalls WHERE source IN ('cpsc','nhtsa') AND url IS NOT NULL "
+            "AND (next_remedy_check_at <= :now "
+            "OR (next_remedy_check_at IS NULL AND fetched_at <= :stale)) "
+            "LIMIT :limit"
+        ),
+        {"now": now.isoformat(), "stale": stale, "limit": REMEDY_POLL_BATCH},
+    ).fetchall()
+    return [dict(r._mapping) for r in rows]
+
+
+def _queue_remedy_alerts(db, changed: list[dict]) -> dict[tuple[str, str], list[int]]:
+    """Create update alerts for everyone notified about a changed recall.
+
+    Returns the new alert ids grouped by ``(priority, subject)``.
+    """
+    by_key = {(c["b_id"], c["b_source"]): c for c in changed}
+    # sent_notifications only records the recall id; the matching alert
+    # carries its source, so a notification about one source's recall is
+    # not mistaken for another source's recall sharing the id
+    notified = db.execute(
+        select(sent_notifications.c.user_id, sent_notifications.c.recall_id, alerts.c.recall_source)
+        .outerjoin(
+            alerts,
+            (alerts.c.user_id == sent_notifications.c.user_id)
+            & (alerts.c.recall_id == sent_notifications.c.recall_id),
+        )
+        .where(sent_notifications.c.recall_id.in_({c["b_id"] for c in changed}))
+        .distinct()
+    ).fetchall()
+    targets = []
+    for n in notified:
+        if n.recall_source is not None:
+            recall = by_key.get((n.recall_id, n.recall_source))
+            if recall:
+                targets.append((n.user_id, recall))
+        else:
+            # alert archived or predating recall_source: every changed
+            # recall with that id
+            targets.extend(
+                (n.user_id, c) for (rid, _src), c in by_key.items() if rid == n.recall_id
+            )
+    targets = list({(u, c["b_id"], c["b_source"]): (u, c) for u, c in targets}.values())
+    if not targets:
+        return {}
+    send_push(db, [(u, f"Update on recall {c['product']}") for u, c in targets])
+    created = db.execute(
+        alerts.insert().returning(alerts.c.id, alerts.c.recall_id, alerts.c.recall_source),
+        [
+            {
+                "user_id": u,
+                "recall_id": c["b_id"],
+                "recall_source": c["b_source"],
+                "channel": "email",
+                "priority": c["priority"],
+            }
+            for u, c in targets
+        ],
+    ).fetchall()
+    groups: dict[tuple[str, str], list[int]] = {}
+    for a in created:
+        recall = by_key[(a.recall_id, a.recall_source)]
+        key = (recall["priority"], f"Update: {recall['product']} recall")
+        groups.setdefault(key, []).append(a.id)
+    return groups
 
 
 @celery.task
-def poll_remedy_updates() -> None:
-    """Check for remedy updates on recalls."""
-    from datetime import timedelta
-    from backend.utils.remedy import extract_remedy
+def poll_remedy_updates() -> int:
+    """Check remedy pages of recalls that are due and alert on changes.
+
+    Only recalls whose ``next_remedy_check_at`` has passed are selected,
+    ``REMEDY_POLL_BATCH`` at a time. Pages are fetched concurrently with
+    conditional GETs and a per-host cap, and each batch is written back in
+    a single transaction.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import bindparam, inspect
+    from backend.utils.remedy import (
+        REMEDY_POLL_WORKERS,
+        HostLimiter,
+        extract_remedy,
+        fetch_remedy_page,
+    )
 
     with SessionLocal() as db:
-        info = db.execute(text("PRAGMA table_info(recalls)")).fetchall()
-        cols = {r[1] for r in info}
-        has_url = "url" in cols
-        query = "SELECT id, source, product, fetched_at, remedy_updates"
-        if has_url:
-            query += ", url"
-        query += " FROM recalls WHERE source IN ('cpsc','nhtsa')"
-        rows = db.execute(text(query)).fetchall()
-        now = datetime.utcnow()
-        for r in rows:
-            m = r._mapping
-            raw = m["remedy_updates"]
-            updates = raw if isinstance(raw, list) else json.loads(raw or "[]")
-            last = (
-                datetime.fromisoformat(updates[-1]["time"])
-                if updates
-                else datetime.fromisoformat(m["fetched_at"])
-            )
-            if now - last < timedelta(hours=24):
-                continue
-            url = m.get("url")
-            if not url:
-                continue
-            try:
-                html = requests.get(url, timeout=10).text
-            except Exception:
-                continue
-            remedy = extract_remedy(html)
-            if not remedy:
-                continue
-            if updates and updates[-1]["text"].strip() == remedy.strip():
-                continue
-            updates.append({"time": now.isoformat(), "text": remedy.strip()})
-            db.execute(
-                recalls.update()
-                .where(recalls.c.id == m["id"], recalls.c.source == m["source"])
-                .values(remedy_updates=updates)
-            )
-            db.commit()
-            users = db.execute(
-                text(
-                    "SELECT DISTINCT user_id FROM sent_notifications WHERE recall_id=:r"
+        columns = {c["name"] for c in inspect(db.connection()).get_columns("recalls")}
+    if "url" not in columns:
+        return 0
+    by_key = (recalls.c.id == bindparam("b_id")) & (recalls.c.source == bindparam("b_source"))
+    limiter = HostLimiter()
+    changed_total = 0
+    with ThreadPoolExecutor(REMEDY_POLL_WORKERS, thread_name_prefix="remedy") as pool:
+        while True:
+            now = datetime.utcnow()
+            with SessionLocal() as db:
+                rows = _due_remedy_checks(db, now)
+            if not rows:
+                break
+            pages = pool.map(
+                lambda m: fetch_remedy_page(
+                    m["url"], m["remedy_etag"], m["remedy_last_modified"], limiter
                 ),
-                {"r": m["id"]},
-            ).fetchall()
-            message = f"Update on recall {m['product']}"
-            for u in users:
-                _send_push(db, u._mapping["user_id"], message)
-                res = db.execute(
-                    alerts.insert().values(
-                        user_id=u._mapping["user_id"],
-                        recall_id=m["id"],
-                        channel="email",
-                    )
+                rows,
+            )
+            checks, changed = [], []
+            for m, page in zip(rows, pages):
+                key = {"b_id": m["id"], "b_source": m["source"]}
+                checks.append(
+                    {
+                        **key,
+                        "next": (now + REMEDY_CHECK_INTERVAL).isoformat(),
+                        "etag": page.etag,
+                        "last_modified": page.last_modified,
+                    }
                 )
-                subj = f"Update: {m['product']} recall"
-                if os.getenv("CELERY_BROKER_URL"):
-                    send_alert.delay(res.lastrowid, subj)
-                else:
-                    send_alert(res.lastrowid, subj)
+                remedy = extract_remedy(page.html, m["source"]) if page.html else None
+                if not remedy:
+                    continue
+                raw = m["remedy_updates"]
+                updates = raw if isinstance(raw, list) else json.loads(raw or "[]")
+                if updates and updates[-1]["text"].strip() == remedy.strip():
+                    continue
+                updates.append({"time": now.isoformat(), "text": remedy.strip()})
+                changed.append(
+                    {
+                        **key,
+                        "updates": updates,
+                        "product": m["product"],
+                        "priority": recall_priority(m),
+                    }
+                )
+
+            to_send: dict[tuple[str, str], list[int]] = {}
+            with SessionLocal() as db:
+                db.execute(
+                    recalls.update()
+                    .where(by_key)
+                    .values(
+                        next_remedy_check_at=bindparam("next"),
+                        remedy_etag=bindparam("etag"),
+                        remedy_last_modified=bindparam("last_modified"),
+                    ),
+                    checks,
+                )
+                if changed:
+                    db.execute(
+                        recalls.update().where(by_key).values(remedy_updates=bindparam("updates")),
+                        [{k: c[k] for k in ("b_id", "b_source", "updates")} for c in changed],
+                    )
+                    to_send = _queue_remedy_alerts(db, changed)
+                db.commit()
+            for (priority, subject), ids in to_send.items():
+                dispatch_alerts(ids, priority, subject)
+            changed_total += len(changed)
+    return changed_total
 
 
 @celery.task
 def reset_monthly_quotas() -> None:
     """Reset API quotas based on plan at the start of each month."""
+    from backend.utils.quota import reset_quotas
+
     with SessionLocal() as db:
-        db.execute(
-            text(
-                "UPDATE stripe_customers SET quota = CASE plan WHEN 'free' THEN 100 WHEN 'pro' THEN 10000 ELSE quota END"
-            )
-        )
+        reset_quotas(db)
         db.commit()
+
+
+@celery.task
+def maintain_alert_history() -> None:
+    """Create upcoming alert partitions and retire expired history."""
+    from backend.utils.retention import archive_alerts, ensure_alert_partitions
+
+    with SessionLocal() as db:
+        conn = db.connection()
+        ensure_alert_partitions(conn)
+        archive_alerts(conn)
+        db.commit()
+
+
+@celery.task(bind=True, max_retries=TASK_POLICY.attempts)
+def refresh_vin_campaigns(self, vin: str) -> int:
+    """Refresh the cached recall campaigns for one VIN.
+
+    Upstream failures reschedule the task instead of sleeping in the worker.
+    """
+    from backend.utils.nhtsa_vin import refresh_vin_recalls
+
+    try:
+        return len(refresh_vin_recalls(vin, NO_RETRY))
+    except requests.RequestException as exc:
+        raise self.retry(exc=exc, countdown=task_countdown(self.request.retries))
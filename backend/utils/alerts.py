@@ -1,27 +1,106 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Iterator, List, Mapping
 
-from sqlalchemy import text
+from sqlalchemy import literal, select, tuple_
 
-from backend.db.models import alerts
+from backend.db.models import alerts, products, recalls, sent_notifications, user_items
 
+ALERT_BATCH_SIZE = 500
 
-def create_alerts_for_new_recalls(db, new_recalls: List[dict]) -> list[int]:
-    """Insert Alert rows for users impacted by new recalls."""
+
+def create_alerts_for_new_recalls(
+    db, new_recalls: List[Mapping], priority: str | None = None
+) -> list[int]:
+    """Insert Alert rows for users impacted by new recalls.
+
+    Recalls are matched to tracked products on their normalised name keys
+    with one ``INSERT ... SELECT`` per batch, so the cost follows the index
+    on ``products.name_key`` rather than recalls x products. ``priority`` is
+    stored on every alert created.
+    """
+    keys = list(dict.fromkeys((r.get("id"), r.get("source")) for r in new_recalls))
     alert_ids: list[int] = []
-    for r in new_recalls:
-        matched_users = db.execute(
-            text("SELECT DISTINCT user_id FROM products WHERE lower(name)=lower(:p)"),
-            {"p": r.get("product")},
-        ).fetchall()
-        for u in matched_users:
-            res = db.execute(
-                alerts.insert().values(
-                    user_id=u._mapping["user_id"],
-                    recall_id=r.get("id"),
-                    channel="email",
-                )
+    for start in range(0, len(keys), ALERT_BATCH_SIZE):
+        batch = keys[start:start + ALERT_BATCH_SIZE]
+        matches = (
+            select(
+                products.c.user_id, recalls.c.id, recalls.c.source, literal("email"), literal(priority)
+            )
+            .select_from(recalls.join(products, products.c.name_key == recalls.c.product_key))
+            .where(tuple_(recalls.c.id, recalls.c.source).in_(batch))
+            .where(products.c.user_id.is_not(None))
+            .distinct()
+        )
+        res = db.execute(
+            alerts.insert()
+            .from_select(["user_id", "recall_id", "recall_source", "channel", "priority"], matches)
+            .returning(alerts.c.id)
+        )
+        alert_ids.extend(res.scalars())
+    return alert_ids
+
+
+def _changed_recalls(db, since: str | None, until: str) -> Iterator[list[tuple]]:
+    """Yield ``(id, source)`` keys of recalls fetched in ``(since, until]``.
+
+    Keys come in keyset-paginated batches so memory stays bounded.
+    """
+    order = (recalls.c.fetched_at, recalls.c.id, recalls.c.source)
+    last = None
+    while True:
+        stmt = select(*order).where(recalls.c.fetched_at <= until)
+        if since:
+            stmt = stmt.where(recalls.c.fetched_at > since)
+        if last:
+            stmt = stmt.where(tuple_(*order) > tuple_(*last))
+        rows = db.execute(stmt.order_by(*order).limit(ALERT_BATCH_SIZE)).fetchall()
+        if not rows:
+            return
+        yield [(r.id, r.source) for r in rows]
+        if len(rows) < ALERT_BATCH_SIZE:
+            return
+        last = tuple(rows[-1])
+
+
+def create_alerts_for_user_items(db, since: str | None, until: str) -> list[int]:
+    """Insert alerts for user items whose UPC matches a recently fetched recall.
+
+    Each batch of changed recalls is joined to ``user_items`` with a single
+    ``INSERT ... SELECT``. Pairs already in ``sent_notifications`` are
+    skipped, and new pairs are recorded there. Alerts take the recall's
+    stored priority.
+    """
+    alert_ids: list[int] = []
+    for batch in _changed_recalls(db, since, until):
+        already_sent = (
+            select(sent_notifications.c.user_id)
+            .where(
+                sent_notifications.c.user_id == user_items.c.user_id,
+                sent_notifications.c.recall_id == recalls.c.id,
+            )
+            .exists()
+        )
+        matches = (
+            select(
+                user_items.c.user_id, recalls.c.id, recalls.c.source, literal("email"), recalls.c.priority
             )
-            alert_ids.append(res.lastrowid)
+            .select_from(recalls.join(user_items, user_items.c.upc == recalls.c.product))
+            .where(tuple_(recalls.c.id, recalls.c.source).in_(batch))
+            .where(~already_sent)
+            .distinct()
+        )
+        rows = db.execute(
+            alerts.insert()
+            .from_select(["user_id", "recall_id", "recall_source", "channel", "priority"], matches)
+            .returning(alerts.c.id, alerts.c.user_id, alerts.c.recall_id)
+        ).fetchall()
+        if not rows:
+            continue
+        pairs = dict.fromkeys((r.user_id, r.recall_id) for r in rows)
+        db.execute(
+            sent_notifications.insert(),
+            [{"user_id": u, "recall_id": rid} for u, rid in pairs],
+        )
+        alert_ids.extend(r.id for r in rows)
     return alert_ids
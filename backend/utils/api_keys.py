@@ -0,0 +1,140 @@
+"""Partner API key verification.
+
+Keys are stored as SHA-256 digests in ``api_keys.key_hash`` and resolved
+through a bounded in-process cache keyed by that digest. Unknown keys are
+cached too (for a shorter time) so floods of invalid keys do not each cost
+a query.
+
+The cache is per process. Issuing or revoking a key bumps the
+``api_keys_version`` watermark, and every process compares it with the
+version it last saw at most once per ``API_KEY_REVOCATION_POLL`` seconds,
+clearing its cache when it changed. A revoked key is therefore accepted by
+other workers for at most that long (5 seconds by default), not for the
+full ``API_KEY_CACHE_TTL``.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from backend.db.models import api_keys
+from backend.utils.watermarks import get_watermark, set_watermark
+
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "300"))
+API_KEY_NEGATIVE_TTL = float(os.getenv("API_KEY_NEGATIVE_TTL", "30"))
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "50000"))
+API_KEY_REVOCATION_POLL = float(os.getenv("API_KEY_REVOCATION_POLL", "5"))
+VERSION_WATERMARK = "api_keys_version"
+
+_cache: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+_lock = threading.Lock()
+# last api_keys_version seen by this process and when it was read
+_version: dict = {"value": None, "checked": float("-inf")}
+
+
+def hash_api_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _sync_version(db) -> None:
+    """Drop the cache if another process issued or revoked a key."""
+    now = time.monotonic()
+    if now - _version["checked"] < API_KEY_REVOCATION_POLL:
+        return
+    value = get_watermark(db, VERSION_WATERMARK)
+    with _lock:
+        if value != _version["value"]:
+            _cache.clear()
+            _version["value"] = value
+        _version["checked"] = now
+
+
+def _bump_version(db) -> None:
+    set_watermark(db, VERSION_WATERMARK, secrets.token_hex(8))
+
+
+def _remember(key_hash: str, record: dict | None) -> None:
+    ttl = API_KEY_CACHE_TTL if record else API_KEY_NEGATIVE_TTL
+    with _lock:
+        _cache[key_hash] = (time.monotonic() + ttl, record)
+        _cache.move_to_end(key_hash)
+        while len(_cache) > API_KEY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _fetch(db, key: str, key_hash: str) -> dict | None:
+    cols = "SELECT id, org_name, plan, monthly_quota FROM api_keys"
+    row = db.execute(text(f"{cols} WHERE key_hash=:h"), {"h": key_hash}).fetchone()
+    if row is None:
+        # keys created before hashing was introduced are matched once by
+        # their plaintext value and upgraded in place, dropping the plaintext
+        row = db.execute(
+            text(f"{cols} WHERE key=:k AND key_hash IS NULL"), {"k": key}
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute(
+            api_keys.update()
+            .where(api_keys.c.id == row._mapping["id"])
+            .values(key_hash=key_hash, key=None)
+        )
+    return dict(row._mapping)
+
+
+def lookup_api_key(db, key: str | None) -> dict | None:
+    """Return the api_keys record for ``key`` or None when it is unknown.
+
+    The record carries ``id``, ``org_name``, ``plan`` and ``monthly_quota``;
+    usage counters are not cached and go through
+    :func:`backend.utils.quota.consume_api_key_quota`.
+    """
+    if not key:
+        return None
+    _sync_version(db)
+    key_hash = hash_api_key(key)
+    with _lock:
+        hit = _cache.get(key_hash)
+        if hit and hit[0] > time.monotonic():
+            _cache.move_to_end(key_hash)
+            return hit[1]
+    record = _fetch(db, key, key_hash)
+    _remember(key_hash, record)
+    return record
+
+
+def issue_api_key(db, org_name: str, plan: str = "free", monthly_quota: int | None = None) -> str:
+    """Create a key for ``org_name`` and return it; only its hash is stored."""
+    key = secrets.token_urlsafe(32)
+    values = {"org_name": org_name, "key_hash": hash_api_key(key), "plan": plan}
+    if monthly_quota is not None:
+        values["monthly_quota"] = monthly_quota
+    db.execute(api_keys.insert().values(**values))
+    _bump_version(db)
+    invalidate_api_key(key)
+    return key
+
+
+def revoke_api_key(db, key_id: int) -> None:
+    """Delete a key and evict it from every process's cache."""
+    row = db.execute(
+        text("SELECT key_hash FROM api_keys WHERE id=:i"), {"i": key_id}
+    ).fetchone()
+    db.execute(api_keys.delete().where(api_keys.c.id == key_id))
+    _bump_version(db)
+    if row and row._mapping["key_hash"]:
+        invalidate_api_key(key_hash=row._mapping["key_hash"])
+
+
+def invalidate_api_key(key: str | None = None, key_hash: str | None = None) -> None:
+    """Evict a single key (by value or digest) or, with no arguments, all keys."""
+    with _lock:
+        if key is None and key_hash is None:
+            _cache.clear()
+            return
+        _cache.pop(key_hash or hash_api_key(key), None)
@@ -1,27 +1,52 @@
 """Authentication helpers for password hashing and JWT handling."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from os import getenv
 
 from jose import JWTError, jwt
-from passlib.hash import bcrypt
 from functools import wraps
 from flask import request, jsonify
-from sqlalchemy import text
 from backend.utils.db import connect
-from backend.db.models import stripe_customers
+from backend.utils.entitlements import get_entitlement
+from backend.utils.passwords import (  # noqa: F401  re-exported for callers
+    PasswordHasherBusy,
+    PasswordHashTimeout,
+    hash_password,
+    verify_and_update,
+    verify_password,
+)
+from backend.utils.quota import consume_user_quota
 
+JWT_CACHE_SIZE = int(getenv("JWT_CACHE_SIZE", "4096"))
 
-def hash_password(pwd: str) -> str:
-    """Return a bcrypt hash for the given password."""
-    return bcrypt.hash(pwd)
+# sha256(token) -> (payload, exp, kid) for tokens that already verified
+_token_cache: OrderedDict[bytes, tuple[dict, float, str]] = OrderedDict()
+_token_lock = threading.Lock()
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    """Verify a plaintext password against a hash."""
-    try:
-        return bcrypt.verify(plain, hashed)
-    except ValueError:
-        return False
+@lru_cache(maxsize=1)
+def _jwt_keys() -> dict[str, str]:
+    """Return active secrets by key id, the signing secret first.
+
+    ``JWT_SECRET`` signs new tokens; ``JWT_PREVIOUS_SECRETS`` (comma
+    separated) are still accepted so tokens survive a rotation.
+    """
+    secrets = [getenv("JWT_SECRET", "change-me")]
+    secrets += [s.strip() for s in getenv("JWT_PREVIOUS_SECRETS", "").split(",") if s.strip()]
+    return {hashlib.sha256(s.encode()).hexdigest()[:16]: s for s in secrets}
+
+
+def reload_jwt_secrets() -> None:
+    """Re-read secrets from the environment after a rotation.
+
+    Cached tokens stay valid as long as the secret that verified them is
+    still active, so rotation does not force every client to re-verify.
+    """
+    _jwt_keys.cache_clear()
 
 
 def create_access_token(data: dict, expires_minutes: int = 1440) -> str:
@@ -29,19 +54,52 @@ def create_access_token(data: dict, expires_minutes: int = 1440) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
     to_encode["exp"] = expire
-    secret = getenv("JWT_SECRET", "change-me")
-    return jwt.encode(to_encode, secret, algorithm="HS256")
+    kid, secret = next(iter(_jwt_keys().items()))
+    return jwt.encode(to_encode, secret, algorithm="HS256", headers={"kid": kid})
 
 
-def decode_access_token(token: str):
-    """Decode a JWT and return the payload or None."""
-    secret = getenv("JWT_SECRET", "change-me")
+def _verify(token: str, keys: dict[str, str]) -> tuple[dict, str] | None:
     try:
-        return jwt.decode(token, secret, algorithms=["HS256"])
+        kid = jwt.get_unverified_header(token).get("kid")
     except JWTError:
         return None
+    for candidate in [kid] if kid in keys else list(keys):
+        try:
+            return jwt.decode(token, keys[candidate], algorithms=["HS256"]), candidate
+        except JWTError:
+            continue
+    return None
 
 
+def decode_access_token(token: str):
+    """Decode a JWT and return the payload or None.
+
+    Verified tokens are kept in a bounded LRU keyed by their digest and are
+    never returned past their ``exp``.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    keys = _jwt_keys()
+    now = time.time()
+    with _token_lock:
+        hit = _token_cache.get(digest)
+        if hit:
+            payload, exp, kid = hit
+            if exp > now and kid in keys:
+                _token_cache.move_to_end(digest)
+                return dict(payload)
+            del _token_cache[digest]
+    verified = _verify(token, keys)
+    if verified is None:
+        return None
+    payload, kid = verified
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _token_lock:
+            _token_cache[digest] = (dict(payload), float(exp), kid)
+            while len(_token_cache) > JWT_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
 
 def jwt_required(fn):
     """Decorator to protect routes with JWT auth."""
@@ -76,12 +134,7 @@ def require_plan(required: str):
             uid = user.get("user_id")
             if not uid:
                 return jsonify({"error": "unauthorized"}), 401
-            with connect() as conn:
-                row = conn.execute(
-                    text("SELECT plan FROM stripe_customers WHERE user_id=:u"),
-                    {"u": uid},
-                ).fetchone()
-            plan = row._mapping["plan"] if row else "free"
+            plan = get_entitlement(uid).plan
             if tiers.get(plan, 0) < tiers.get(required, 0):
                 return jsonify({"error": "upgrade required"}), 402
             return fn(*args, **kwargs)
@@ -100,31 +153,13 @@ def track_quota(fn):
         uid = user.get("user_id")
         if not uid:
             return jsonify({"error": "unauthorized"}), 401
+        if get_entitlement(uid).plan == "enterprise":
+            return fn(*args, **kwargs)
         with connect() as conn:
-            row = conn.execute(
-                stripe_customers.select().where(stripe_customers.c.user_id == uid)
-            ).fetchone()
-            if not row:
-                conn.execute(
-                    stripe_customers.insert().values(
-                        user_id=uid, plan="free", quota=100, seats=1
-                    )
-                )
-                conn.commit()
-                quota = 100
-                plan = "free"
-            else:
-                quota = row._mapping["quota"]
-                plan = row._mapping["plan"]
-            if plan != "enterprise":
-                if quota <= 0:
-                    return jsonify({"error": "quota exceeded"}), 429
-                conn.execute(
-                    stripe_customers.update()
-                    .where(stripe_customers.c.user_id == uid)
-                    .values(quota=quota - 1)
-                )
-                conn.commit()
+            allowed = consume_user_quota(conn, uid)
+            conn.commit()
+        if not allowed:
+            return jsonify({"error": "quota exceeded"}), 429
         return fn(*args, **kwargs)
 
     return wrapper
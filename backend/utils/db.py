@@ -1,7 +1,21 @@
 """Database helper using SQLAlchemy engine."""
 from sqlalchemy.engine import Connection
-from backend.utils.session import get_engine
+from backend.utils.session import get_engine, get_read_engine
 
 
 def connect() -> Connection:
     return get_engine().connect()
+
+
+def connect_read() -> Connection:
+    """Connect for read-only queries, preferring the replica when healthy."""
+    return get_read_engine().connect()
+
+
+def dialect_insert(conn: Connection, table):
+    """``INSERT`` for ``table`` that supports ``on_conflict_*`` on this dialect."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
@@ -0,0 +1,90 @@
+"""Consolidated digest emails for digest-class alerts.
+
+Digest-class alerts of users whose ``digest_frequency`` is ``hourly`` or
+``daily`` are left unsent by the alert fan-out. :func:`send_digests` renders
+a single email per user and commits that user's alerts as sent right after
+the email goes out, so a failure part way through never resends digests
+that were already delivered. Users opt in through ``/api/digest-preference``;
+the default is ``immediate``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from html import escape
+
+from sqlalchemy import func, select
+
+from backend.db.models import alerts, recalls, users
+from backend.utils.email_utils import send_email, share_context
+
+DIGEST_FREQUENCIES = ("hourly", "daily")
+
+
+def _pending(frequency: str, max_id: int):
+    return (
+        alerts.c.sent_at.is_(None),
+        alerts.c.priority == "digest",
+        alerts.c.id <= max_id,
+        alerts.c.user_id.in_(select(users.c.id).where(users.c.digest_frequency == frequency)),
+    )
+
+
+def send_digests(db, frequency: str, now: datetime | None = None) -> int:
+    """Email each ``frequency`` subscriber their pending digest alerts.
+
+    Alerts created while the digests are being sent are left for the next
+    run. A failed email is recorded in ``alerts.error`` and its alerts stay
+    pending for the next run. Returns the number of alerts sent.
+    """
+    if frequency not in DIGEST_FREQUENCIES:
+        raise ValueError(f"unknown digest frequency: {frequency}")
+    now = now or datetime.utcnow()
+    max_id = db.execute(select(func.max(alerts.c.id))).scalar()
+    if max_id is None:
+        return 0
+    pending = _pending(frequency, max_id)
+    user_ids = (
+        db.execute(select(alerts.c.user_id).where(*pending).distinct().order_by(alerts.c.user_id))
+        .scalars()
+        .all()
+    )
+    included = 0
+    for user_id in user_ids:
+        group = db.execute(
+            select(alerts.c.id, users.c.email, recalls.c.product, recalls.c.source)
+            .join(users, users.c.id == alerts.c.user_id)
+            .outerjoin(
+                recalls,
+                (recalls.c.id == alerts.c.recall_id) & (recalls.c.source == alerts.c.recall_source),
+            )
+            .where(*pending, alerts.c.user_id == user_id)
+            .order_by(alerts.c.id)
+        ).fetchall()
+        if not group:
+            continue
+        ids = [r.id for r in group]
+        items = "\n".join(
+            f"<li>{escape(r.product or 'Unknown product')} ({escape((r.source or '').upper())})</li>"
+            for r in group
+        )
+        try:
+            send_email(
+                group[0].email,
+                f"{len(group)} new recall alerts",
+                "recall_digest.html",
+                {
+                    "count": len(group),
+                    "items": items,
+                    **share_context("Recall alerts for my products – stay safe with RecallHero"),
+                },
+            )
+        except Exception as exc:
+            db.execute(alerts.update().where(alerts.c.id.in_(ids)).values(error=str(exc)))
+            db.commit()
+            continue
+        db.execute(
+            alerts.update().where(alerts.c.id.in_(ids)).values(sent_at=now.isoformat(), error=None)
+        )
+        db.commit()
+        included += len(group)
+    return included
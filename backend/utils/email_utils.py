@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 from os import getenv
+from urllib.parse import quote
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 
@@ -22,6 +23,15 @@ def render_template(name: str, context: dict, lang: str = 'en') -> str:
     return html
 
 
+def share_context(text_copy: str) -> dict:
+    """Template variables for the share links in alert emails."""
+    share_url = f"{getenv('FRONTEND_ORIGIN', '')}/signup?src=share"
+    return {
+        "share_twitter": f"https://twitter.com/intent/tweet?text={quote(text_copy)}&url={quote(share_url)}",
+        "share_facebook": f"https://www.facebook.com/sharer/sharer.php?u={quote(share_url)}&quote={quote(text_copy)}",
+    }
+
+
 def send_email(to_email: str, subject: str, template: str, context: dict, lang: str = 'en') -> None:
     html = render_template(template, context, lang)
     api_key = getenv("SENDGRID_API_KEY")
@@ -0,0 +1,73 @@
+"""Per-process cache of billing entitlements used for request authorization.
+
+Entries live for ``ENTITLEMENT_CACHE_TTL`` seconds. The Stripe webhook
+invalidates a user's entry as soon as their plan changes; other processes
+converge within the TTL.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import text
+
+from backend.utils.db import connect
+from backend.utils.quota import PLAN_QUOTAS
+
+ENTITLEMENT_CACHE_TTL = float(os.getenv("ENTITLEMENT_CACHE_TTL", "30"))
+ENTITLEMENT_CACHE_SIZE = int(os.getenv("ENTITLEMENT_CACHE_SIZE", "10000"))
+
+
+class Entitlement(NamedTuple):
+    plan: str
+    quota: int | None
+    seats: int
+
+
+_cache: OrderedDict[int, tuple[float, Entitlement]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _load(user_id: int) -> Entitlement:
+    with connect() as conn:
+        row = conn.execute(
+            text("SELECT plan, quota, seats FROM stripe_customers WHERE user_id=:u"),
+            {"u": user_id},
+        ).fetchone()
+    if not row:
+        return Entitlement("free", PLAN_QUOTAS["free"], 1)
+    m = row._mapping
+    return Entitlement(m["plan"] or "free", m["quota"], m["seats"] or 1)
+
+
+def get_entitlement(user_id: int) -> Entitlement:
+    """Return the user's plan, quota and seats, from cache when fresh.
+
+    The quota is a snapshot for display; enforcement goes through
+    :func:`backend.utils.quota.consume_user_quota`.
+    """
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(user_id)
+        if hit and hit[0] > now:
+            _cache.move_to_end(user_id)
+            return hit[1]
+    ent = _load(user_id)
+    with _lock:
+        _cache[user_id] = (now + ENTITLEMENT_CACHE_TTL, ent)
+        _cache.move_to_end(user_id)
+        while len(_cache) > ENTITLEMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return ent
+
+
+def invalidate_entitlement(user_id: int | str | None = None) -> None:
+    """Drop one user's cached entitlement, or all of them."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(user_id), None)
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List
 import os
-import time
-import requests
+
+from backend.utils.records import RecallRecord
+from backend.utils.retry import request_items
 
 DRUG_URL = os.getenv(
     "FDA_DRUG_URL",
@@ -17,45 +18,37 @@ DEVICE_URL = os.getenv(
 )
 
 
-def _request(url: str, params: Dict | None = None) -> Dict:
-    for attempt in range(3):
-        try:
-            resp = requests.get(url, params=params or {}, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception:
-            if attempt == 2:
-                raise
-            time.sleep(2**attempt)
-    return {}
+def _request(url: str, params: Dict | None = None) -> Iterator[Dict]:
+    return request_items(url, params or {})
 
 
-def _parse(records: List[Dict], source: str) -> List[Dict]:
-    parsed: List[Dict] = []
+def _parse(records: Iterable[Dict], source: str) -> Iterator[RecallRecord]:
     for r in records:
         recall_id = str(r.get("recall_number", "")).strip()
         recall_id = "".join(ch for ch in recall_id if ch.isdigit())
-        parsed.append(
-            {
-                "source": source,
-                "id": recall_id,
-                "product": r.get("product_description"),
-                "hazard": r.get("reason_for_recall"),
-                "recall_date": r.get("recall_initiation_date"),
-                "url": r.get("link"),
-                "details": {"code_info": r.get("more_code_info") or r.get("code_info")},
-            }
+        yield RecallRecord(
+            source=source,
+            id=recall_id,
+            product=r.get("product_description"),
+            hazard=r.get("reason_for_recall"),
+            classification=r.get("classification"),
+            recall_date=r.get("recall_initiation_date"),
+            url=r.get("link"),
+            details={"code_info": r.get("more_code_info") or r.get("code_info")},
         )
-    return parsed
 
 
-def fetch_drug_recalls() -> List[Dict]:
-    data = _request(DRUG_URL)
-    records = data.get("results") or []
-    return _parse(records, "FDA_DRUG")
+def stream_drug_recalls() -> Iterator[RecallRecord]:
+    return _parse(_request(DRUG_URL), "FDA_DRUG")
+
+
+def stream_device_recalls() -> Iterator[RecallRecord]:
+    return _parse(_request(DEVICE_URL), "FDA_DEVICE")
+
+
+def fetch_drug_recalls() -> List[RecallRecord]:
+    return list(stream_drug_recalls())
 
 
-def fetch_device_recalls() -> List[Dict]:
-    data = _request(DEVICE_URL)
-    records = data.get("results") or []
-    return _parse(records, "FDA_DEVICE")
+def fetch_device_recalls() -> List[RecallRecord]:
+    return list(stream_device_recalls())
@@ -0,0 +1,152 @@
+"""Incremental decoding of large JSON payloads.
+
+Source APIs return ``{"meta": ..., "results": [record, ...]}`` pages and
+the offline caches are bare ``[record, ...]`` arrays. :func:`iter_items`
+yields the records one at a time from a stream of chunks, so only the
+record being decoded (plus one chunk) is held in memory rather than the
+whole document.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+_WS = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text buffer refilled from an iterator of byte or str chunks."""
+
+    def __init__(self, chunks: Iterable[bytes | str]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk; False once the stream is exhausted."""
+        if self.eof:
+            return False
+        # drop what has been consumed so the buffer stays chunk-sized
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+            if chunk:
+                self.text += chunk
+                return True
+        self.text += self._utf8.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of stream), not consumed."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode one complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number touching the end of the buffer may continue in the
+            # next chunk
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def _array_items(buf: _Buffer) -> Iterator[Any]:
+    buf.expect("[")
+    if buf.peek() == "]":
+        buf.pos += 1
+        return
+    while True:
+        yield buf.value()
+        sep = buf.peek()
+        buf.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"expected ',' or ']' at offset {buf.pos - 1}")
+
+
+def iter_items(
+    chunks: Iterable[bytes | str], keys: tuple[str, ...] = ("results",)
+) -> Iterator[Any]:
+    """Yield array elements from a JSON document arriving in ``chunks``.
+
+    A top-level array yields its elements. For a top-level object, the
+    elements of every array stored under one of ``keys`` are yielded and
+    other members are skipped.
+    """
+    buf = _Buffer(chunks)
+    first = buf.peek()
+    if first == "[":
+        yield from _array_items(buf)
+        return
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        key = buf.value()
+        buf.expect(":")
+        if key in keys and buf.peek() == "[":
+            yield from _array_items(buf)
+        else:
+            buf.value()
+        sep = buf.peek()
+        buf.pos += 1
+        if sep == "}":
+            return
+        if sep != ",":
+            raise ValueError(f"expected ',' or '}}' at offset {buf.pos - 1}")
+
+
+def iter_file_items(fh: IO[bytes], keys: tuple[str, ...] = ("results",)) -> Iterator[Any]:
+    """:func:`iter_items` over a file opened in binary mode."""
+    return iter_items(iter(lambda: fh.read(CHUNK_SIZE), b""), keys)
+
+
+def write_items(items: Iterable[Any], path: Path) -> Iterator[Any]:
+    """Pass ``items`` through while saving them to ``path`` as a JSON array.
+
+    The file is only replaced once every item has been written, so an
+    interrupted stream leaves the previous copy in place.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.write("[")
+            for i, item in enumerate(items):
+                if i:
+                    fh.write(",\n")
+                json.dump(item, fh)
+                yield item
+            fh.write("]")
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    tmp.replace(path)
@@ -0,0 +1,21 @@
+"""Prometheus metrics recorded outside the HTTP layer.
+
+Defined here so that utils and task modules don't import from
+``backend.api``; ``/metrics`` in :mod:`backend.api.ops` exports the default
+registry, which includes these.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+SCHEDULER_JOBS = Counter('scheduler_jobs_total', 'Scheduled jobs executed')
+PASSWORD_HASH_LATENCY = Histogram('password_hash_duration_seconds', 'bcrypt hash/verify latency', ['op'])
+PASSWORD_HASH_QUEUE_DEPTH = Gauge('password_hash_queue_depth', 'Password hash jobs queued or running')
+PASSWORD_HASH_REJECTED = Counter('password_hash_rejected_total', 'Password hash jobs rejected because the pool was full')
+PUSH_LATENCY = Histogram('push_send_duration_seconds', 'Push provider request latency', ['provider'])
+PUSH_SENT = Counter('push_messages_total', 'Push messages by delivery status', ['provider', 'status'])
+PUSH_TOKENS_PRUNED = Counter('push_tokens_pruned_total', 'Push tokens deleted after the provider rejected them')
+ALERT_DELIVERY_LATENCY = Histogram(
+    'alert_delivery_seconds',
+    'Time from recall fetch to alert sent',
+    ['priority'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 4 * 3600, 24 * 3600),
+)
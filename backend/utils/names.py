@@ -0,0 +1,21 @@
+"""Normalised product-name keys used to match recalls to products."""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def product_key(name: str | None) -> str | None:
+    """Return ``name`` lowercased with punctuation and runs of whitespace
+    collapsed to single spaces, e.g. ``"Widget-Pro  2000!"`` ->
+    ``"widget pro 2000"``.
+
+    ``recalls.product_key`` and ``products.name_key`` hold this value and
+    must be written alongside the names they are derived from.
+    """
+    if name is None:
+        return None
+    folded = unicodedata.normalize("NFKC", name).casefold()
+    return _NON_WORD.sub(" ", folded).strip()
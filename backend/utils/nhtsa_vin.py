@@ -2,82 +2,253 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List
 import os
 import time
 import requests
-from sqlalchemy import text
 
 from backend.utils import db as db_utils
+from backend.utils.names import product_key
+from backend.utils.priority import recall_priority
+from backend.utils.retry import INTERACTIVE_POLICY, RetryPolicy, request_json
+from backend.utils import vin_cache
+from backend.db.models import recalls as recalls_table
+from backend.utils.vin_cache import VinDecode
 
 VIN_DECODER_URL = os.getenv(
     "VIN_DECODER_URL",
     "https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVinValuesExtended/{vin}?format=json",
 )
+VIN_BATCH_DECODER_URL = os.getenv(
+    "VIN_BATCH_DECODER_URL",
+    "https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVINValuesBatch/",
+)
 RECALL_URL = os.getenv(
     "NHTSA_RECALL_URL",
     "https://api.nhtsa.gov/recalls/recallcampaigns?vin={vin}",
 )
+# vPIC accepts at most 50 VINs per batch decode
+VIN_DECODE_BATCH = 50
+VIN_FETCH_WORKERS = int(os.getenv("VIN_FETCH_WORKERS", "8"))
+# total time a bulk lookup may take; VINs not done by then are reported failed
+VIN_BULK_DEADLINE = float(os.getenv("VIN_BULK_DEADLINE_SECONDS", "25"))
+# typical time of one NHTSA campaign request
+VIN_FETCH_SECONDS = float(os.getenv("VIN_FETCH_SECONDS", "1"))
+# most VINs a bulk request accepts: about what the workers can fetch
+# uncached within the deadline (200 with the defaults)
+VIN_BULK_MAX = int(
+    os.getenv("VIN_BULK_MAX", str(int(VIN_FETCH_WORKERS * VIN_BULK_DEADLINE / VIN_FETCH_SECONDS)))
+)
+
+
+def _request(url: str, data: Dict | None = None, policy: RetryPolicy = INTERACTIVE_POLICY) -> Dict:
+    return request_json(url, data=data, policy=policy)
+
+
+def _decode_result(result: Dict) -> VinDecode:
+    return VinDecode(result.get("Make", ""), result.get("Model", ""), result.get("ModelYear", ""))
+
+
+def _fetch_decode(vin: str, policy: RetryPolicy = INTERACTIVE_POLICY) -> VinDecode:
+    results = _request(VIN_DECODER_URL.format(vin=vin), policy=policy).get("Results") or []
+    return _decode_result(results[0] if results else {})
+
 
+def _fetch_decodes(
+    vins: List[str], deadline: float | None = None
+) -> tuple[Dict[str, VinDecode], List[str]]:
+    """Decode VINs with vPIC's batch endpoint, 50 per request.
 
-def _request(url: str) -> Dict:
-    for attempt in range(3):
+    Returns the decodes and the VINs that could not be decoded because
+    their batch failed or ``deadline`` (a ``time.monotonic()`` value)
+    passed first.
+    """
+    decodes: Dict[str, VinDecode] = {}
+    failed: List[str] = []
+    for start in range(0, len(vins), VIN_DECODE_BATCH):
+        batch = vins[start:start + VIN_DECODE_BATCH]
+        if deadline is not None and time.monotonic() >= deadline:
+            failed.extend(batch)
+            continue
         try:
-            resp = requests.get(url, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception:
-            if attempt == 2:
-                raise
-            time.sleep(2**attempt)
-    return {}
+            data = _request(VIN_BATCH_DECODER_URL, {"format": "json", "data": ";".join(batch)})
+        except requests.RequestException:
+            failed.extend(batch)
+            continue
+        for result in data.get("Results") or []:
+            vin = (result.get("VIN") or "").upper()
+            if vin:
+                decodes[vin] = _decode_result(result)
+    return decodes, failed
 
 
-def get_recalls_for_vin(vin: str) -> List[Dict]:
-    """Decode a VIN and insert related recalls if new."""
-    info = _request(VIN_DECODER_URL.format(vin=vin))
-    make = model = year = ""
-    results = info.get("Results") or []
-    if results:
-        first = results[0]
-        make = first.get("Make", "")
-        model = first.get("Model", "")
-        year = first.get("ModelYear", "")
-    data = _request(RECALL_URL.format(vin=vin))
-    records = data.get("results") or data.get("Results") or []
-    recalls: List[Dict] = []
-    conn = db_utils.connect()
-    trans = conn.begin()
-    for r in records:
-        rid = str(r.get("NHTSACampaignNumber") or r.get("RecallID"))
-        recall = {
+def _fetch_campaigns(vin: str, policy: RetryPolicy = INTERACTIVE_POLICY) -> List[Dict]:
+    data = _request(RECALL_URL.format(vin=vin), policy=policy)
+    return data.get("results") or data.get("Results") or []
+
+
+def _recalls_from(records: List[Dict], decode: VinDecode) -> List[Dict]:
+    make, model, year = decode
+    return [
+        {
             "source": "NHTSA_VIN",
-            "id": rid,
+            "id": str(r.get("NHTSACampaignNumber") or r.get("RecallID")),
             "product": f"{make} {model} {year}".strip(),
             "hazard": r.get("Summary"),
             "recall_date": r.get("ReportReceivedDate") or r.get("RecallDate"),
             "url": r.get("NHTSAActionNumber"),
         }
-        existing = conn.execute(
-            text("SELECT id FROM recalls WHERE id=:id AND source=:src"),
-            {"id": recall["id"], "src": recall["source"]},
-        ).fetchone()
-        if not existing:
-            conn.execute(
-                text(
-                    "INSERT INTO recalls (id, product, hazard, recall_date, source, fetched_at) "
-                    "VALUES (:id, :product, :hazard, :date, :source, :f)"
-                ),
+        for r in records
+    ]
+
+
+def _store(conn, decodes: Dict[str, VinDecode], campaigns: Dict[str, List[Dict]]) -> None:
+    """Write decodes, campaign caches and new recalls.
+
+    Recalls are inserted with a single ``ON CONFLICT DO NOTHING`` statement;
+    rows that already exist are left untouched.
+    """
+    # vPIC answers unknown VINs with empty fields; don't pin those forever
+    vin_cache.put_decodes(conn, {v: d for v, d in decodes.items() if d.make})
+    vin_cache.put_campaigns_many(conn, campaigns)
+    fetched_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    rows = {}
+    for recalls in campaigns.values():
+        for recall in recalls:
+            rows.setdefault(
+                (recall["id"], recall["source"]),
                 {
                     "id": recall["id"],
                     "product": recall["product"],
+                    "product_key": product_key(recall["product"]),
                     "hazard": recall["hazard"],
-                    "date": recall["recall_date"],
+                    "recall_date": recall["recall_date"],
                     "source": recall["source"],
-                    "f": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "fetched_at": fetched_at,
+                    "priority": recall_priority(recall),
                 },
             )
-        recalls.append(recall)
-    trans.commit()
+    if rows:
+        conn.execute(
+            db_utils.dialect_insert(conn, recalls_table).on_conflict_do_nothing(
+                index_elements=["id", "source"]
+            ),
+            list(rows.values()),
+        )
+
+
+def refresh_vin_recalls(vin: str, policy: RetryPolicy = INTERACTIVE_POLICY) -> List[Dict]:
+    """Fetch campaigns for ``vin`` from NHTSA and update both caches.
+
+    The decode (skipped when cached) and the campaign request run
+    concurrently, each under ``policy``.
+    """
+    conn = db_utils.connect_read()
+    decode = vin_cache.get_decode(conn, vin)
+    conn.close()
+    with ThreadPoolExecutor(2, thread_name_prefix="vin") as pool:
+        records = pool.submit(_fetch_campaigns, vin, policy)
+        decodes = {} if decode else {vin: pool.submit(_fetch_decode, vin, policy).result()}
+        records = records.result()
+    recalls = _recalls_from(records, decode or decodes[vin])
+    conn = db_utils.connect()
+    with conn.begin():
+        _store(conn, decodes, {vin: recalls})
     conn.close()
     return recalls
+
+
+def get_recalls_for_vin(vin: str) -> List[Dict]:
+    """Recalls for a VIN, served from the campaign cache when possible.
+
+    Expired entries are still returned and refreshed in the background
+    (inline when no Celery broker is configured, falling back to the
+    expired entry if NHTSA is unavailable). Only the request that claims
+    the expired entry starts the refresh.
+    """
+    conn = db_utils.connect_read()
+    cached = vin_cache.get_campaigns(conn, vin)
+    conn.close()
+    if cached is None:
+        return refresh_vin_recalls(vin)
+    if not cached.fresh:
+        conn = db_utils.connect()
+        with conn.begin():
+            claimed = vin_cache.claim_campaign_refresh(conn, vin, cached.fetched_at)
+        conn.close()
+        if not claimed:
+            return cached.recalls
+        if os.getenv("CELERY_BROKER_URL"):
+            from backend.tasks import refresh_vin_campaigns
+
+            refresh_vin_campaigns.delay(vin)
+        else:
+            try:
+                return refresh_vin_recalls(vin)
+            except requests.RequestException:
+                pass
+    return cached.recalls
+
+
+def get_recalls_for_vins(
+    vins: Iterable[str], deadline: float | None = None
+) -> Dict[str, List[Dict] | None]:
+    """Recalls for many VINs at once, keyed by upper-cased VIN.
+
+    VINs are deduplicated and fresh cache entries are used as is. Missing
+    decodes go through vPIC's batch decoder, campaigns are fetched on
+    ``VIN_FETCH_WORKERS`` threads and all new recalls are written in one
+    statement. The whole lookup is bounded by ``deadline`` seconds
+    (``VIN_BULK_DEADLINE`` by default).
+
+    VINs whose campaign request failed or didn't finish in time map to
+    ``None``. If a decode batch fails, its VINs are still answered with
+    empty product names but nothing is cached for them.
+
+    Fetches not yet started at the deadline are cancelled. The at most
+    ``VIN_FETCH_WORKERS`` already in flight are abandoned, not interrupted,
+    and finish within the upstream timeout; their results are discarded.
+    Callers should keep batches within ``VIN_BULK_MAX`` so few VINs are
+    left at the deadline.
+    """
+    end = time.monotonic() + (VIN_BULK_DEADLINE if deadline is None else deadline)
+    vins = list(dict.fromkeys(v.upper() for v in vins))
+    conn = db_utils.connect_read()
+    cached = vin_cache.get_campaigns_many(conn, vins)
+    results: Dict[str, List[Dict] | None] = {
+        vin: c.recalls for vin, c in cached.items() if c.fresh
+    }
+    todo = [vin for vin in vins if vin not in results]
+    known = vin_cache.get_decodes(conn, todo)
+    conn.close()
+    if not todo:
+        return results
+
+    # one VIN per prefix is enough to decode the rest
+    to_decode = list({vin_cache.vin_prefix(v): v for v in todo if v not in known}.values())
+    pool = ThreadPoolExecutor(min(VIN_FETCH_WORKERS, len(todo)), thread_name_prefix="vin")
+    try:
+        pending = {vin: pool.submit(_fetch_campaigns, vin) for vin in todo}
+        fetched, undecoded = _fetch_decodes(to_decode, end) if to_decode else ({}, [])
+        wait(pending.values(), timeout=max(end - time.monotonic(), 0))
+    finally:
+        # don't hold the request for campaign fetches past the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+    by_prefix = {vin_cache.vin_prefix(v): d for v, d in fetched.items()}
+    undecoded_prefixes = {vin_cache.vin_prefix(v) for v in undecoded}
+    campaigns: Dict[str, List[Dict]] = {}
+    for vin, future in pending.items():
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            results[vin] = None
+            continue
+        prefix = vin_cache.vin_prefix(vin)
+        decode = known.get(vin) or by_prefix.get(prefix, VinDecode("", "", ""))
+        results[vin] = _recalls_from(future.result(), decode)
+        if vin in known or prefix not in undecoded_prefixes:
+            campaigns[vin] = results[vin]
+    conn = db_utils.connect()
+    with conn.begin():
+        _store(conn, fetched, campaigns)
+    conn.close()
+    return {vin: results[vin] for vin in vins}
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Mapping
 from sqlalchemy import text
 from os import getenv
 import requests
+from backend.utils.priority import recall_priority
 from backend.utils.session import SessionLocal
 
 from backend.db.models import sent_notifications, alerts
@@ -11,7 +12,7 @@ from backend.db.models import sent_notifications, alerts
 
 
 
-def match_subscriptions(db, recall: dict) -> List[dict]:
+def match_subscriptions(db, recall: Mapping) -> List[dict]:
     query = text(
         "SELECT s.user_id, s.product_query FROM subscriptions s "
         "JOIN users u ON s.user_id=u.id "
@@ -22,8 +23,9 @@ def match_subscriptions(db, recall: dict) -> List[dict]:
     return [dict(r._mapping) for r in rows]
 
 
-def queue_notifications(db, recall: dict) -> int:
+def queue_notifications(db, recall: Mapping) -> int:
     matches = match_subscriptions(db, recall)
+    priority = recall_priority(recall)
     sent = 0
     for m in matches:
         with SessionLocal() as session:
@@ -37,7 +39,13 @@ def queue_notifications(db, recall: dict) -> int:
                 sent_notifications.insert().values(user_id=m["user_id"], recall_id=recall.get("id"))
             )
             res = session.execute(
-                alerts.insert().values(user_id=m["user_id"], recall_id=recall.get("id"), channel="email")
+                alerts.insert().values(
+                    user_id=m["user_id"],
+                    recall_id=recall.get("id"),
+                    recall_source=recall.get("source"),
+                    channel="email",
+                    priority=priority,
+                )
             )
             session.commit()
             slack = getenv("SLACK_WEBHOOK_URL")
@@ -52,8 +60,14 @@ def queue_notifications(db, recall: dict) -> int:
                 except Exception:
                     pass
             if getenv("CELERY_BROKER_URL"):
-                from backend.tasks import send_alert
-                send_alert.delay(res.lastrowid)
+                from backend.tasks import ALERT_QUEUES, send_alert, send_digest_alert_batch
+                if priority == "urgent":
+                    send_alert.apply_async(
+                        (res.lastrowid, None, priority), queue=ALERT_QUEUES[priority]
+                    )
+                else:
+                    # digest subscribers get this alert in their next digest
+                    send_digest_alert_batch.delay([res.lastrowid])
             sent += 1
         SessionLocal.remove()
     return sent
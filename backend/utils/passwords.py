@@ -0,0 +1,100 @@
+"""Password hashing on a dedicated, bounded bcrypt thread pool.
+
+The calling request thread still waits for its job, but bcrypt releases
+the GIL, so other threads keep running while it does, and the pool bounds
+how much CPU a burst of logins can take. When
+the pool and its queue are full new jobs are rejected with
+:class:`PasswordHasherBusy` instead of piling up behind each other, and a
+job that doesn't finish within ``PASSWORD_HASH_TIMEOUT`` raises
+:class:`PasswordHashTimeout`.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from os import getenv
+from time import perf_counter
+
+from passlib.hash import bcrypt
+
+from backend.utils.metrics import (
+    PASSWORD_HASH_LATENCY,
+    PASSWORD_HASH_QUEUE_DEPTH,
+    PASSWORD_HASH_REJECTED,
+)
+
+BCRYPT_ROUNDS = int(getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE = int(getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_TIMEOUT = float(getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+_hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hash jobs are already pending."""
+
+
+class PasswordHashTimeout(RuntimeError):
+    """Raised when a hash job doesn't finish within PASSWORD_HASH_TIMEOUT."""
+
+
+def _release(_future) -> None:
+    PASSWORD_HASH_QUEUE_DEPTH.dec()
+    _slots.release()
+
+
+def _run(op: str, fn, *args):
+    if not _slots.acquire(blocking=False):
+        PASSWORD_HASH_REJECTED.inc()
+        raise PasswordHasherBusy(op)
+    PASSWORD_HASH_QUEUE_DEPTH.inc()
+
+    def timed():
+        start = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            PASSWORD_HASH_LATENCY.labels(op=op).observe(perf_counter() - start)
+
+    future = _executor.submit(timed)
+    future.add_done_callback(_release)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        # the job keeps its slot until it finishes; only this caller gives up
+        raise PasswordHashTimeout(op) from None
+
+
+def hash_password(pwd: str) -> str:
+    """Return a bcrypt hash using the configured work factor."""
+    return _run("hash", _hasher.hash, pwd)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    """Verify a plaintext password against a hash."""
+    try:
+        return _run("verify", _hasher.verify, plain, hashed)
+    except ValueError:
+        return False
+
+
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Verify a password and return a new hash if the work factor changed.
+
+    The rehash is best effort: when the pool is busy the old hash is kept
+    and upgraded on a later login rather than failing a correct one.
+    """
+    if not verify_password(plain, hashed):
+        return False, None
+    if _hasher.needs_update(hashed):
+        try:
+            return True, hash_password(plain)
+        except (PasswordHasherBusy, PasswordHashTimeout):
+            return True, None
+    return True, None
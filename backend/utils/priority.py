@@ -1,6 +1,23 @@
+"""Recall priority classification.
+
+A recall is ``urgent`` when it is FDA Class I or its hazard mentions one of
+the priority keywords, otherwise ``digest``. Keywords can be set per source
+with ``PRIORITY_KEYWORDS_<SOURCE>`` (comma separated, e.g.
+``PRIORITY_KEYWORDS_NHTSA=fire,crash``); sources without their own list
+use ``PRIORITY_KEYWORDS``. Each keyword list is compiled into a single
+regex so a hazard is scanned once however many keywords there are.
+"""
 from __future__ import annotations
 
-from typing import Protocol
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Iterable, Mapping, Protocol
+
+DEFAULT_KEYWORDS = ("fire", "burn", "choking", "death")
+PRIORITIES = ("urgent", "digest")
 
 
 class RecallProto(Protocol):
@@ -8,13 +25,70 @@ class RecallProto(Protocol):
     hazard: str | None
 
 
-def classify_recall(recall: RecallProto) -> str:
-    """Return 'urgent' if recall is high priority else 'digest'."""
-    classification = (recall.classification or "").lower()
-    hazard = (recall.hazard or "").lower()
-    if classification == "class i":
+def keywords_for(source: str | None) -> tuple[str, ...]:
+    """Priority keywords configured for ``source``."""
+    raw = os.getenv(f"PRIORITY_KEYWORDS_{(source or '').upper()}") if source else None
+    if raw is None:
+        raw = os.getenv("PRIORITY_KEYWORDS")
+    if raw is None:
+        return DEFAULT_KEYWORDS
+    return tuple(k.strip().lower() for k in raw.split(",") if k.strip())
+
+
+@lru_cache(maxsize=None)
+def _compile(keywords: tuple[str, ...]) -> re.Pattern | None:
+    if not keywords:
+        return None
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+def _classify(classification: str | None, hazard: str | None, pattern: re.Pattern | None) -> str:
+    if (classification or "").lower() == "class i":
         return "urgent"
-    keywords = ["fire", "burn", "choking", "death"]
-    if any(word in hazard for word in keywords):
+    if pattern is not None and hazard and pattern.search(hazard):
         return "urgent"
     return "digest"
+
+
+def classify_recall(recall: RecallProto) -> str:
+    """Return 'urgent' if recall is high priority else 'digest'."""
+    pattern = _compile(keywords_for(getattr(recall, "source", None)))
+    return _classify(recall.classification, recall.hazard, pattern)
+
+
+def classify_recalls(recalls: Iterable[Mapping]) -> list[str]:
+    """Classify a batch of recall mappings, one priority per recall.
+
+    Keyword patterns are resolved once per source for the whole batch.
+    """
+    patterns: dict[str | None, re.Pattern | None] = {}
+    priorities = []
+    for r in recalls:
+        source = r.get("source")
+        if source not in patterns:
+            patterns[source] = _compile(keywords_for(source))
+        priorities.append(_classify(r.get("classification"), r.get("hazard"), patterns[source]))
+    return priorities
+
+
+def priority_counts(priorities: Iterable[str]) -> dict[str, int]:
+    """Count of each priority class, including classes with no recalls."""
+    counts = Counter(priorities)
+    return {p: counts.get(p, 0) for p in PRIORITIES}
+
+
+def recall_priority(recall: Mapping) -> str:
+    """Priority of a recall dict or row mapping.
+
+    The ``priority`` stored at ingestion is used when present.
+    """
+    stored = recall.get("priority")
+    if stored:
+        return stored
+    return classify_recall(
+        SimpleNamespace(
+            classification=recall.get("classification"),
+            hazard=recall.get("hazard"),
+            source=recall.get("source"),
+        )
+    )
@@ -0,0 +1,171 @@
+"""Push notification delivery.
+
+Messages are grouped by text, split into provider-sized multicast batches
+and sent concurrently. Tokens the provider reports as unregistered are
+deleted from ``push_tokens``. ``PUSH_PROVIDER`` selects the provider:
+``expo`` (the mobile app registers Expo push tokens), ``log`` (print, the
+default for local development) or ``fake`` (records sends for tests).
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from time import perf_counter
+from typing import NamedTuple
+
+import requests
+from sqlalchemy import select
+
+from backend.utils.metrics import PUSH_LATENCY, PUSH_SENT, PUSH_TOKENS_PRUNED
+from backend.db.models import push_tokens
+
+PUSH_WORKERS = int(getenv("PUSH_WORKERS", "8"))
+EXPO_PUSH_URL = getenv("EXPO_PUSH_URL", "https://exp.host/--/api/v2/push/send")
+
+
+class PushResult(NamedTuple):
+    """Per-batch outcome; ``invalid`` tokens should be forgotten."""
+
+    sent: int
+    failed: int
+    invalid: list[str]
+
+
+class PushProvider(ABC):
+    """Sends one multicast batch of at most ``max_batch`` tokens."""
+
+    name = "base"
+    max_batch = 500
+
+    @abstractmethod
+    def send(self, tokens: list[str], message: str) -> PushResult:
+        """Deliver ``message`` to ``tokens``."""
+
+
+class LogPushProvider(PushProvider):
+    name = "log"
+
+    def send(self, tokens: list[str], message: str) -> PushResult:
+        for token in tokens:
+            print("push", token, message)
+        return PushResult(len(tokens), 0, [])
+
+
+class FakePushProvider(PushProvider):
+    """Records batches; tokens in ``unregistered`` are reported invalid."""
+
+    name = "fake"
+
+    def __init__(self, max_batch: int = 500, unregistered: set[str] | None = None):
+        self.max_batch = max_batch
+        self.unregistered = set(unregistered or ())
+        self.batches: list[tuple[list[str], str]] = []
+
+    def send(self, tokens: list[str], message: str) -> PushResult:
+        self.batches.append((list(tokens), message))
+        invalid = [t for t in tokens if t in self.unregistered]
+        return PushResult(len(tokens) - len(invalid), 0, invalid)
+
+
+class ExpoPushProvider(PushProvider):
+    """Expo push service; accepts up to 100 messages per request."""
+
+    name = "expo"
+    max_batch = 100
+
+    def __init__(self, access_token: str | None = None, timeout: float = 10):
+        self.access_token = access_token or getenv("EXPO_ACCESS_TOKEN")
+        self.timeout = timeout
+
+    def send(self, tokens: list[str], message: str) -> PushResult:
+        headers = {"Accept": "application/json"}
+        if self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        payload = [{"to": t, "title": "Recall alert", "body": message} for t in tokens]
+        try:
+            resp = requests.post(EXPO_PUSH_URL, json=payload, headers=headers, timeout=self.timeout)
+            resp.raise_for_status()
+            tickets = resp.json().get("data", [])
+        except Exception:
+            return PushResult(0, len(tokens), [])
+        sent, failed, invalid = 0, 0, []
+        for token, ticket in zip(tokens, tickets):
+            if ticket.get("status") == "ok":
+                sent += 1
+            elif (ticket.get("details") or {}).get("error") == "DeviceNotRegistered":
+                invalid.append(token)
+            else:
+                failed += 1
+        failed += len(tokens) - len(tickets)
+        return PushResult(sent, failed, invalid)
+
+
+PROVIDERS = {"expo": ExpoPushProvider, "log": LogPushProvider, "fake": FakePushProvider}
+_provider: PushProvider | None = None
+
+
+def get_provider() -> PushProvider:
+    global _provider
+    if _provider is None:
+        _provider = PROVIDERS[getenv("PUSH_PROVIDER", "log")]()
+    return _provider
+
+
+def set_provider(provider: PushProvider | None) -> None:
+    """Replace the provider, or reset to ``PUSH_PROVIDER`` with None."""
+    global _provider
+    _provider = provider
+
+
+def _timed_send(provider: PushProvider, tokens: list[str], message: str) -> PushResult:
+    start = perf_counter()
+    try:
+        return provider.send(tokens, message)
+    except Exception:
+        return PushResult(0, len(tokens), [])
+    finally:
+        PUSH_LATENCY.labels(provider=provider.name).observe(perf_counter() - start)
+
+
+def send_push(db, messages: list[tuple[int, str]]) -> PushResult:
+    """Deliver ``(user_id, text)`` pairs to every token of each user.
+
+    Tokens are loaded with one query. Tokens reported invalid are deleted
+    from ``push_tokens`` in the caller's transaction.
+    """
+    if not messages:
+        return PushResult(0, 0, [])
+    provider = get_provider()
+    rows = db.execute(
+        select(push_tokens.c.user_id, push_tokens.c.token).where(
+            push_tokens.c.user_id.in_({user_id for user_id, _ in messages})
+        )
+    )
+    tokens: dict[int, list[str]] = {}
+    for user_id, token in rows:
+        tokens.setdefault(user_id, []).append(token)
+    by_message: dict[str, list[str]] = {}
+    for user_id, message in messages:
+        by_message.setdefault(message, []).extend(tokens.get(user_id, ()))
+
+    jobs = []
+    for message, recipients in by_message.items():
+        recipients = list(dict.fromkeys(recipients))
+        for i in range(0, len(recipients), provider.max_batch):
+            jobs.append((recipients[i:i + provider.max_batch], message))
+    if not jobs:
+        return PushResult(0, 0, [])
+    with ThreadPoolExecutor(min(PUSH_WORKERS, len(jobs)), thread_name_prefix="push") as pool:
+        results = list(pool.map(lambda job: _timed_send(provider, *job), jobs))
+
+    sent = sum(r.sent for r in results)
+    failed = sum(r.failed for r in results)
+    invalid = [t for r in results for t in r.invalid]
+    PUSH_SENT.labels(provider=provider.name, status="ok").inc(sent)
+    PUSH_SENT.labels(provider=provider.name, status="error").inc(failed)
+    PUSH_SENT.labels(provider=provider.name, status="invalid").inc(len(invalid))
+    if invalid:
+        db.execute(push_tokens.delete().where(push_tokens.c.token.in_(invalid)))
+        PUSH_TOKENS_PRUNED.inc(len(invalid))
+    return PushResult(sent, failed, invalid)
@@ -0,0 +1,86 @@
+"""Atomic quota accounting for metered API requests.
+
+Each metered request is a single conditional ``UPDATE`` so concurrent
+requests never read-modify-write the counters in Python and never lose
+updates; the row lock is held only for the duration of that statement.
+"""
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from backend.db.models import stripe_customers
+
+PLAN_QUOTAS = {"free": 100, "pro": 10000}
+
+
+def _consume_existing(conn, user_id: int) -> bool | None:
+    """Charge an existing billing row; None when the user has no row yet."""
+    res = conn.execute(
+        text(
+            "UPDATE stripe_customers SET quota = quota - 1 "
+            "WHERE user_id=:u AND coalesce(plan, 'free') != 'enterprise' AND quota > 0"
+        ),
+        {"u": user_id},
+    )
+    if res.rowcount:
+        return True
+    row = conn.execute(
+        text("SELECT plan FROM stripe_customers WHERE user_id=:u"), {"u": user_id}
+    ).fetchone()
+    if row is None:
+        return None
+    return row._mapping["plan"] == "enterprise"
+
+
+def consume_user_quota(conn, user_id: int) -> bool:
+    """Decrement a user's monthly quota, returning False when exhausted.
+
+    Enterprise plans are unmetered. Users without a billing row get a free
+    plan row created on first use.
+    """
+    allowed = _consume_existing(conn, user_id)
+    if allowed is not None:
+        return allowed
+    try:
+        with conn.begin_nested():
+            conn.execute(
+                stripe_customers.insert().values(
+                    user_id=user_id,
+                    plan="free",
+                    quota=PLAN_QUOTAS["free"] - 1,
+                    seats=1,
+                )
+            )
+    except IntegrityError:
+        # another request may have created the row first; charge it once.
+        # Any other integrity failure (e.g. an unknown user) is re-raised.
+        allowed = _consume_existing(conn, user_id)
+        if allowed is None:
+            raise
+        return allowed
+    return True
+
+
+def consume_api_key_quota(conn, key_id: int) -> bool:
+    """Count one partner request, returning False when over quota."""
+    res = conn.execute(
+        text(
+            "UPDATE api_keys SET requests_this_month = requests_this_month + 1 "
+            "WHERE id=:k AND requests_this_month < monthly_quota"
+        ),
+        {"k": key_id},
+    )
+    return bool(res.rowcount)
+
+
+def reset_quotas(conn) -> None:
+    """Restore monthly allowances for users and partner API keys."""
+    conn.execute(
+        text(
+            "UPDATE stripe_customers SET quota = CASE plan "
+            "WHEN 'free' THEN :free WHEN 'pro' THEN :pro ELSE quota END"
+        ),
+        {"free": PLAN_QUOTAS["free"], "pro": PLAN_QUOTAS["pro"]},
+    )
+    conn.execute(text("UPDATE api_keys SET requests_this_month = 0"))
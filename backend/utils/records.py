@@ -0,0 +1,64 @@
+"""Compact in-memory representation of fetched recalls.
+
+Fetchers yield :class:`RecallRecord` instances rather than one dict per
+record. The class uses ``__slots__``, so a record carries no per-instance
+``__dict__`` or repeated key strings, and source names are interned so
+every record of a feed shares one string.
+
+Records also behave as read-only mappings with item assignment, so code
+written against recall dicts (``r.get("hazard")``, ``r["priority"] = p``)
+keeps working. Use ``dict(record)`` at boundaries that need real dicts,
+such as Celery arguments and JSON request bodies.
+"""
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator
+
+
+@dataclass(slots=True, eq=False)
+class RecallRecord(Mapping):
+    source: str
+    id: str | None
+    product: str | None = None
+    hazard: str | None = None
+    recall_date: str | None = None
+    url: str | None = None
+    title: str | None = None
+    classification: str | None = None
+    details: Dict[str, Any] | None = None
+    priority: str | None = None
+
+    def __post_init__(self) -> None:
+        self.source = sys.intern(self.source)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "RecallRecord":
+        """Build a record from a recall dict, ignoring unknown keys."""
+        return cls(**{k: data[k] for k in _FIELDS if k in data})
+
+
+_FIELDS = tuple(f.name for f in fields(RecallRecord))
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterator, List
 from datetime import datetime
 
 
@@ -10,32 +12,39 @@ import os
 from sqlalchemy import text
 
 
-from backend.api.recalls import fetch_cpsc, fetch_fda, fetch_nhtsa, fetch_usda
+from backend.api.recalls import stream_cpsc, stream_fda, stream_nhtsa, stream_usda
 from backend.utils.fetch_fda_enforcement import (
-    fetch_device_recalls,
-    fetch_drug_recalls,
+    stream_device_recalls,
+    stream_drug_recalls,
 )
 from backend.utils import db as db_utils
 from backend.utils.alerts import create_alerts_for_new_recalls
-from backend.tasks import send_alert, send_notifications
+from backend.utils.names import product_key
+from backend.utils.records import RecallRecord
+from backend.utils.priority import classify_recalls, priority_counts
+from backend.tasks import dispatch_alerts, send_notifications
 from backend.utils.ai_summary import summarize_recall
 
 
-def refresh_recalls() -> Dict[str, int]:
-    """Fetch latest recalls and upsert into the database."""
-    conn = db_utils.connect()
-    trans = conn.begin()
-    new = 0
-    updated = 0
-    new_recall_rows: List[Dict] = []
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "500"))
+
 
-    recalls: List[Dict] = []
-    for func in (fetch_cpsc, fetch_fda, fetch_nhtsa, fetch_usda):
-        recalls.extend(func(use_cache=False))
-    recalls.extend(fetch_drug_recalls())
-    recalls.extend(fetch_device_recalls())
+def _stream_recalls() -> Iterator[RecallRecord]:
+    for func in (stream_cpsc, stream_fda, stream_nhtsa, stream_usda):
+        yield from func(use_cache=False)
+    yield from stream_drug_recalls()
+    yield from stream_device_recalls()
 
-    for r in recalls:
+
+def _batches(records: Iterator[RecallRecord], size: int) -> Iterator[List[RecallRecord]]:
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _upsert(conn, batch: List[RecallRecord]) -> List[RecallRecord]:
+    """Insert or update one batch of recalls; returns the new ones."""
+    new_rows: List[RecallRecord] = []
+    for r in batch:
         existing = conn.execute(
             text("SELECT hazard FROM recalls WHERE id=:id AND source=:source"),
             {"id": r.get("id"), "source": r.get("source")},
@@ -48,6 +57,7 @@ def refresh_recalls() -> Dict[str, int]:
         params = {
             "id": r.get("id"),
             "product": r.get("product"),
+            "key": product_key(r.get("product")),
             "hazard": r.get("hazard"),
             "date": r.get("recall_date"),
             "source": r.get("source"),
@@ -55,41 +65,79 @@ def refresh_recalls() -> Dict[str, int]:
             "summary": summary,
             "next": next_step,
             "updates": "[]",
+            "priority": r["priority"],
         }
 
         if existing:
             conn.execute(
                 text(
-                    "UPDATE recalls SET product=:product, hazard=:hazard, recall_date=:date, fetched_at=:f, summary_text=:summary, next_steps=:next WHERE id=:id AND source=:source"
+                    "UPDATE recalls SET product=:product, product_key=:key, hazard=:hazard, recall_date=:date, priority=:priority, fetched_at=:f, summary_text=:summary, next_steps=:next WHERE id=:id AND source=:source"
                 ),
                 params,
             )
-            updated += 1
         else:
             conn.execute(
                 text(
-                    "INSERT INTO recalls (id, product, hazard, recall_date, source, fetched_at, summary_text, next_steps, remedy_updates) VALUES (:id, :product, :hazard, :date, :source, :f, :summary, :next, :updates)"
+                    "INSERT INTO recalls (id, product, product_key, hazard, recall_date, source, fetched_at, summary_text, next_steps, remedy_updates, priority) VALUES (:id, :product, :key, :hazard, :date, :source, :f, :summary, :next, :updates, :priority)"
                 ),
                 params,
             )
-            new += 1
-            new_recall_rows.append(r)
-    trans.commit()
-    alert_ids = create_alerts_for_new_recalls(conn, recalls)
-    if os.getenv("CELERY_BROKER_URL"):
-        for aid in alert_ids:
-            send_alert.delay(aid)
-        if new_recall_rows:
-            send_notifications.delay(new_recall_rows)
-    else:
-        for aid in alert_ids:
-            send_alert(aid)
-        if new_recall_rows:
-            send_notifications(new_recall_rows)
-    alerts_created = len(alert_ids)
-    total = conn.execute(text("SELECT COUNT(*) FROM recalls")).fetchone()[0]
-    conn.close()
-
-    summary = {"new": new, "updated": updated, "total": total, "alerts": alerts_created}
+            new_rows.append(r)
+    return new_rows
+
+
+def refresh_recalls() -> Dict[str, int]:
+    """Fetch latest recalls and upsert into the database.
+
+    Records stream from the sources in batches of ``REFRESH_BATCH_SIZE``;
+    each batch is classified, written and committed, and its alerts and
+    notifications dispatched, before the next one is decoded, so memory
+    use follows the batch size rather than the size of the feeds.
+    """
+    new = 0
+    updated = 0
+    alerts_created = 0
+    priorities: Counter = Counter()
+
+    conn = db_utils.connect()
+    try:
+        for batch in _batches(_stream_recalls(), REFRESH_BATCH_SIZE):
+            # classify the whole batch up front; the result is stored with each
+            # recall and read back by the alerting paths
+            for r, priority in zip(batch, classify_recalls(batch)):
+                r["priority"] = priority
+            priorities.update(r["priority"] for r in batch)
+
+            with conn.begin():
+                new_recall_rows = _upsert(conn, batch)
+                by_priority: Dict[str, List[RecallRecord]] = {}
+                for r in new_recall_rows:
+                    by_priority.setdefault(r["priority"], []).append(r)
+                alert_ids = {
+                    priority: create_alerts_for_new_recalls(conn, rows, priority)
+                    for priority, rows in by_priority.items()
+                }
+            new += len(new_recall_rows)
+            updated += len(batch) - len(new_recall_rows)
+            for priority, ids in alert_ids.items():
+                dispatch_alerts(ids, priority)
+                alerts_created += len(ids)
+            if new_recall_rows:
+                if os.getenv("CELERY_BROKER_URL"):
+                    send_notifications.delay([dict(r) for r in new_recall_rows])
+                else:
+                    send_notifications(new_recall_rows)
+
+        total = conn.execute(text("SELECT COUNT(*) FROM recalls")).fetchone()[0]
+    finally:
+        conn.close()
+
+    summary = {
+        "new": new,
+        "updated": updated,
+        "total": total,
+        "alerts": alerts_created,
+        **priority_counts(priorities.elements()),
+    }
     print(summary)
     return summary
@@ -1,30 +1,144 @@
+"""Remedy text extraction and polite, conditional fetching of recall pages."""
 from __future__ import annotations
 
-from bs4 import BeautifulSoup
+import threading
+from contextlib import contextmanager
+from os import getenv
+from typing import NamedTuple
+from urllib.parse import urlsplit
 
+import lxml.html
+import requests
+from lxml import etree
 
-def extract_remedy(html: str) -> str | None:
-    """Return remedy text from recall HTML."""
-    soup = BeautifulSoup(html, "html.parser")
+REMEDY_POLL_WORKERS = int(getenv("REMEDY_POLL_WORKERS", "16"))
+REMEDY_PER_HOST_LIMIT = int(getenv("REMEDY_PER_HOST_LIMIT", "2"))
+REMEDY_FETCH_TIMEOUT = float(getenv("REMEDY_FETCH_TIMEOUT", "10"))
 
-    heading = soup.find(
-        lambda t: t.name in {"h1", "h2", "h3", "h4"}
-        and "remedy" in t.get_text(strip=True).lower()
-    )
-    if heading:
-        p = heading.find_next("p")
-        if p:
-            text = p.get_text(strip=True)
-            if text:
-                return text
-
-    strong = soup.find(
-        lambda t: t.name in {"b", "strong"}
-        and "remedy" in t.get_text(strip=True).lower()
-    )
-    if strong:
-        text = strong.parent.get_text(strip=True)
+
+class RemedyPage(NamedTuple):
+    """Outcome of a conditional fetch; ``html`` is None when unchanged or failed."""
+
+    html: str | None
+    etag: str | None
+    last_modified: str | None
+
+
+_LOWER = "translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+_REMEDY_HEADING = etree.XPath(
+    f"(//*[self::h1 or self::h2 or self::h3 or self::h4][contains({_LOWER}, 'remedy')])[1]"
+)
+_NEXT_P = etree.XPath("(descendant::p | following::p)[1]")
+_REMEDY_LABEL = etree.XPath(
+    f"(//*[self::b or self::strong][contains({_LOWER}, 'remedy')])[1]"
+)
+
+
+def _text(el) -> str:
+    # same joining as BeautifulSoup's get_text(strip=True)
+    return "".join(t.strip() for t in el.itertext())
+
+
+def _after_heading(doc) -> str | None:
+    """Text of the first paragraph after a heading mentioning "remedy"."""
+    for heading in _REMEDY_HEADING(doc):
+        for p in _NEXT_P(heading):
+            return _text(p) or None
+    return None
+
+
+def _labelled(doc) -> str | None:
+    """Text next to a bold "Remedy:" label, without the label itself."""
+    for label in _REMEDY_LABEL(doc):
+        parent = label.getparent()
+        text = _text(parent) if parent is not None else ""
         if text:
-            return text.replace(strong.get_text(strip=True), "").strip()
+            return text.replace(_text(label), "").strip()
+    return None
+
+
+# rules are tried in order; CPSC pages use section headings while NHTSA
+# campaign pages label fields inline
+REMEDY_RULES = {
+    "cpsc": (_after_heading, _labelled),
+    "nhtsa": (_labelled, _after_heading),
+}
+DEFAULT_RULES = (_after_heading, _labelled)
 
+
+def _parse(html: str | bytes):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # str input with an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode() if isinstance(html, str) else html)
+
+
+def extract_remedy(html: str, source: str | None = None) -> str | None:
+    """Return remedy text from recall HTML.
+
+    ``source`` selects the rule order from :data:`REMEDY_RULES`.
+    """
+    if not html or not html.strip():
+        return None
+    try:
+        doc = _parse(html)
+    except etree.ParserError:
+        return None
+    for rule in REMEDY_RULES.get((source or "").lower(), DEFAULT_RULES):
+        text = rule(doc)
+        if text:
+            return text
     return None
+
+
+class HostLimiter:
+    """Cap the number of in-flight requests per host."""
+
+    def __init__(self, limit: int = REMEDY_PER_HOST_LIMIT):
+        self.limit = limit
+        self._hosts: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._hosts.setdefault(host, threading.BoundedSemaphore(self.limit))
+        with slot:
+            yield
+
+
+def fetch_remedy_page(
+    url: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    limiter: HostLimiter | None = None,
+) -> RemedyPage:
+    """GET ``url`` conditionally, honouring the per-host limit.
+
+    On 304 and on errors the validators are passed through unchanged so
+    the next poll can still send them.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        with limiter.hold(url) if limiter else _unlimited():
+            resp = requests.get(url, timeout=REMEDY_FETCH_TIMEOUT, headers=headers)
+    except Exception:
+        return RemedyPage(None, etag, last_modified)
+    if resp.status_code == 304 or resp.status_code >= 400:
+        return RemedyPage(None, etag, last_modified)
+    return RemedyPage(
+        resp.text,
+        resp.headers.get("ETag"),
+        resp.headers.get("Last-Modified"),
+    )
+
+
+@contextmanager
+def _unlimited():
+    yield
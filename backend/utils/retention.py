@@ -0,0 +1,167 @@
+"""Partition maintenance and retention for alert history.
+
+On Postgres ``alerts`` is range partitioned by month on ``created_at``
+(``alerts_pYYYYMM`` plus an ``alerts_default`` catch-all). Partitions past
+``ALERT_RETENTION_MONTHS`` are detached and moved either into
+``alerts_archive`` or, when ``ALERT_ARCHIVE_DIR`` is set, into gzipped
+NDJSON files. Other dialects have no partitions, so expired rows are moved
+by ``created_at`` range instead.
+
+``sent_notifications`` is not pruned. It is the permanent record of who
+was told about which recall, used both for dedup and for remedy-update
+fan-out.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+from datetime import date
+from os import getenv
+
+from sqlalchemy import text
+
+ALERT_RETENTION_MONTHS = int(getenv("ALERT_RETENTION_MONTHS", "12"))
+ALERT_PARTITIONS_AHEAD = int(getenv("ALERT_PARTITIONS_AHEAD", "3"))
+ALERT_ARCHIVE_DIR = getenv("ALERT_ARCHIVE_DIR")
+
+ALERT_COLUMNS = (
+    "id",
+    "user_id",
+    "recall_id",
+    "recall_source",
+    "channel",
+    "sent_at",
+    "read_at",
+    "error",
+    "created_at",
+)
+_PARTITION_RE = re.compile(r"^alerts_p(\d{4})(\d{2})$")
+
+
+def add_months(month: date, n: int) -> date:
+    """Return the first day of the month ``n`` months after ``month``."""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"alerts_p{month:%Y%m}"
+
+
+def ensure_alert_partitions(conn, today: date | None = None, ahead: int | None = None) -> list[str]:
+    """Create this month's and the next ``ahead`` monthly partitions.
+
+    Creating them early keeps new alerts out of ``alerts_default``. Postgres
+    refuses to create a partition while the default holds rows in its range,
+    so any such rows are moved aside, the partition is created and the rows
+    are reinserted through ``alerts`` to land in it.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    first = add_months(today or date.today(), 0)
+    existing = {name for name, _month in alert_partitions(conn)}
+    cols = ", ".join(ALERT_COLUMNS)
+    names = []
+    for i in range((ALERT_PARTITIONS_AHEAD if ahead is None else ahead) + 1):
+        lo = add_months(first, i)
+        name = partition_name(lo)
+        names.append(name)
+        if name in existing:
+            continue
+        bounds = {"lo": str(lo), "hi": str(add_months(lo, 1))}
+        conn.execute(text(f"CREATE TEMP TABLE alerts_moving AS SELECT {cols} FROM alerts WITH NO DATA"))
+        conn.execute(
+            text(
+                "WITH moved AS (DELETE FROM alerts_default "
+                "WHERE created_at >= :lo AND created_at < :hi "
+                f"RETURNING {cols}) INSERT INTO alerts_moving ({cols}) SELECT {cols} FROM moved"
+            ),
+            bounds,
+        )
+        conn.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF alerts "
+                f"FOR VALUES FROM ('{lo}') TO ('{add_months(lo, 1)}')"
+            )
+        )
+        conn.execute(text(f"INSERT INTO alerts ({cols}) SELECT {cols} FROM alerts_moving"))
+        conn.execute(text("DROP TABLE alerts_moving"))
+    return names
+
+
+def alert_partitions(conn) -> list[tuple[str, date]]:
+    """Return ``(name, month)`` for each monthly partition of ``alerts``."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'alerts'"
+        )
+    ).fetchall()
+    parts = []
+    for (name,) in rows:
+        m = _PARTITION_RE.match(name)
+        if m:
+            parts.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(parts, key=lambda p: p[1])
+
+
+def _archive(conn, source_sql: str, params: dict, label: str, archive_dir: str | None) -> int:
+    cols = ", ".join(ALERT_COLUMNS)
+    if not archive_dir:
+        res = conn.execute(
+            text(f"INSERT INTO alerts_archive ({cols}) SELECT {cols} FROM {source_sql}"),
+            params,
+        )
+        return res.rowcount
+    os.makedirs(archive_dir, exist_ok=True)
+    count = 0
+    result = conn.execution_options(yield_per=1000).execute(
+        text(f"SELECT {cols} FROM {source_sql}"), params
+    )
+    with gzip.open(os.path.join(archive_dir, f"alerts-{label}.ndjson.gz"), "at") as fh:
+        for row in result:
+            fh.write(json.dumps(dict(row._mapping), default=str))
+            fh.write("\n")
+            count += 1
+    return count
+
+
+def archive_alerts(
+    conn,
+    today: date | None = None,
+    keep_months: int | None = None,
+    archive_dir: str | None = ALERT_ARCHIVE_DIR,
+) -> int:
+    """Move alerts older than the retention window out of ``alerts``.
+
+    Returns the number of rows archived.
+    """
+    keep = ALERT_RETENTION_MONTHS if keep_months is None else keep_months
+    cutoff = add_months(today or date.today(), -keep)
+    if conn.dialect.name != "postgresql":
+        label = f"before-{cutoff:%Y%m}"
+        count = _archive(
+            conn, "alerts WHERE created_at < :cutoff", {"cutoff": str(cutoff)}, label, archive_dir
+        )
+        conn.execute(text("DELETE FROM alerts WHERE created_at < :cutoff"), {"cutoff": str(cutoff)})
+        return count
+    count = 0
+    for name, month in alert_partitions(conn):
+        if month >= cutoff:
+            break
+        conn.execute(text(f"ALTER TABLE alerts DETACH PARTITION {name}"))
+        count += _archive(conn, name, {}, f"{month:%Y%m}", archive_dir)
+        conn.execute(text(f"DROP TABLE {name}"))
+    # rows that landed in the default before their month had a partition
+    params = {"cutoff": str(cutoff)}
+    count += _archive(
+        conn, "alerts_default WHERE created_at < :cutoff", params,
+        f"default-before-{cutoff:%Y%m}", archive_dir,
+    )
+    conn.execute(text("DELETE FROM alerts_default WHERE created_at < :cutoff"), params)
+    return count
+
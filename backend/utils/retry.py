@@ -0,0 +1,140 @@
+"""Retry policies for calls to upstream APIs.
+
+Backoff is exponential with full jitter, so clients that failed together
+don't all retry at the same moment. A policy can also set a total
+``deadline`` that covers every attempt and every pause. Once the budget
+is spent the last error is raised, and per-request timeouts are cut down
+to fit the time that is left.
+
+Pick the policy that suits the caller:
+
+``BATCH_POLICY``
+    Scheduled refreshes. A few seconds of waiting is fine here.
+``INTERACTIVE_POLICY``
+    Request handlers. One quick retry, and fail within
+    ``UPSTREAM_DEADLINE_SECONDS``.
+``NO_RETRY``
+    Celery tasks. They retry by rescheduling themselves with
+    ``self.retry(countdown=task_countdown(...))``, not by sleeping in the
+    worker.
+"""
+from __future__ import annotations
+
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, TypeVar
+
+import requests
+
+from backend.utils.jsonstream import CHUNK_SIZE, iter_items
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The retry budget ran out before a call succeeded."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base: float = 1.0
+    cap: float = 4.0
+    timeout: float = 10.0
+    deadline: float | None = None
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered pause after failed attempt number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+
+BATCH_POLICY = RetryPolicy()
+INTERACTIVE_POLICY = RetryPolicy(
+    attempts=2,
+    base=0.2,
+    cap=0.5,
+    timeout=float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "4")),
+    deadline=float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "6")),
+)
+NO_RETRY = RetryPolicy(attempts=1)
+# Celery reschedules with equal jitter (see task_countdown): 15-30s,
+# 30-60s, 60-120s... capped at ten minutes
+TASK_POLICY = RetryPolicy(attempts=5, base=30, cap=600)
+
+
+def call_with_retry(fn: Callable[[float], T], policy: RetryPolicy = BATCH_POLICY) -> T:
+    """Call ``fn(timeout)`` until it succeeds or ``policy`` gives up."""
+    start = time.monotonic()
+    for attempt in range(policy.attempts):
+        timeout = policy.timeout
+        if policy.deadline is not None:
+            remaining = policy.deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                raise DeadlineExceeded(f"retry deadline of {policy.deadline}s exceeded")
+            timeout = min(timeout, remaining)
+        try:
+            return fn(timeout)
+        except Exception:
+            if attempt == policy.attempts - 1:
+                raise
+            delay = policy.backoff(attempt)
+            if policy.deadline is not None and time.monotonic() - start + delay >= policy.deadline:
+                raise
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def request_json(
+    url: str,
+    params: Dict | None = None,
+    data: Dict | None = None,
+    policy: RetryPolicy = BATCH_POLICY,
+) -> Dict:
+    """GET (or POST ``data`` to) ``url`` under ``policy`` and decode the JSON."""
+
+    def attempt(timeout: float) -> Dict:
+        if data is None:
+            resp = requests.get(url, params=params, timeout=timeout)
+        else:
+            resp = requests.post(url, data=data, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    return call_with_retry(attempt, policy)
+
+
+def request_items(
+    url: str,
+    params: Dict | None = None,
+    keys: tuple[str, ...] = ("results",),
+    policy: RetryPolicy = BATCH_POLICY,
+) -> Iterator[Dict]:
+    """GET ``url`` under ``policy`` and yield its records as they are decoded.
+
+    Records are the elements of the array under one of ``keys`` (see
+    :func:`backend.utils.jsonstream.iter_items`). Only opening the response
+    is retried; an error part way through the body propagates.
+    """
+
+    def attempt(timeout: float):
+        resp = requests.get(url, params=params, timeout=timeout, stream=True)
+        resp.raise_for_status()
+        return resp
+
+    resp = call_with_retry(attempt, policy)
+    try:
+        yield from iter_items(resp.iter_content(CHUNK_SIZE), keys)
+    finally:
+        resp.close()
+
+
+def task_countdown(retries: int, policy: RetryPolicy = TASK_POLICY) -> float:
+    """Seconds a Celery task should wait before retry number ``retries + 1``.
+
+    Uses equal jitter, so each retry waits at least half of its exponential
+    step. Full jitter could reschedule a task almost immediately.
+    """
+    step = min(policy.cap, policy.base * 2**retries)
+    return max(1.0, step / 2 + random.uniform(0, step / 2))
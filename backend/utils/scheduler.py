@@ -1,12 +1,15 @@
 """APScheduler integration for RecallGuard."""
 from __future__ import annotations
 
+import os
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from flask import Flask
 
 from .refresh import refresh_recalls
-from backend.api.ops import SCHEDULER_JOBS
+from backend.utils.metrics import SCHEDULER_JOBS
+from backend.utils.session import engine_role
 
 
 _scheduler: BackgroundScheduler | None = None
@@ -22,11 +25,44 @@ def init_scheduler(app: Flask) -> BackgroundScheduler:
     _scheduler = BackgroundScheduler(timezone="UTC")
 
     def job() -> None:
-        refresh_recalls()
+        with engine_role("scheduler"):
+            refresh_recalls()
         SCHEDULER_JOBS.inc()
 
     trigger = CronTrigger(hour=2, minute=30)
     _scheduler.add_job(job, trigger, id="refresh_recalls", replace_existing=True)
+
+    def digest_job(frequency: str) -> None:
+        from backend.tasks import send_digest_emails
+
+        if os.getenv("CELERY_BROKER_URL"):
+            send_digest_emails.delay(frequency)
+        else:
+            with engine_role("scheduler"):
+                send_digest_emails(frequency)
+
+    _scheduler.add_job(
+        digest_job, CronTrigger(minute=0), args=["hourly"],
+        id="digest_hourly", replace_existing=True,
+    )
+    _scheduler.add_job(
+        digest_job, CronTrigger(hour=int(os.getenv("DIGEST_DAILY_HOUR", "13")), minute=0),
+        args=["daily"], id="digest_daily", replace_existing=True,
+    )
+
+    def maintenance_job() -> None:
+        from backend.tasks import maintain_alert_history
+
+        if os.getenv("CELERY_BROKER_URL"):
+            maintain_alert_history.delay()
+        else:
+            with engine_role("scheduler"):
+                maintain_alert_history()
+
+    _scheduler.add_job(
+        maintenance_job, CronTrigger(hour=3, minute=15),
+        id="maintain_alert_history", replace_existing=True,
+    )
     _scheduler.start()
 
     @app.teardown_appcontext
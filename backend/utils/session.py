@@ -1,22 +1,236 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+"""Engine and session management.
+
+Each process role (``api``, ``celery``, ``scheduler``) gets its own engine
+and connection pool, sized from ``DB_POOL_*`` settings with optional
+per-role overrides such as ``DB_POOL_SIZE_CELERY``. The process role comes
+from ``DB_POOL_ROLE`` or :func:`set_process_role`; code running on a
+different role's behalf (e.g. scheduler jobs inside the API process) can
+switch with :func:`engine_role`.
+
+When ``DATABASE_REPLICA_URL`` is set, :func:`get_read_engine` (used by
+:func:`backend.utils.db.connect_read`) routes to the replica unless its
+replication lag exceeds ``REPLICA_MAX_LAG_SECONDS``, in which case reads
+fall back to the primary. Replica health is tracked per role, alongside
+each role's replica engine.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic, perf_counter
+
+from prometheus_client import Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from backend.config import settings
 
-_engine = None
-SessionLocal = scoped_session(sessionmaker(autoflush=False))
+ROLE_POOL_DEFAULTS = {
+    "api": {},
+    "celery": {"pool_size": 4, "max_overflow": 4},
+    "scheduler": {"pool_size": 2, "max_overflow": 0},
+}
+
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["role"]
+)
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured replica lag")
+
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_engines: dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+_process_role = os.getenv("DB_POOL_ROLE", "api")
+_role: ContextVar[str | None] = ContextVar("db_engine_role", default=None)
+# role -> {"checked_at": monotonic time of the last lag check, "healthy": bool}
+_replica_state: dict[str, dict] = {}
+_replica_lock = threading.Lock()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    role = "api"
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(role=self.role).observe(perf_counter() - start)
+
+
+def current_role() -> str:
+    return _role.get() or _process_role
+
+
+def set_process_role(role: str) -> None:
+    """Set the default pool profile for this process (e.g. in a worker)."""
+    global _process_role
+    _process_role = role
+
+
+@contextmanager
+def engine_role(role: str):
+    """Route ``get_engine`` and ``SessionLocal`` to ``role``'s pool."""
+    token = _role.set(role)
+    try:
+        yield
+    finally:
+        _role.reset(token)
+
+
+def pool_options(role: str) -> dict:
+    """Return pool keyword arguments for ``role``."""
+    opts = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    opts.update(ROLE_POOL_DEFAULTS.get(role, {}))
+    for key, cast in (
+        ("pool_size", int),
+        ("max_overflow", int),
+        ("pool_timeout", float),
+        ("pool_recycle", int),
+    ):
+        override = os.getenv(f"DB_{key.upper()}_{role.upper()}")
+        if override:
+            opts[key] = cast(override)
+    return opts
+
+
+def _create(url: str, role: str) -> Engine:
+    kwargs: dict = {"future": True, "pool_pre_ping": settings.db_pool_pre_ping}
+    if not url.startswith("sqlite"):
+        kwargs.update(pool_options(role), poolclass=TimedQueuePool)
+    engine = create_engine(url, **kwargs)
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.role = role
+    original = engine.dispose
+
+    def _dispose_and_mark(*args, **kw):
+        engine._disposed = True
+        return original(*args, **kw)
+
+    engine.dispose = _dispose_and_mark  # type: ignore
+    engine._disposed = False
+    return engine
+
+
+def get_engine() -> Engine:
+    """Return the engine for the current role, creating it on first use."""
+    role = current_role()
+    engine = _engines.get(role)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(role)
+            if engine is None:
+                engine = _engines[role] = _create(settings.database_url, role)
+    return engine
+
+
+def _replica_engine(url: str) -> Engine:
+    key = f"{current_role()}:replica"
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = _engines[key] = _create(url, current_role())
+    return engine
+
+
+def _replica_healthy(engine: Engine, role: str) -> bool:
+    """Return whether ``role``'s replica engine is reachable and within the lag budget.
+
+    The lag is measured at most every ``replica_lag_check_interval``
+    seconds per process and role.
+    """
+    now = monotonic()
+    with _replica_lock:
+        state = _replica_state.setdefault(role, {"checked_at": float("-inf"), "healthy": False})
+        if now - state["checked_at"] < settings.replica_lag_check_interval:
+            return state["healthy"]
+        state["checked_at"] = now
+    try:
+        with engine.connect() as conn:
+            lag = float(conn.execute(REPLICA_LAG_SQL).scalar() or 0)
+        DB_REPLICA_LAG.set(lag)
+        healthy = lag <= settings.replica_max_lag_seconds
+    except Exception:
+        healthy = False
+    with _replica_lock:
+        state["healthy"] = healthy
+    return healthy
+
+
+def get_read_engine() -> Engine:
+    """Return the replica engine for read-only work, or the primary.
+
+    Falls back to :func:`get_engine` when no replica is configured, it is
+    unreachable, or it is lagging too far behind.
+    """
+    url = settings.database_replica_url
+    if url:
+        engine = _replica_engine(url)
+        if _replica_healthy(engine, current_role()):
+            return engine
+    return get_engine()
+
+
+def dispose_engines() -> None:
+    """Dispose every engine so the next ``get_engine`` reconnects.
+
+    Call after forking or when ``DATABASE_URL`` changes.
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+class RoutingSession(Session):
+    """Session that binds to the engine of the current role."""
+
+    def get_bind(self, mapper=None, **kw):
+        if self.bind is not None:
+            return super().get_bind(mapper, **kw)
+        return get_engine()
+
+
+SessionLocal = scoped_session(sessionmaker(class_=RoutingSession, autoflush=False))
+
 
+class _PoolCollector:
+    """Expose checked-out and overflow counts of every pool on /metrics."""
 
-def get_engine():
-    global _engine
-    if _engine is None or str(_engine.url) != settings.database_url:
-        _engine = create_engine(settings.database_url, future=True)
-        SessionLocal.configure(bind=_engine)
-        original = _engine.dispose
+    def collect(self):
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Connections currently checked out", labels=["role"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Connections open beyond pool_size", labels=["role"]
+        )
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["role"])
+        for role, engine in list(_engines.items()):  # role or "<role>:replica"
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                checked_out.add_metric([role], pool.checkedout())
+                overflow.add_metric([role], max(pool.overflow(), 0))
+                size.add_metric([role], pool.size())
+        yield checked_out
+        yield overflow
+        yield size
 
-        def _dispose_and_mark(*args, **kwargs):
-            _engine._disposed = True
-            return original(*args, **kwargs)
 
-        _engine.dispose = _dispose_and_mark  # type: ignore
-        _engine._disposed = False
-    return _engine
+REGISTRY.register(_PoolCollector())
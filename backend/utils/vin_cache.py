@@ -0,0 +1,152 @@
+"""Database cache for NHTSA VIN lookups.
+
+vPIC decodes depend only on the manufacturer (WMI), vehicle descriptor
+(VDS) and model-year characters of a VIN, so they are stored per prefix
+and never expire. Recall campaigns are stored per VIN and considered fresh
+for ``VIN_CAMPAIGN_TTL_HOURS``. A reader that finds an expired entry
+claims its refresh with :func:`claim_campaign_refresh`, which keeps the
+entry fresh for ``VIN_REFRESH_CLAIM_SECONDS`` so concurrent readers don't
+start the same refresh.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, NamedTuple
+
+from sqlalchemy import select, update
+
+from backend.db.models import vin_campaigns, vin_decodes
+from backend.utils.db import dialect_insert
+
+VIN_CAMPAIGN_TTL = timedelta(hours=int(os.getenv("VIN_CAMPAIGN_TTL_HOURS", "24")))
+VIN_REFRESH_CLAIM = timedelta(seconds=int(os.getenv("VIN_REFRESH_CLAIM_SECONDS", "300")))
+
+
+class VinDecode(NamedTuple):
+    make: str
+    model: str
+    model_year: str
+
+
+class CachedCampaigns(NamedTuple):
+    recalls: List[Dict]
+    fresh: bool
+    fetched_at: str | None = None
+
+
+def vin_prefix(vin: str) -> str:
+    """WMI + VDS (positions 1-8) and the model-year character (position 10)."""
+    vin = vin.upper()
+    return vin[:8] + vin[9:10]
+
+
+def get_decodes(conn, vins: Iterable[str]) -> Dict[str, VinDecode]:
+    """Cached decodes for ``vins``, keyed by VIN; misses are left out."""
+    by_prefix: Dict[str, List[str]] = {}
+    for vin in vins:
+        by_prefix.setdefault(vin_prefix(vin), []).append(vin)
+    if not by_prefix:
+        return {}
+    rows = conn.execute(
+        select(vin_decodes).where(vin_decodes.c.vin_prefix.in_(list(by_prefix)))
+    )
+    found: Dict[str, VinDecode] = {}
+    for row in rows:
+        decode = VinDecode(row.make or "", row.model or "", row.model_year or "")
+        for vin in by_prefix[row.vin_prefix]:
+            found[vin] = decode
+    return found
+
+
+def get_decode(conn, vin: str) -> VinDecode | None:
+    return get_decodes(conn, [vin]).get(vin)
+
+
+def put_decodes(conn, decodes: Mapping[str, VinDecode]) -> None:
+    """Store ``{vin: decode}`` under each VIN's prefix with one upsert."""
+    now = datetime.utcnow().isoformat()
+    rows = {
+        vin_prefix(vin): {"vin_prefix": vin_prefix(vin), **d._asdict(), "decoded_at": now}
+        for vin, d in decodes.items()
+    }
+    if not rows:
+        return
+    stmt = dialect_insert(conn, vin_decodes)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["vin_prefix"],
+            set_={c: stmt.excluded[c] for c in ("make", "model", "model_year", "decoded_at")},
+        ),
+        list(rows.values()),
+    )
+
+
+def put_decode(conn, vin: str, decode: VinDecode) -> None:
+    put_decodes(conn, {vin: decode})
+
+
+def get_campaigns_many(
+    conn, vins: Iterable[str], now: datetime | None = None
+) -> Dict[str, CachedCampaigns]:
+    """Cached campaigns for ``vins``, keyed by VIN; misses are left out."""
+    vins = [v.upper() for v in vins]
+    if not vins:
+        return {}
+    now = now or datetime.utcnow()
+    rows = conn.execute(
+        select(vin_campaigns).where(vin_campaigns.c.vin.in_(vins))
+    )
+    return {
+        row.vin: CachedCampaigns(
+            json.loads(row.recalls),
+            datetime.fromisoformat(row.fetched_at) + VIN_CAMPAIGN_TTL > now,
+            row.fetched_at,
+        )
+        for row in rows
+    }
+
+
+def get_campaigns(conn, vin: str, now: datetime | None = None) -> CachedCampaigns | None:
+    return get_campaigns_many(conn, [vin], now).get(vin.upper())
+
+
+def claim_campaign_refresh(conn, vin: str, fetched_at: str, now: datetime | None = None) -> bool:
+    """Mark ``vin``'s expired entry as being refreshed.
+
+    ``fetched_at`` is the value the caller read; only the caller whose
+    conditional update matches it wins. The entry then reads as fresh for
+    ``VIN_REFRESH_CLAIM``, after which another reader may retry if the
+    refresh never landed.
+    """
+    now = now or datetime.utcnow()
+    claimed = (now - VIN_CAMPAIGN_TTL + VIN_REFRESH_CLAIM).isoformat()
+    res = conn.execute(
+        update(vin_campaigns)
+        .where(vin_campaigns.c.vin == vin.upper(), vin_campaigns.c.fetched_at == fetched_at)
+        .values(fetched_at=claimed)
+    )
+    return res.rowcount == 1
+
+
+def put_campaigns_many(conn, campaigns: Mapping[str, List[Dict]]) -> None:
+    """Store ``{vin: recalls}`` with one upsert."""
+    if not campaigns:
+        return
+    now = datetime.utcnow().isoformat()
+    stmt = dialect_insert(conn, vin_campaigns)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["vin"],
+            set_={"recalls": stmt.excluded.recalls, "fetched_at": stmt.excluded.fetched_at},
+        ),
+        [
+            {"vin": vin.upper(), "recalls": json.dumps(recalls), "fetched_at": now}
+            for vin, recalls in campaigns.items()
+        ],
+    )
+
+
+def put_campaigns(conn, vin: str, recalls: List[Dict]) -> None:
+    put_campaigns_many(conn, {vin: recalls})
@@ -0,0 +1,20 @@
+"""High-water marks that let background jobs process only new work."""
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from backend.db.models import task_watermarks
+
+
+def get_watermark(conn, name: str) -> str | None:
+    return conn.execute(
+        text("SELECT value FROM task_watermarks WHERE name=:n"), {"n": name}
+    ).scalar()
+
+
+def set_watermark(conn, name: str, value: str) -> None:
+    res = conn.execute(
+        text("UPDATE task_watermarks SET value=:v WHERE name=:n"), {"n": name, "v": value}
+    )
+    if not res.rowcount:
+        conn.execute(task_watermarks.insert().values(name=name, value=value))
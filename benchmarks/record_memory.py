@@ -0,0 +1,94 @@
+"""Benchmark memory held by parsed recall records.
+
+Builds a synthetic feed and compares the plain dicts the fetchers used to
+produce with ``backend.utils.records.RecallRecord``::
+
+    python -m benchmarks.record_memory [--count N]
+
+Both runs share their field strings with the feed, so the figures are the
+per-record container overhead that slots remove.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+from time import perf_counter
+
+from backend.utils.records import RecallRecord
+
+SOURCES = ("cpsc", "fda", "nhtsa", "usda")
+
+
+def synthetic_feed(count: int) -> list[dict]:
+    """Raw records as the JSON decoder returns them."""
+    raw = [
+        {
+            "source": SOURCES[i % len(SOURCES)],
+            "id": f"R{i:07d}",
+            "product": f"Product {i % 5000}",
+            "hazard": "Fire" if i % 7 == 0 else "Laceration",
+            "recall_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "url": f"https://example.com/recalls/{i}",
+        }
+        for i in range(count)
+    ]
+    # round-trip so strings are fresh objects rather than shared literals
+    return json.loads(json.dumps(raw))
+
+
+def as_dict(r: dict) -> dict:
+    return {
+        "source": r["source"],
+        "id": r["id"],
+        "product": r["product"],
+        "hazard": r["hazard"],
+        "recall_date": r["recall_date"],
+        "url": r["url"],
+    }
+
+
+def as_record(r: dict) -> RecallRecord:
+    return RecallRecord(
+        source=r["source"],
+        id=r["id"],
+        product=r["product"],
+        hazard=r["hazard"],
+        recall_date=r["recall_date"],
+        url=r["url"],
+    )
+
+
+def _measure(build, feed: list[dict]) -> tuple[int, float]:
+    """Bytes allocated for the built list and the time taken to build it."""
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    built = [build(r) for r in feed]
+    elapsed = perf_counter() - start
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500_000)
+    args = parser.parse_args()
+
+    feed = synthetic_feed(args.count)
+    dict_bytes, dict_time = _measure(as_dict, feed)
+    record_bytes, record_time = _measure(as_record, feed)
+    mib = 1024 * 1024
+    print(f"{args.count} records")
+    print(f"dict          {dict_bytes / mib:8.1f} MiB  {dict_bytes / args.count:6.0f} B/record  {dict_time:6.2f} s")
+    print(
+        f"RecallRecord  {record_bytes / mib:8.1f} MiB  {record_bytes / args.count:6.0f} B/record  "
+        f"{record_time:6.2f} s  ({dict_bytes / record_bytes:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
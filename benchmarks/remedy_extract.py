@@ -0,0 +1,83 @@
+"""Benchmark remedy extraction over saved recall pages.
+
+Compares the lxml rule engine in ``backend.utils.remedy`` with the
+previous BeautifulSoup implementation and checks they agree::
+
+    python -m benchmarks.remedy_extract [PAGES_DIR] [--repeat N]
+
+Pages are ``*.html`` files whose name starts with their source
+(``cpsc_...``, ``nhtsa_...``).
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+
+from backend.utils.remedy import extract_remedy
+
+DEFAULT_PAGES = Path(__file__).parent / "data" / "remedy_pages"
+
+
+def extract_remedy_bs4(html: str) -> str | None:
+    """The html.parser implementation that ``extract_remedy`` replaced."""
+    soup = BeautifulSoup(html, "html.parser")
+    heading = soup.find(
+        lambda t: t.name in {"h1", "h2", "h3", "h4"}
+        and "remedy" in t.get_text(strip=True).lower()
+    )
+    if heading:
+        p = heading.find_next("p")
+        if p:
+            text = p.get_text(strip=True)
+            if text:
+                return text
+    strong = soup.find(
+        lambda t: t.name in {"b", "strong"}
+        and "remedy" in t.get_text(strip=True).lower()
+    )
+    if strong:
+        text = strong.parent.get_text(strip=True)
+        if text:
+            return text.replace(strong.get_text(strip=True), "").strip()
+    return None
+
+
+def _time(fn, pages, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        for source, html in pages:
+            fn(html, source)
+    return (perf_counter() - start) / (repeat * len(pages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="?", type=Path, default=DEFAULT_PAGES)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = [
+        (path.name.split("_", 1)[0], path.read_text(encoding="utf-8"))
+        for path in sorted(args.pages.glob("*.html"))
+    ]
+    if not pages:
+        raise SystemExit(f"no *.html pages in {args.pages}")
+    mismatches = [
+        src for src, html in pages if extract_remedy(html, src) != extract_remedy_bs4(html)
+    ]
+
+    legacy = _time(lambda html, _src: extract_remedy_bs4(html), pages, args.repeat)
+    current = _time(extract_remedy, pages, args.repeat)
+    size = sum(len(html) for _, html in pages) // len(pages)
+    print(f"{len(pages)} pages, {size // 1024} KiB average, {args.repeat} rounds")
+    print(f"bs4/html.parser  {legacy * 1000:8.2f} ms/page")
+    print(f"lxml rules       {current * 1000:8.2f} ms/page  ({legacy / current:.1f}x)")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} page(s) extracted differently")
+
+
+if __name__ == "__main__":
+    main()
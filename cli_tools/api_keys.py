@@ -0,0 +1,35 @@
+"""Issue and revoke partner API keys.
+
+    python -m cli_tools.api_keys issue "Acme Corp" [--plan pro] [--quota 10000]
+    python -m cli_tools.api_keys revoke KEY_ID
+"""
+import argparse
+
+from backend.utils.api_keys import issue_api_key, revoke_api_key
+from backend.utils.session import SessionLocal
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Manage partner API keys.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    issue = sub.add_parser("issue", help="create a key and print it once")
+    issue.add_argument("org_name")
+    issue.add_argument("--plan", default="free")
+    issue.add_argument("--quota", type=int)
+    revoke = sub.add_parser("revoke", help="delete a key by id")
+    revoke.add_argument("key_id", type=int)
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        if args.command == "issue":
+            key = issue_api_key(db, args.org_name, args.plan, args.quota)
+            db.commit()
+            print(key)
+        else:
+            revoke_api_key(db, args.key_id)
+            db.commit()
+            print(f"revoked {args.key_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from backend.db.models import metadata
+from backend.utils.api_keys import invalidate_api_key
+from backend.utils.entitlements import invalidate_entitlement
 import backend.utils.session as session_mod
 
 
@@ -46,3 +48,5 @@ def db_session(monkeypatch):
     session_mod.SessionLocal.remove()
     engine.dispose()
     session_mod._engine = None
+    invalidate_entitlement()
+    invalidate_api_key()
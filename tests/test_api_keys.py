@@ -0,0 +1,68 @@
+from backend.db import init_db
+from backend.utils.api_keys import hash_api_key, issue_api_key, lookup_api_key, revoke_api_key
+from backend.utils.session import SessionLocal
+from sqlalchemy import text
+
+
+def test_issued_keys_are_hashed_and_cached(tmp_path, monkeypatch):
+    db = tmp_path / "keys.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    init_db()
+    with SessionLocal() as dbs:
+        key = issue_api_key(dbs, "Acme", plan="pro")
+        dbs.commit()
+        stored = dbs.execute(text("SELECT key, key_hash FROM api_keys WHERE org_name='Acme'")).fetchone()
+        assert stored[0] is None
+        assert stored[1] == hash_api_key(key)
+
+        record = lookup_api_key(dbs, key)
+        assert record["plan"] == "pro"
+        dbs.execute(text("UPDATE api_keys SET plan='free' WHERE org_name='Acme'"))
+        assert lookup_api_key(dbs, key)["plan"] == "pro"
+
+        assert lookup_api_key(dbs, "nope") is None
+        revoke_api_key(dbs, record["id"])
+        dbs.commit()
+        assert lookup_api_key(dbs, key) is None
+    SessionLocal.remove()
+
+
+def test_legacy_plaintext_key_is_upgraded(tmp_path, monkeypatch):
+    db = tmp_path / "legacy.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    init_db()
+    with SessionLocal() as dbs:
+        dbs.execute(text("INSERT INTO api_keys (org_name, key) VALUES ('Old', 'plain')"))
+        assert lookup_api_key(dbs, "plain")["org_name"] == "Old"
+        stored = dbs.execute(text("SELECT key, key_hash FROM api_keys WHERE org_name='Old'")).fetchone()
+        assert stored[0] is None
+        assert stored[1] == hash_api_key("plain")
+    SessionLocal.remove()
+
+
+def test_revocation_reaches_other_processes(tmp_path, monkeypatch, capsys):
+    from backend.utils import api_keys
+    from cli_tools.api_keys import main
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'revoke.db'}")
+    init_db()
+    main(["issue", "Acme", "--plan", "pro"])
+    key = capsys.readouterr().out.strip()
+    with SessionLocal() as dbs:
+        record = lookup_api_key(dbs, key)
+        assert record["org_name"] == "Acme"
+
+    # another worker revokes the key; this process only learns of it
+    # through the version watermark once the poll interval has passed
+    with SessionLocal() as other:
+        other.execute(text("DELETE FROM api_keys WHERE id=:i"), {"i": record["id"]})
+        api_keys._bump_version(other)
+        other.commit()
+    with SessionLocal() as dbs:
+        assert lookup_api_key(dbs, key) is not None
+        monkeypatch.setattr(api_keys, "API_KEY_REVOCATION_POLL", 0)
+        assert lookup_api_key(dbs, key) is None
+
+    main(["revoke", str(record["id"])])
+    assert capsys.readouterr().out.strip() == f"revoked {record['id']}"
+    SessionLocal.remove()
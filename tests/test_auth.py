@@ -35,3 +35,108 @@ def test_recall_requires_token(tmp_path, monkeypatch):
 
     resp = client.get('/api/recalls/recent', headers={'Authorization': f'Bearer {token}'})
     assert resp.status_code == 200
+
+
+def test_token_cache_respects_rotation_and_expiry(monkeypatch):
+    from freezegun import freeze_time
+    from backend.utils.auth import create_access_token, reload_jwt_secrets
+
+    monkeypatch.setenv('JWT_SECRET', 'old-secret')
+    reload_jwt_secrets()
+    with freeze_time('2025-06-01 12:00:00') as frozen:
+        token = create_access_token({'user_id': 7}, expires_minutes=1)
+        assert decode_access_token(token)['user_id'] == 7
+
+        monkeypatch.setenv('JWT_SECRET', 'new-secret')
+        monkeypatch.setenv('JWT_PREVIOUS_SECRETS', 'old-secret')
+        reload_jwt_secrets()
+        assert decode_access_token(token)['user_id'] == 7
+        fresh = create_access_token({'user_id': 8})
+        assert decode_access_token(fresh)['user_id'] == 8
+
+        frozen.tick(120)
+        assert decode_access_token(token) is None
+
+        monkeypatch.delenv('JWT_PREVIOUS_SECRETS')
+        reload_jwt_secrets()
+        frozen.move_to('2025-06-01 12:00:30')
+        assert decode_access_token(token) is None
+
+    monkeypatch.delenv('JWT_SECRET')
+    reload_jwt_secrets()
+
+
+def test_login_rehashes_and_sheds_load(tmp_path, monkeypatch):
+    import threading
+    from passlib.hash import bcrypt
+    from sqlalchemy import text
+    from backend.utils import passwords
+    from backend.utils.db import connect
+
+    monkeypatch.setattr(passwords, '_hasher', bcrypt.using(rounds=4))
+    client = setup(tmp_path, monkeypatch)
+    client.post('/api/auth/signup', json={'email': 'c@c.com', 'password': 'pw'})
+
+    monkeypatch.setattr(passwords, '_hasher', bcrypt.using(rounds=5))
+    resp = client.post('/api/auth/login', json={'email': 'c@c.com', 'password': 'pw'})
+    assert resp.status_code == 200
+    conn = connect()
+    stored = conn.execute(text("SELECT password_hash FROM users WHERE email='c@c.com'")).scalar()
+    conn.close()
+    assert stored.startswith('$2b$05$')
+
+    full = threading.BoundedSemaphore(1)
+    full.acquire()
+    monkeypatch.setattr(passwords, '_slots', full)
+    resp = client.post('/api/auth/login', json={'email': 'c@c.com', 'password': 'pw'})
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '1'
+
+
+def test_login_hash_timeout_returns_503(tmp_path, monkeypatch):
+    import threading
+    from passlib.hash import bcrypt
+    from backend.utils import passwords
+
+    monkeypatch.setattr(passwords, '_hasher', bcrypt.using(rounds=4))
+    client = setup(tmp_path, monkeypatch)
+    client.post('/api/auth/signup', json={'email': 'd@d.com', 'password': 'pw'})
+
+    release = threading.Event()
+
+    class StuckHasher:
+        def verify(self, plain, hashed):
+            release.wait(5)
+            return True
+
+    monkeypatch.setattr(passwords, '_hasher', StuckHasher())
+    monkeypatch.setattr(passwords, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    try:
+        resp = client.post('/api/auth/login', json={'email': 'd@d.com', 'password': 'pw'})
+    finally:
+        release.set()
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '1'
+
+
+def test_login_keeps_old_hash_when_rehash_is_shed(tmp_path, monkeypatch):
+    from passlib.hash import bcrypt
+    from sqlalchemy import text
+    from backend.utils import passwords
+    from backend.utils.db import connect
+
+    monkeypatch.setattr(passwords, '_hasher', bcrypt.using(rounds=4))
+    client = setup(tmp_path, monkeypatch)
+    client.post('/api/auth/signup', json={'email': 'e@e.com', 'password': 'pw'})
+
+    def busy(pwd):
+        raise passwords.PasswordHasherBusy('hash')
+
+    monkeypatch.setattr(passwords, '_hasher', bcrypt.using(rounds=5))
+    monkeypatch.setattr(passwords, 'hash_password', busy)
+    resp = client.post('/api/auth/login', json={'email': 'e@e.com', 'password': 'pw'})
+    assert resp.status_code == 200
+    conn = connect()
+    stored = conn.execute(text("SELECT password_hash FROM users WHERE email='e@e.com'")).scalar()
+    conn.close()
+    assert stored.startswith('$2b$04$')
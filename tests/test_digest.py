@@ -0,0 +1,147 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+import backend.tasks as tasks_mod
+from backend.utils import digest
+
+
+def _seed(conn):
+    for uid, freq in ((1, "daily"), (2, "hourly"), (3, "immediate")):
+        conn.execute(
+            text(
+                "INSERT INTO users (id, email, password_hash, created_at, digest_frequency) "
+                "VALUES (:u, :e, 'x', '2025', :f)"
+            ),
+            {"u": uid, "e": f"u{uid}@example.com", "f": freq},
+        )
+    for rid, product in (("r1", "Widget <A>"), ("r2", "Gadget"), ("r3", "Lamp")):
+        conn.execute(
+            text("INSERT INTO recalls (id, product, source, fetched_at) VALUES (:r, :p, 'cpsc', '2025-05-30')"),
+            {"r": rid, "p": product},
+        )
+    rows = [
+        (1, "r1", "digest"), (1, "r2", "digest"), (1, "r3", "urgent"),
+        (2, "r1", "digest"), (3, "r1", "digest"),
+    ]
+    for uid, rid, priority in rows:
+        conn.execute(
+            text(
+                "INSERT INTO alerts (user_id, recall_id, recall_source, channel, priority) "
+                "VALUES (:u, :r, 'cpsc', 'email', :p)"
+            ),
+            {"u": uid, "r": rid, "p": priority},
+        )
+
+
+def test_daily_digest_is_one_email_per_user(db_session, monkeypatch):
+    conn = db_session.connection()
+    _seed(conn)
+    sent = []
+    monkeypatch.setattr(digest, "send_email", lambda to, subject, tpl, ctx: sent.append((to, ctx)))
+
+    assert digest.send_digests(db_session, "daily", datetime(2025, 6, 1)) == 2
+
+    assert [to for to, _ in sent] == ["u1@example.com"]
+    ctx = sent[0][1]
+    assert ctx["count"] == 2
+    assert "Widget &lt;A&gt; (CPSC)" in ctx["items"] and "Gadget" in ctx["items"]
+    pending = db_session.execute(
+        text("SELECT user_id, recall_id FROM alerts WHERE sent_at IS NULL ORDER BY user_id")
+    ).fetchall()
+    # the urgent alert and other frequencies are untouched
+    assert [tuple(r) for r in pending] == [(1, "r3"), (2, "r1"), (3, "r1")]
+
+    sent.clear()
+    assert digest.send_digests(db_session, "daily") == 0
+    assert sent == []
+
+
+def test_digest_batch_only_emails_immediate_users(db_session, monkeypatch):
+    _seed(db_session.connection())
+    db_session.commit()
+    batches = []
+    monkeypatch.setattr(
+        tasks_mod,
+        "send_alert_batch",
+        lambda ids, subject=None, priority=None: batches.append((sorted(ids), priority)) or len(ids),
+    )
+    ids = db_session.execute(text("SELECT id FROM alerts WHERE priority='digest'")).scalars().all()
+
+    assert tasks_mod.send_digest_alert_batch(ids) == 1
+    immediate = db_session.execute(text("SELECT id FROM alerts WHERE user_id=3")).scalar()
+    assert batches == [([immediate], "digest")]
+
+
+def test_failed_digest_is_retried_without_resending_others(db_session, monkeypatch):
+    conn = db_session.connection()
+    _seed(conn)
+    conn.execute(text("UPDATE users SET digest_frequency='daily' WHERE id=2"))
+    db_session.commit()
+    sent = []
+    down = {"u1@example.com"}
+
+    def fake_send(to, subject, tpl, ctx):
+        if to in down:
+            raise RuntimeError("smtp down")
+        sent.append(to)
+
+    monkeypatch.setattr(digest, "send_email", fake_send)
+    assert digest.send_digests(db_session, "daily") == 1
+    assert sent == ["u2@example.com"]
+    errors = db_session.execute(
+        text("SELECT DISTINCT error FROM alerts WHERE user_id=1 AND priority='digest'")
+    ).scalars().all()
+    assert errors == ["smtp down"]
+
+    down.clear()
+    assert digest.send_digests(db_session, "daily") == 2
+    assert sent == ["u2@example.com", "u1@example.com"]
+
+
+def test_users_default_to_immediate_delivery(db_session):
+    db_session.execute(
+        text("INSERT INTO users (email, password_hash, created_at) VALUES ('new@example.com', 'x', '2025')")
+    )
+    frequency = db_session.execute(
+        text("SELECT digest_frequency FROM users WHERE email='new@example.com'")
+    ).scalar()
+    assert frequency == "immediate"
+
+
+def test_switching_to_immediate_flushes_pending_digest(tmp_path, monkeypatch):
+    from backend.api.app import create_app
+    from backend.db import init_db
+    from backend.utils.db import connect
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'pref.db'}")
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    init_db()
+    client = create_app().test_client()
+    token = client.post("/api/auth/signup", json={"email": "d@example.com", "password": "pw"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/digest-preference", json={"frequency": "daily"}, headers=headers).status_code == 200
+
+    conn = connect()
+    user_id = conn.execute(text("SELECT id FROM users WHERE email='d@example.com'")).scalar()
+    conn.execute(
+        text("INSERT INTO recalls (id, product, source, fetched_at) VALUES ('r1', 'Widget', 'cpsc', '2025-05-30')")
+    )
+    conn.execute(
+        text(
+            "INSERT INTO alerts (user_id, recall_id, recall_source, channel, priority) "
+            "VALUES (:u, 'r1', 'cpsc', 'email', 'digest')"
+        ),
+        {"u": user_id},
+    )
+    conn.commit()
+    conn.close()
+    sent = []
+    monkeypatch.setattr(tasks_mod, "send_email", lambda to, *a, **k: sent.append(to))
+
+    assert client.post("/api/digest-preference", json={"frequency": "immediate"}, headers=headers).status_code == 200
+
+    assert sent == ["d@example.com"]
+    conn = connect()
+    assert conn.execute(text("SELECT COUNT(*) FROM alerts WHERE sent_at IS NULL")).scalar() == 0
+    conn.close()
@@ -0,0 +1,28 @@
+from backend.api.app import create_app
+from backend.db import init_db
+from backend.utils.db import connect
+from backend.utils.entitlements import get_entitlement
+from sqlalchemy import text
+
+
+def test_entitlement_cached_until_webhook(tmp_path, monkeypatch):
+    db = tmp_path / "ent.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    init_db()
+    client = create_app().test_client()
+
+    assert get_entitlement(1).plan == "free"
+    conn = connect()
+    conn.execute(text("UPDATE stripe_customers SET plan='enterprise' WHERE user_id=1"))
+    conn.commit()
+    conn.close()
+    assert get_entitlement(1).plan == "free"
+
+    payload = {
+        "type": "customer.subscription.updated",
+        "data": {"object": {"metadata": {"user_id": "1", "plan": "pro", "seats": 2}}},
+    }
+    client.post("/api/stripe/webhook", json=payload)
+    ent = get_entitlement(1)
+    assert ent.plan == "pro"
+    assert ent.seats == 2
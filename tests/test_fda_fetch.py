@@ -46,10 +46,10 @@ def test_fda_enforcement_ingest(tmp_path, monkeypatch):
         # patch other fetchers to return no data
         import backend.utils.refresh as refresh_mod
 
-        monkeypatch.setattr(refresh_mod, "fetch_cpsc", lambda use_cache=False: [])
-        monkeypatch.setattr(refresh_mod, "fetch_fda", lambda use_cache=False: [])
-        monkeypatch.setattr(refresh_mod, "fetch_nhtsa", lambda use_cache=False: [])
-        monkeypatch.setattr(refresh_mod, "fetch_usda", lambda use_cache=False: [])
+        monkeypatch.setattr(refresh_mod, "stream_cpsc", lambda use_cache=False: [])
+        monkeypatch.setattr(refresh_mod, "stream_fda", lambda use_cache=False: [])
+        monkeypatch.setattr(refresh_mod, "stream_nhtsa", lambda use_cache=False: [])
+        monkeypatch.setattr(refresh_mod, "stream_usda", lambda use_cache=False: [])
 
         refresh_recalls()
         refresh_recalls()
@@ -15,3 +15,20 @@ def test_fetch_cpsc(monkeypatch):
     assert any(r["hazard"] == "Fire" for r in recalls)
     assert any(r["recall_date"] == "2024-04-01" for r in recalls)
 
+
+
+def test_fallback_skips_duplicates_in_the_sample(monkeypatch, tmp_path):
+    import importlib
+    import json
+
+    module = importlib.import_module("backend.api.recalls.fetch_cpsc")
+    sample = tmp_path / "cpsc.json"
+    record = {"RecallID": "7", "Product": "Widget", "Hazard": "Fire"}
+    sample.write_text(json.dumps([record, record]))
+    monkeypatch.setattr(module, "DATA_FILE", sample)
+
+    def fake_get(*args, **kwargs):
+        raise requests.exceptions.RequestException("blocked")
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    assert [r["id"] for r in fetch_cpsc()] == ["7"]
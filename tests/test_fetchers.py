@@ -1,3 +1,4 @@
+import json
 import requests
 from backend.utils.refresh import refresh_recalls
 from backend.db import init_db
@@ -10,8 +11,14 @@ class FakeResponse:
         pass
     def json(self):
         return self._data
+    def iter_content(self, chunk_size=1):
+        raw = json.dumps(self._data).encode()
+        for i in range(0, len(raw), 16):
+            yield raw[i:i + 16]
+    def close(self):
+        pass
 
-def fake_get(url, params=None, timeout=10):
+def fake_get(url, params=None, timeout=10, stream=False):
     key = (
         params.get("offset") if params and "offset" in params else params.get("skip") if params and "skip" in params else params.get("page", 0)
     )
@@ -0,0 +1,79 @@
+import re
+
+import pytest
+from sqlalchemy import text
+
+ROWS = 5000
+
+HOT_QUERIES = {
+    "subscriptions": (
+        "SELECT user_id, product_query FROM subscriptions WHERE recall_source=:src",
+        {"src": "CPSC"},
+    ),
+    "products": ("SELECT id FROM products WHERE lower(name)=lower(:n)", {"n": "Widget 7"}),
+    "alerts": (
+        "SELECT id FROM alerts WHERE user_id=:u ORDER BY sent_at DESC LIMIT 50",
+        {"u": 7},
+    ),
+    "push_tokens": ("SELECT token FROM push_tokens WHERE user_id=:u", {"u": 7}),
+    "email_unsub_tokens": ("SELECT token FROM email_unsub_tokens WHERE user_id=:u", {"u": 7}),
+    "user_items": ("SELECT upc FROM user_items WHERE user_id=:u", {"u": 7}),
+    "sent_notifications": (
+        "SELECT DISTINCT user_id FROM sent_notifications WHERE recall_id=:r",
+        {"r": "r7"},
+    ),
+    "recalls_recent": (
+        "SELECT id, product FROM recalls ORDER BY recall_date DESC LIMIT 25",
+        {},
+    ),
+    "recalls_by_source": (
+        "SELECT id FROM recalls WHERE source=:src ORDER BY recall_date DESC LIMIT 25",
+        {"src": "FDA"},
+    ),
+    "webhooks": (
+        "SELECT url FROM webhooks WHERE source IS NULL OR source=:src",
+        {"src": "CPSC"},
+    ),
+}
+
+
+@pytest.fixture
+def large_db(db_session):
+    conn = db_session.connection()
+    users = [{"id": i, "email": f"u{i}@example.com"} for i in range(1, ROWS + 1)]
+    conn.execute(
+        text("INSERT INTO users (id, email, password_hash, created_at) VALUES (:id, :email, 'x', '2024')"),
+        users,
+    )
+    by_user = [{"u": i, "n": i % 50} for i in range(1, ROWS + 1)]
+    conn.execute(text("INSERT INTO products (name, user_id) VALUES ('Widget ' || :n, :u)"), by_user)
+    conn.execute(
+        text("INSERT INTO subscriptions (user_id, recall_source, product_query) VALUES (:u, CASE :n % 3 WHEN 0 THEN 'CPSC' WHEN 1 THEN 'FDA' ELSE 'NHTSA' END, 'widget')"),
+        by_user,
+    )
+    conn.execute(
+        text("INSERT INTO alerts (user_id, recall_id, channel, sent_at) VALUES (:u, 'r' || :n, 'email', '2024-01-' || :n)"),
+        by_user,
+    )
+    conn.execute(text("INSERT INTO push_tokens (user_id, token) VALUES (:u, 'tok' || :u)"), by_user)
+    conn.execute(text("INSERT INTO email_unsub_tokens (user_id, token) VALUES (:u, 'unsub' || :u)"), by_user)
+    conn.execute(text("INSERT INTO user_items (user_id, upc) VALUES (:u, '0000' || :n)"), by_user)
+    conn.execute(text("INSERT INTO sent_notifications (user_id, recall_id) VALUES (:u, 'r' || :u)"), by_user)
+    conn.execute(
+        text("INSERT INTO recalls (id, product, recall_date, source, fetched_at) VALUES ('r' || :u, 'Widget ' || :n, '2024-' || :n, CASE :u % 3 WHEN 0 THEN 'CPSC' WHEN 1 THEN 'FDA' ELSE 'NHTSA' END, '2024')"),
+        by_user,
+    )
+    conn.execute(
+        text("INSERT INTO webhooks (url, source) VALUES ('https://example.com/' || :u, CASE :n WHEN 0 THEN 'CPSC' WHEN 1 THEN NULL ELSE 'FEED' || :n END)"),
+        by_user,
+    )
+    conn.execute(text("ANALYZE"))
+    return conn
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_queries_use_indexes(large_db, name):
+    sql, params = HOT_QUERIES[name]
+    plan = [r[-1] for r in large_db.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+    full_scans = [step for step in plan if re.match(r"SCAN \w+$", step)]
+    assert not full_scans, plan
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from backend.utils.jsonstream import iter_file_items, iter_items, write_items
+
+
+def _chunks(raw: bytes, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, 4096])
+def test_iter_items_across_chunk_boundaries(size):
+    records = [{"id": i, "text": "é \"]}\\" * i, "n": 10 ** i} for i in range(20)]
+    doc = {"meta": {"results": [{"skip": True}]}, "results": records + [123456], "other": [1]}
+    raw = json.dumps(doc, ensure_ascii=False).encode()
+    assert list(iter_items(_chunks(raw, size), keys=("results",))) == records + [123456]
+
+
+def test_iter_items_top_level_array_and_empty_documents():
+    assert list(iter_items([b"[1, ", b"2", b"3]"])) == [1, 23]
+    assert list(iter_items([b"{}"])) == []
+    assert list(iter_items([b'{"results": []}'])) == []
+    with pytest.raises(ValueError):
+        list(iter_items([b'{"results": [1 2]}']))
+
+
+def test_write_items_replaces_cache_only_when_complete(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("[1]")
+
+    def failing():
+        yield {"id": 2}
+        raise RuntimeError("upstream died")
+
+    with pytest.raises(RuntimeError):
+        list(write_items(failing(), path))
+    assert json.loads(path.read_text()) == [1]
+    assert list(tmp_path.iterdir()) == [path]
+
+    assert list(write_items(iter([{"id": 3}, {"id": 4}]), path)) == [{"id": 3}, {"id": 4}]
+    with path.open("rb") as fh:
+        assert list(iter_file_items(fh)) == [{"id": 3}, {"id": 4}]
+
+
+def test_refresh_consumes_sources_in_batches(tmp_path, monkeypatch):
+    import backend.utils.refresh as refresh_mod
+    from backend.db import init_db
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'stream.db'}")
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    init_db()
+    pulled = []
+
+    def cpsc(use_cache=False):
+        for i in range(5):
+            pulled.append(i)
+            yield {"id": f"S{i}", "product": "Thing", "hazard": "Fire" if i % 2 else "Label", "source": "cpsc"}
+
+    batches = []
+    upsert = refresh_mod._upsert
+
+    def recording_upsert(conn, batch):
+        batches.append((len(batch), len(pulled)))
+        return upsert(conn, batch)
+
+    monkeypatch.setattr(refresh_mod, "REFRESH_BATCH_SIZE", 2)
+    monkeypatch.setattr(refresh_mod, "_upsert", recording_upsert)
+    monkeypatch.setattr(refresh_mod, "stream_cpsc", cpsc)
+    for name in ("stream_fda", "stream_nhtsa", "stream_usda"):
+        monkeypatch.setattr(refresh_mod, name, lambda use_cache=False: [])
+    monkeypatch.setattr(refresh_mod, "stream_drug_recalls", lambda: [])
+    monkeypatch.setattr(refresh_mod, "stream_device_recalls", lambda: [])
+
+    summary = refresh_mod.refresh_recalls()
+
+    # each batch is written before the next one is pulled from the source
+    assert batches == [(2, 2), (2, 4), (1, 5)]
+    assert summary["new"] == 5 and summary["urgent"] == 2 and summary["digest"] == 3
+
+
+def test_refresh_closes_its_connection_when_a_source_fails(monkeypatch):
+    import pytest
+
+    import backend.utils.refresh as refresh_mod
+
+    closed = []
+    conn = refresh_mod.db_utils.connect()
+    monkeypatch.setattr(conn, "close", lambda: closed.append(True))
+    monkeypatch.setattr(refresh_mod.db_utils, "connect", lambda: conn)
+
+    def broken():
+        raise RuntimeError("feed went away")
+        yield
+
+    monkeypatch.setattr(refresh_mod, "_stream_recalls", broken)
+    with pytest.raises(RuntimeError):
+        refresh_mod.refresh_recalls()
+    assert closed == [True]
@@ -41,3 +41,67 @@ def test_queue_notifications_inserts(tmp_path, monkeypatch):
         count = db.execute(text('SELECT COUNT(*) FROM sent_notifications')).fetchone()[0]
         assert count == 1
     SessionLocal.remove()
+
+
+def test_alert_batch_retry_only_resends_failures(db_session, monkeypatch):
+    import pytest
+    import backend.tasks as tasks_mod
+
+    conn = db_session.connection()
+    for uid in (1, 2):
+        conn.execute(
+            text("INSERT INTO users (id, email, password_hash, created_at) VALUES (:u, :e, 'x', '2025')"),
+            {"u": uid, "e": f"u{uid}@example.com"},
+        )
+    # the same recall id exists in two sources
+    for source, product in (("cpsc", "Stroller"), ("fda", "Cough syrup")):
+        conn.execute(
+            text("INSERT INTO recalls (id, product, source, fetched_at) VALUES ('X1', :p, :s, '2025-01-01')"),
+            {"p": product, "s": source},
+        )
+    for uid in (1, 2):
+        conn.execute(
+            text(
+                "INSERT INTO alerts (user_id, recall_id, recall_source, channel, priority) "
+                "VALUES (:u, 'X1', 'fda', 'email', 'urgent')"
+            ),
+            {"u": uid},
+        )
+    db_session.commit()
+    ids = db_session.execute(text("SELECT id FROM alerts ORDER BY user_id")).scalars().all()
+
+    sent = []
+    down = {"u2@example.com"}
+
+    def fake_send(to, subject, template, ctx):
+        if to in down:
+            raise RuntimeError("smtp down")
+        sent.append((to, ctx["share_twitter"]))
+
+    monkeypatch.setattr(tasks_mod, "send_email", fake_send)
+    with pytest.raises(tasks_mod.AlertDeliveryError):
+        tasks_mod.send_alert_batch(ids)
+    rows = db_session.execute(text("SELECT sent_at IS NOT NULL, error FROM alerts ORDER BY user_id")).fetchall()
+    assert [tuple(r) for r in rows] == [(1, None), (0, "smtp down")]
+
+    down.clear()
+    assert tasks_mod.send_alert_batch(ids) == 1
+    assert [to for to, _ in sent] == ["u1@example.com", "u2@example.com"]
+    assert all("Cough%20syrup" in link for _, link in sent)
+
+
+def test_alert_batch_finds_recall_for_alerts_without_source(db_session, monkeypatch):
+    import backend.tasks as tasks_mod
+
+    conn = db_session.connection()
+    conn.execute(text("INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'u1@example.com', 'x', '2025')"))
+    conn.execute(text("INSERT INTO recalls (id, product, source, fetched_at) VALUES ('L1', 'Kettle', 'cpsc', '2025-01-01')"))
+    # created before alerts recorded the recall source
+    conn.execute(text("INSERT INTO alerts (user_id, recall_id, channel) VALUES (1, 'L1', 'email')"))
+    db_session.commit()
+    ids = db_session.execute(text("SELECT id FROM alerts")).scalars().all()
+
+    sent = []
+    monkeypatch.setattr(tasks_mod, "send_email", lambda to, subject, template, ctx: sent.append(ctx["share_twitter"]))
+    assert tasks_mod.send_alert_batch(ids) == 1
+    assert "Kettle" in sent[0]
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 from backend.api.app import create_app
 from backend.db import init_db
 from backend.utils.session import SessionLocal
@@ -24,3 +26,96 @@ def test_recalls_requires_key(tmp_path, monkeypatch):
     assert resp.status_code == 200
     data = resp.get_json()
     assert isinstance(data, list)
+
+
+def _insert_recalls(rows):
+    with SessionLocal() as dbs:
+        dbs.execute(text("DELETE FROM recalls"))
+        for rid, date, fetched in rows:
+            dbs.execute(
+                text(
+                    "INSERT INTO recalls (id, product, hazard, recall_date, source, fetched_at) "
+                    "VALUES (:i, 'Toy', 'Choking', :d, 'cpsc', :f)"
+                ),
+                {"i": rid, "d": date, "f": fetched},
+            )
+        dbs.commit()
+
+
+def test_recalls_keyset_pagination(tmp_path, monkeypatch):
+    client = setup_client(tmp_path, monkeypatch)
+    _insert_recalls(
+        [
+            ("a", "2024-01-01", "2024-01-02"),
+            ("b", "2024-01-01", "2024-01-02"),
+            ("c", "2024-02-01", "2024-02-02"),
+            ("d", None, "2024-03-02"),
+            ("e", "2024-03-01", "2024-03-02"),
+        ]
+    )
+    seen = []
+    params = {"limit": 2}
+    while True:
+        resp = client.get('/v1/recalls', query_string=params, headers={'X-Api-Key': 'abc'})
+        assert resp.status_code == 200
+        seen.extend(r['id'] for r in resp.get_json())
+        cursor = resp.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        params = {"limit": 2, "cursor": cursor}
+    assert seen == ['e', 'c', 'b', 'a', 'd']
+
+
+def test_recalls_fields_and_updated_since(tmp_path, monkeypatch):
+    client = setup_client(tmp_path, monkeypatch)
+    _insert_recalls(
+        [("old", "2024-01-01", "2024-01-02"), ("new", "2024-02-01", "2024-02-02")]
+    )
+    resp = client.get(
+        '/v1/recalls',
+        query_string={"updated_since": "2024-02-01", "fields": "id,hazard"},
+        headers={'X-Api-Key': 'abc'},
+    )
+    assert resp.get_json() == [{"id": "new", "hazard": "Choking"}]
+    resp = client.get('/v1/recalls?fields=password', headers={'X-Api-Key': 'abc'})
+    assert resp.status_code == 400
+    resp = client.get('/v1/recalls?cursor=bogus', headers={'X-Api-Key': 'abc'})
+    assert resp.status_code == 400
+
+
+def test_recalls_export_streams_and_counts_once(tmp_path, monkeypatch):
+    import gzip
+    import json
+
+    client = setup_client(tmp_path, monkeypatch)
+    _insert_recalls(
+        [("old", "2024-01-01", "2024-01-02"), ("new", "2024-02-01", "2024-02-02")]
+    )
+    resp = client.get('/v1/recalls/export', headers={'X-Api-Key': 'abc'})
+    assert resp.status_code == 200
+    rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r['id'] for r in rows] == ['old', 'new']
+
+    resp = client.get(
+        '/v1/recalls/export?format=csv&since=2024-02-01&fields=id,source',
+        headers={'X-Api-Key': 'abc', 'Accept-Encoding': 'gzip'},
+    )
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(resp.get_data()).decode().splitlines()
+    assert lines == ['id,source', 'new,cpsc']
+    assert resp.headers['Vary'] == 'Accept-Encoding'
+
+    resp = client.get(
+        '/v1/recalls/export', headers={'X-Api-Key': 'abc', 'Accept-Encoding': 'gzip;q=0, identity'}
+    )
+    assert 'Content-Encoding' not in resp.headers
+    assert len(resp.get_data(as_text=True).splitlines()) == 2
+    started = datetime.fromisoformat(resp.headers['X-Export-Started-At'])
+    next_since = datetime.fromisoformat(resp.headers['X-Export-Next-Since'])
+    assert started - next_since == timedelta(hours=1)
+
+    with SessionLocal() as dbs:
+        used = dbs.execute(
+            text("SELECT requests_this_month FROM api_keys WHERE org_name='Test'")
+        ).scalar()
+    assert used == 3
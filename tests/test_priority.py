@@ -14,3 +14,100 @@ def test_classify_recall_keyword():
 def test_classify_recall_default():
     r = Obj(classification="Class III", hazard="minor defect")
     assert classify_recall(r) == "digest"
+
+
+def test_recall_priority_accepts_mappings():
+    from backend.utils.priority import recall_priority
+
+    assert recall_priority({"classification": "Class I", "hazard": None}) == "urgent"
+    assert recall_priority({"hazard": "mislabeled allergen"}) == "digest"
+
+
+def test_dispatch_routes_by_priority(monkeypatch):
+    from backend import tasks
+
+    monkeypatch.setenv("CELERY_BROKER_URL", "memory://")
+    monkeypatch.setattr(tasks, "ALERT_FANOUT_CHUNK", 2)
+    urgent, digest = [], []
+    monkeypatch.setattr(tasks.send_alert_batch, "apply_async", lambda args, queue: urgent.append((args, queue)))
+    monkeypatch.setattr(tasks.send_digest_alert_batch, "delay", lambda ids, subject: digest.append(ids))
+
+    tasks.dispatch_alerts([1, 2, 3], "urgent")
+    tasks.dispatch_alerts([4], "digest")
+
+    assert urgent == [(([1, 2], None, "urgent"), "alerts_urgent"), (([3], None, "urgent"), "alerts_urgent")]
+    assert digest == [[4]]
+    assert tasks.celery.amqp.router.route({}, "backend.tasks.send_digest_alert_batch")["queue"].name == "alerts_digest"
+
+
+def test_classify_recalls_uses_per_source_keywords(monkeypatch):
+    from backend.utils.priority import classify_recalls, priority_counts, recall_priority
+
+    monkeypatch.setenv("PRIORITY_KEYWORDS_NHTSA", "crash, airbag")
+    batch = [
+        {"source": "nhtsa", "hazard": "Increased risk of a CRASH"},
+        {"source": "nhtsa", "hazard": "Fire risk"},
+        {"source": "cpsc", "hazard": "Fire risk"},
+        {"source": "fda", "classification": "Class I", "hazard": None},
+        {"source": "cpsc", "hazard": "minor defect"},
+    ]
+    priorities = classify_recalls(batch)
+    assert priorities == ["urgent", "digest", "urgent", "urgent", "digest"]
+    assert priorities == [recall_priority(r) for r in batch]
+    assert priority_counts(priorities) == {"urgent": 3, "digest": 2}
+    assert priority_counts([]) == {"urgent": 0, "digest": 0}
+
+
+def test_recall_priority_prefers_stored_value():
+    from backend.utils.priority import recall_priority
+
+    assert recall_priority({"hazard": "Fire risk", "priority": "digest"}) == "digest"
+
+
+def test_refresh_sends_class_i_fda_recalls_urgently(tmp_path, monkeypatch):
+    import importlib
+
+    from sqlalchemy import text
+
+    import backend.utils.refresh as refresh_mod
+    from backend import tasks
+    from backend.db import init_db
+    from backend.utils.db import connect
+    from backend.utils.names import product_key
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'class1.db'}")
+    monkeypatch.setenv("CELERY_BROKER_URL", "memory://")
+    init_db()
+    conn = connect()
+    conn.execute(
+        text("INSERT INTO products (name, name_key, user_id) VALUES ('Peanut butter', :k, 1)"),
+        {"k": product_key("Peanut butter")},
+    )
+    conn.commit()
+    conn.close()
+
+    raw = {
+        "recall_number": "F-0001-2025",
+        "product_description": "Peanut butter",
+        "reason_for_recall": "Undeclared allergen",
+        "classification": "Class I",
+        "recall_initiation_date": "20250101",
+    }
+    # the package re-exports fetch_fda the function over the module name
+    parse = importlib.import_module("backend.api.recalls.fetch_fda")._parse
+    monkeypatch.setattr(refresh_mod, "stream_fda", lambda use_cache=False: parse([raw]))
+    for name in ("stream_cpsc", "stream_nhtsa", "stream_usda"):
+        monkeypatch.setattr(refresh_mod, name, lambda use_cache=False: [])
+    monkeypatch.setattr(refresh_mod, "stream_drug_recalls", lambda: [])
+    monkeypatch.setattr(refresh_mod, "stream_device_recalls", lambda: [])
+    urgent = []
+    monkeypatch.setattr(tasks.send_alert_batch, "apply_async", lambda args, queue: urgent.append((args, queue)))
+    monkeypatch.setattr(tasks.send_notifications, "delay", lambda recalls: None)
+
+    summary = refresh_mod.refresh_recalls()
+
+    assert summary["urgent"] == 1
+    conn = connect()
+    assert conn.execute(text("SELECT priority FROM recalls WHERE id='F-0001-2025'")).scalar() == "urgent"
+    conn.close()
+    assert [queue for _, queue in urgent] == ["alerts_urgent"]
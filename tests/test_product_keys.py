@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from backend.utils.alerts import create_alerts_for_new_recalls
+from backend.utils.names import product_key
+
+
+def test_product_key_normalises_case_space_and_punctuation():
+    assert product_key("  Widget-Pro   2000! ") == "widget pro 2000"
+    assert product_key("WIDGET_pro 2000") == "widget pro 2000"
+    assert product_key(None) is None
+
+
+def test_alerts_created_for_new_recalls_only(db_session):
+    conn = db_session.connection()
+    for uid, name in [(1, "Widget Pro"), (2, "widget-pro"), (3, "Gadget"), (None, "Widget Pro")]:
+        conn.execute(
+            text("INSERT INTO products (name, name_key, user_id) VALUES (:n, :k, :u)"),
+            {"n": name, "k": product_key(name), "u": uid},
+        )
+    for rid, product in [("new", "WIDGET PRO"), ("old", "Gadget")]:
+        conn.execute(
+            text(
+                "INSERT INTO recalls (id, product, product_key, source, fetched_at) "
+                "VALUES (:i, :p, :k, 'cpsc', '2024')"
+            ),
+            {"i": rid, "p": product, "k": product_key(product)},
+        )
+    ids = create_alerts_for_new_recalls(conn, [{"id": "new", "source": "cpsc"}])
+    rows = conn.execute(text("SELECT id, user_id, recall_id FROM alerts ORDER BY user_id")).fetchall()
+    assert sorted(ids) == [r.id for r in rows]
+    assert [(r.user_id, r.recall_id) for r in rows] == [(1, "new"), (2, "new")]
+    assert create_alerts_for_new_recalls(conn, []) == []
@@ -0,0 +1,56 @@
+import pytest
+import responses
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from backend.utils import push
+
+
+def _tokens(conn, pairs):
+    for user_id, token in pairs:
+        conn.execute(
+            text("INSERT INTO push_tokens (user_id, token) VALUES (:u, :t)"),
+            {"u": user_id, "t": token},
+        )
+
+
+def test_send_push_batches_and_prunes(db_session, monkeypatch):
+    conn = db_session.connection()
+    _tokens(conn, [(1, "a"), (1, "b"), (2, "c"), (3, "dead"), (4, "other")])
+    fake = push.FakePushProvider(max_batch=2, unregistered={"dead"})
+    monkeypatch.setattr(push, "_provider", fake)
+    before = REGISTRY.get_sample_value("push_tokens_pruned_total") or 0
+
+    result = push.send_push(conn, [(1, "Recall"), (2, "Recall"), (3, "Recall"), (4, "Other")])
+
+    assert result == push.PushResult(4, 0, ["dead"])
+    assert sorted(len(tokens) for tokens, _ in fake.batches) == [1, 2, 2]
+    remaining = conn.execute(text("SELECT token FROM push_tokens ORDER BY token")).scalars().all()
+    assert remaining == ["a", "b", "c", "other"]
+    assert REGISTRY.get_sample_value("push_tokens_pruned_total") == before + 1
+
+
+@responses.activate
+def test_expo_provider_maps_tickets():
+    responses.add(
+        responses.POST,
+        push.EXPO_PUSH_URL,
+        json={
+            "data": [
+                {"status": "ok", "id": "1"},
+                {"status": "error", "details": {"error": "DeviceNotRegistered"}},
+                {"status": "error", "details": {"error": "MessageRateExceeded"}},
+            ]
+        },
+    )
+    result = push.ExpoPushProvider().send(["t1", "t2", "t3"], "hello")
+    assert result == push.PushResult(1, 1, ["t2"])
+    assert len(responses.calls[0].request.body) > 0
+
+
+def test_provider_without_send_cannot_be_constructed():
+    class Incomplete(push.PushProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,59 @@
+import pytest
+from backend.db import init_db
+from backend.tasks import reset_monthly_quotas
+from backend.utils.db import connect
+from backend.utils.quota import consume_api_key_quota, consume_user_quota
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+def setup_db(tmp_path, monkeypatch):
+    db = tmp_path / "quota.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    init_db()
+
+
+def test_user_quota_is_atomic_and_resets(tmp_path, monkeypatch):
+    setup_db(tmp_path, monkeypatch)
+    with connect() as conn:
+        conn.execute(text("UPDATE stripe_customers SET quota=2 WHERE user_id=1"))
+        assert consume_user_quota(conn, 1)
+        assert consume_user_quota(conn, 1)
+        assert not consume_user_quota(conn, 1)
+        conn.execute(text("UPDATE stripe_customers SET plan='enterprise' WHERE user_id=1"))
+        assert consume_user_quota(conn, 1)
+        conn.execute(
+            text("INSERT INTO users (email, password_hash, created_at) VALUES ('n@n.com', 'x', '')")
+        )
+        assert consume_user_quota(conn, 2)
+        quota = conn.execute(text("SELECT quota FROM stripe_customers WHERE user_id=2")).scalar()
+        conn.commit()
+    assert quota == 99
+
+
+def test_api_key_quota_and_monthly_reset(tmp_path, monkeypatch):
+    setup_db(tmp_path, monkeypatch)
+    with connect() as conn:
+        conn.execute(text("UPDATE api_keys SET monthly_quota=1"))
+        key_id = conn.execute(text("SELECT id FROM api_keys")).scalar()
+        assert consume_api_key_quota(conn, key_id)
+        assert not consume_api_key_quota(conn, key_id)
+        conn.execute(text("UPDATE stripe_customers SET quota=0"))
+        conn.commit()
+
+    reset_monthly_quotas()
+
+    with connect() as conn:
+        used = conn.execute(text("SELECT requests_this_month FROM api_keys")).scalar()
+        quota = conn.execute(text("SELECT quota FROM stripe_customers WHERE user_id=1")).scalar()
+    assert used == 0
+    assert quota == 100
+
+
+def test_user_quota_reraises_non_race_integrity_errors(tmp_path, monkeypatch):
+    setup_db(tmp_path, monkeypatch)
+    with connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        # no such user: the FK violation must surface instead of recursing
+        with pytest.raises(IntegrityError):
+            consume_user_quota(conn, 999)
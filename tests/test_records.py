@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from backend.utils.records import RecallRecord
+
+
+def test_record_behaves_like_a_recall_dict():
+    r = RecallRecord(source="cpsc", id="1", product="Heater", hazard="Fire")
+    assert r["product"] == "Heater"
+    assert r.get("url") is None and r.get("missing", "x") == "x"
+    assert "hazard" in r and "missing" not in r
+
+    r["priority"] = "urgent"
+    assert r.priority == "urgent"
+    with pytest.raises(KeyError):
+        r["missing"] = 1
+
+    as_dict = dict(r)
+    assert as_dict["priority"] == "urgent" and len(as_dict) == len(r)
+    assert r == as_dict
+    assert json.loads(json.dumps(as_dict)) == as_dict
+    assert RecallRecord.from_mapping({**as_dict, "extra": 1}) == r
+
+
+def test_record_is_slotted_and_interns_source():
+    a = RecallRecord(source="".join(["nh", "tsa"]), id="1")
+    b = RecallRecord(source="".join(["nht", "sa"]), id="2")
+    assert a.source is b.source
+    assert not hasattr(a, "__dict__")
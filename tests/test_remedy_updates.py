@@ -25,6 +25,8 @@ def test_poll_remedy_updates(tmp_path, monkeypatch):
     conn.close()
 
     class FakeResp:
+        status_code = 200
+        headers = {}
         text = "<h2>Remedy</h2><p>Do this</p>"
 
         def raise_for_status(self):
@@ -44,3 +46,141 @@ def test_poll_remedy_updates(tmp_path, monkeypatch):
     count = conn.execute(text("SELECT COUNT(*) FROM alerts")).fetchone()[0]
     conn.close()
     assert count == 1
+
+
+def test_poll_remedy_updates_conditional_and_due_only(tmp_path, monkeypatch):
+    db = tmp_path / "rem2.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    init_db()
+    conn = connect()
+    conn.execute(text("ALTER TABLE recalls ADD COLUMN url TEXT"))
+    conn.execute(
+        text(
+            "INSERT INTO recalls (id, product, source, fetched_at, remedy_updates, url, "
+            "next_remedy_check_at, remedy_etag) VALUES "
+            "('due','A','cpsc','2025-05-30','[]','http://h/due','2000-01-01','\"v1\"'), "
+            "('later','B','cpsc','2025-05-30','[]','http://h/later','2999-01-01',NULL)"
+        )
+    )
+    conn.commit()
+    conn.close()
+
+    class NotModified:
+        status_code = 304
+        headers = {}
+        text = ""
+
+    calls = []
+
+    def fake_get(url, **kw):
+        calls.append((url, kw.get("headers")))
+        return NotModified()
+
+    monkeypatch.setattr(requests, "get", fake_get)
+
+    assert poll_remedy_updates() == 0
+    assert calls == [("http://h/due", {"If-None-Match": '"v1"'})]
+    conn = connect()
+    row = conn.execute(
+        text("SELECT next_remedy_check_at, remedy_etag FROM recalls WHERE id='due'")
+    ).fetchone()
+    conn.close()
+    assert row[0] > "2025" and row[1] == '"v1"'
+
+
+def test_extract_remedy_rules_per_source():
+    from backend.utils.remedy import extract_remedy
+
+    html = (
+        "<h2>Remedy</h2><p>Contact the firm for a refund.</p>"
+        "<p><strong>Remedy:</strong> Dealers will repair the part.</p>"
+    )
+    assert extract_remedy(html, "cpsc") == "Contact the firm for a refund."
+    assert extract_remedy(html, "nhtsa") == "Dealers will repair the part."
+    assert extract_remedy("<p><b>REMEDY</b> Stop use</p>") == "Stop use"
+    assert extract_remedy("<h1>Recall</h1><p>No remedy yet</p>") is None
+    assert extract_remedy("") is None
+
+
+def test_remedy_fan_out_is_batched(tmp_path, monkeypatch):
+    import backend.tasks as tasks_mod
+
+    db = tmp_path / "rem3.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    monkeypatch.setattr(tasks_mod, "ALERT_FANOUT_CHUNK", 2)
+    init_db()
+    conn = connect()
+    conn.execute(text("ALTER TABLE recalls ADD COLUMN url TEXT"))
+    conn.execute(
+        text(
+            "INSERT INTO recalls (id, product, source, fetched_at, remedy_updates, url) "
+            "VALUES ('car','Sedan','nhtsa','2025-05-30','[]','http://x')"
+        )
+    )
+    for uid in (1, 2, 3):
+        if uid > 1:
+            conn.execute(
+                text("INSERT INTO users (id, email, password_hash, created_at) VALUES (:u, :e, 'x', '2025')"),
+                {"u": uid, "e": f"u{uid}@example.com"},
+            )
+        conn.execute(text("INSERT INTO sent_notifications (user_id, recall_id) VALUES (:u, 'car')"), {"u": uid})
+        conn.execute(text("INSERT INTO push_tokens (user_id, token) VALUES (:u, :t)"), {"u": uid, "t": f"tok{uid}"})
+    conn.execute(text("UPDATE users SET digest_frequency='immediate'"))
+    conn.commit()
+    conn.close()
+
+    class FakeResp:
+        status_code = 200
+        headers = {}
+        text = "<p><strong>Remedy:</strong> Dealers will fix it.</p>"
+
+    monkeypatch.setattr(requests, "get", lambda *a, **k: FakeResp())
+    sent, batches = [], []
+    monkeypatch.setattr(tasks_mod, "send_email", lambda to, subject, *a, **k: sent.append((to, subject)))
+    original = tasks_mod.send_alert_batch
+    monkeypatch.setattr(
+        tasks_mod,
+        "send_alert_batch",
+        lambda ids, subject=None, priority=None: batches.append(ids) or original(ids, subject, priority),
+    )
+
+    from prometheus_client import REGISTRY
+
+    def delivered():
+        return REGISTRY.get_sample_value("alert_delivery_seconds_count", {"priority": "digest"}) or 0
+
+    before = delivered()
+    assert poll_remedy_updates() == 1
+    assert delivered() == before + 3
+    assert [len(b) for b in batches] == [2, 1]
+    assert sorted(to for to, _ in sent) == ["u2@example.com", "u3@example.com", "user@example.com"]
+    assert {subject for _, subject in sent} == {"Update: Sedan recall"}
+    conn = connect()
+    assert conn.execute(text("SELECT COUNT(*) FROM alerts WHERE sent_at IS NULL")).scalar() == 0
+    assert conn.execute(text("SELECT COUNT(*) FROM email_unsub_tokens")).scalar() == 3
+    conn.close()
+
+
+def test_remedy_alerts_stay_with_the_notified_source(db_session):
+    import backend.tasks as tasks_mod
+
+    conn = db_session.connection()
+    # user 1 was alerted about the FDA recall; user 2's alert has been archived
+    conn.execute(
+        text(
+            "INSERT INTO alerts (user_id, recall_id, recall_source, channel, sent_at) "
+            "VALUES (1, 'X1', 'fda', 'email', '2025-01-01')"
+        )
+    )
+    conn.execute(text("INSERT INTO sent_notifications (user_id, recall_id) VALUES (1, 'X1'), (2, 'X1')"))
+    changed = [
+        {"b_id": "X1", "b_source": "cpsc", "product": "Stroller", "priority": "digest"},
+        {"b_id": "X1", "b_source": "fda", "product": "Cough syrup", "priority": "digest"},
+    ]
+    groups = tasks_mod._queue_remedy_alerts(db_session, changed)
+    assert sorted(subject for _, subject in groups) == ["Update: Cough syrup recall", "Update: Stroller recall"]
+    created = conn.execute(
+        text("SELECT user_id, recall_source FROM alerts WHERE sent_at IS NULL ORDER BY user_id, recall_source")
+    ).fetchall()
+    assert [tuple(r) for r in created] == [(1, "fda"), (2, "cpsc"), (2, "fda")]
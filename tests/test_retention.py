@@ -0,0 +1,109 @@
+import gzip
+import json
+from datetime import date
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from backend.utils import retention
+from backend.utils.notifications import queue_notifications
+from backend.utils.session import SessionLocal
+
+
+def _insert_alerts(conn, created):
+    for i, ts in enumerate(created, start=1):
+        conn.execute(
+            text(
+                "INSERT INTO alerts (id, user_id, recall_id, channel, created_at) "
+                "VALUES (:i, 1, :r, 'email', :ts)"
+            ),
+            {"i": i, "r": f"r{i}", "ts": ts},
+        )
+
+
+class _FakePgConn:
+    """Records the SQL issued against a partitioned Postgres ``alerts``."""
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self, partitions=()):
+        self.partitions = list(partitions)
+        self.statements = []
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+        rows = [(p,) for p in self.partitions] if "pg_inherits" in sql else []
+        return SimpleNamespace(fetchall=lambda: rows, rowcount=0)
+
+
+def test_add_months_wraps_years():
+    assert retention.add_months(date(2024, 11, 17), 3) == date(2025, 2, 1)
+    assert retention.add_months(date(2024, 1, 5), -1) == date(2023, 12, 1)
+
+
+def test_archive_alerts_moves_expired_rows(db_session):
+    conn = db_session.connection()
+    _insert_alerts(conn, ["2023-01-10 08:00:00", "2023-12-31T23:00:00", "2024-03-01 00:00:00"])
+    moved = retention.archive_alerts(conn, today=date(2024, 6, 15), keep_months=3, archive_dir=None)
+    assert moved == 2
+    assert conn.execute(text("SELECT id FROM alerts")).scalars().all() == [3]
+    assert sorted(conn.execute(text("SELECT id FROM alerts_archive")).scalars()) == [1, 2]
+
+
+def test_archive_alerts_to_file(db_session, tmp_path):
+    conn = db_session.connection()
+    _insert_alerts(conn, ["2023-01-10 08:00:00", "2024-05-01 00:00:00"])
+    moved = retention.archive_alerts(conn, today=date(2024, 6, 15), keep_months=3, archive_dir=str(tmp_path))
+    assert moved == 1
+    with gzip.open(tmp_path / "alerts-before-202403.ndjson.gz", "rt") as fh:
+        rows = [json.loads(line) for line in fh]
+    assert [r["recall_id"] for r in rows] == ["r1"]
+    assert conn.execute(text("SELECT COUNT(*) FROM alerts_archive")).scalar() == 0
+
+
+def test_dedup_is_permanent(db_session, monkeypatch):
+    monkeypatch.delenv("SLACK_WEBHOOK_URL", raising=False)
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    db_session.execute(
+        text("INSERT INTO users (id, email, password_hash, created_at, email_opt_in) VALUES (1, 'a@b.c', 'x', '2024', 1)")
+    )
+    db_session.execute(
+        text("INSERT INTO subscriptions (user_id, recall_source, product_query) VALUES (1, 'cpsc', 'Widget')")
+    )
+    db_session.execute(
+        text("INSERT INTO sent_notifications (user_id, recall_id, sent_at) VALUES (1, 'old', '2001-01-01 00:00:00')")
+    )
+    db_session.commit()
+    with SessionLocal() as db:
+        # delivered long ago, still never re-sent
+        assert queue_notifications(db, {"id": "old", "product": "Widget", "source": "cpsc"}) == 0
+        assert queue_notifications(db, {"id": "new", "product": "Widget", "source": "cpsc"}) == 1
+        assert queue_notifications(db, {"id": "new", "product": "Widget", "source": "cpsc"}) == 0
+    assert db_session.execute(text("SELECT COUNT(*) FROM sent_notifications")).scalar() == 2
+
+
+def test_new_partition_takes_its_rows_out_of_the_default():
+    conn = _FakePgConn(partitions=["alerts_p202406", "alerts_default"])
+    names = retention.ensure_alert_partitions(conn, today=date(2024, 6, 15), ahead=1)
+    assert names == ["alerts_p202406", "alerts_p202407"]
+    issued = conn.statements[1:]
+    # the existing partition is left alone
+    assert not any("alerts_p202406" in sql for sql in issued)
+    create = next(i for i, sql in enumerate(issued) if "PARTITION OF alerts" in sql)
+    move = next(i for i, sql in enumerate(issued) if "DELETE FROM alerts_default" in sql)
+    reinsert = next(i for i, sql in enumerate(issued) if sql.startswith("INSERT INTO alerts ("))
+    assert move < create < reinsert
+    assert "CREATE TABLE alerts_p202407 PARTITION OF alerts" in issued[create]
+    assert issued[-1] == "DROP TABLE alerts_moving"
+
+
+def test_archive_alerts_sweeps_expired_rows_in_the_default():
+    conn = _FakePgConn(partitions=["alerts_p202301", "alerts_p202406", "alerts_default"])
+    retention.archive_alerts(conn, today=date(2024, 6, 15), keep_months=3, archive_dir=None)
+    issued = conn.statements
+    assert "ALTER TABLE alerts DETACH PARTITION alerts_p202301" in issued
+    assert not any("alerts_p202406" in sql for sql in issued[1:])
+    assert any(sql.startswith("INSERT INTO alerts_archive") and "FROM alerts_default" in sql for sql in issued)
+    assert issued[-1] == "DELETE FROM alerts_default WHERE created_at < :cutoff"
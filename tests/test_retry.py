@@ -0,0 +1,76 @@
+import pytest
+import requests
+
+from backend.utils import retry
+from backend.utils.retry import RetryPolicy, call_with_retry
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base=1, cap=4)
+    delays = [policy.backoff(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= d <= 4 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_task_countdown_keeps_minimum_spacing():
+    for retries, (lo, hi) in enumerate([(15, 30), (30, 60), (60, 120), (120, 240), (240, 480)]):
+        delays = [retry.task_countdown(retries) for _ in range(50)]
+        assert all(lo <= d <= hi for d in delays)
+    assert all(300 <= retry.task_countdown(10) <= 600 for _ in range(50))
+
+
+def test_call_with_retry_retries_then_succeeds(monkeypatch):
+    sleeps, calls = [], []
+    monkeypatch.setattr(retry.time, "sleep", sleeps.append)
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise requests.ConnectionError("down")
+        return "ok"
+
+    assert call_with_retry(flaky, RetryPolicy(attempts=3, timeout=7)) == "ok"
+    assert calls == [7, 7, 7]
+    assert len(sleeps) == 2
+
+
+def test_deadline_fails_fast_without_sleeping_past_it(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(retry.time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    calls = []
+
+    def slow(timeout):
+        calls.append(timeout)
+        clock[0] += timeout
+        raise requests.Timeout("slow")
+
+    policy = RetryPolicy(attempts=5, base=0.1, cap=0.1, timeout=4, deadline=6)
+    with pytest.raises(requests.Timeout):
+        call_with_retry(slow, policy)
+    # the second attempt only gets what is left of the budget
+    assert calls[0] == 4 and calls[1] < 2
+    assert clock[0] <= 6
+
+
+def test_vin_task_reschedules_instead_of_sleeping(monkeypatch):
+    from backend import tasks
+
+    def unavailable(vin, policy):
+        assert policy is retry.NO_RETRY
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr("backend.utils.nhtsa_vin.refresh_vin_recalls", unavailable)
+    scheduled = []
+
+    class Reschedule(Exception):
+        pass
+
+    def fake_retry(exc=None, countdown=None, **kwargs):
+        scheduled.append(countdown)
+        return Reschedule()
+
+    monkeypatch.setattr(tasks.refresh_vin_campaigns, "retry", fake_retry)
+    with pytest.raises(Reschedule):
+        tasks.refresh_vin_campaigns("1FTFW1E50LFA00001")
+    assert len(scheduled) == 1 and 1 <= scheduled[0] <= retry.TASK_POLICY.cap
@@ -20,10 +20,10 @@ def test_manual_refresh_and_idempotent(tmp_path, monkeypatch):
 
     sample = [{"id": "99", "product": "Toy", "hazard": "Choking", "recall_date": "2025-05-30", "source": "cpsc"}]
     import backend.utils.refresh as refresh_mod
-    monkeypatch.setattr(refresh_mod, "fetch_cpsc", lambda use_cache=False: sample)
-    monkeypatch.setattr(refresh_mod, "fetch_fda", lambda use_cache=False: [])
-    monkeypatch.setattr(refresh_mod, "fetch_nhtsa", lambda use_cache=False: [])
-    monkeypatch.setattr(refresh_mod, "fetch_usda", lambda use_cache=False: [])
+    monkeypatch.setattr(refresh_mod, "stream_cpsc", lambda use_cache=False: sample)
+    monkeypatch.setattr(refresh_mod, "stream_fda", lambda use_cache=False: [])
+    monkeypatch.setattr(refresh_mod, "stream_nhtsa", lambda use_cache=False: [])
+    monkeypatch.setattr(refresh_mod, "stream_usda", lambda use_cache=False: [])
 
     app = create_app()
     client = app.test_client()
@@ -0,0 +1,67 @@
+from prometheus_client import generate_latest
+from sqlalchemy import create_engine, text
+
+import backend.utils.session as session_mod
+
+
+def test_pool_options_per_role(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE_CELERY", "7")
+    celery = session_mod.pool_options("celery")
+    assert celery["pool_size"] == 7
+    assert celery["max_overflow"] == 4
+    api = session_mod.pool_options("api")
+    assert api["pool_size"] == session_mod.settings.db_pool_size
+
+
+def test_pool_metrics_exported(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=session_mod.TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    engine.pool.role = "probe"
+    monkeypatch.setitem(session_mod._engines, "probe", engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        output = generate_latest().decode()
+    engine.dispose()
+    assert 'db_pool_checked_out{role="probe"} 1.0' in output
+    assert 'db_pool_wait_seconds_count{role="probe"} 1.0' in output
+
+
+def test_read_engine_falls_back_when_replica_lags(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_mod, "_engines", {})
+    monkeypatch.setattr(session_mod, "_replica_state", {})
+    monkeypatch.setattr(session_mod.settings, "replica_lag_check_interval", 0)
+    primary = session_mod.get_engine()
+    assert session_mod.get_read_engine() is primary
+
+    monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(session_mod, "REPLICA_LAG_SQL", text("SELECT 0"))
+    replica = session_mod.get_read_engine()
+    assert replica is not primary
+
+    monkeypatch.setattr(session_mod, "REPLICA_LAG_SQL", text("SELECT 3600"))
+    assert session_mod.get_read_engine() is primary
+    replica.dispose()
+
+
+def test_replica_health_is_tracked_per_role(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_mod, "_engines", {})
+    monkeypatch.setattr(session_mod, "_replica_state", {})
+    monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(session_mod, "REPLICA_LAG_SQL", text("SELECT 3600"))
+    with session_mod.engine_role("api"):
+        api_primary = session_mod.get_engine()
+        assert session_mod.get_read_engine() is api_primary
+
+    # the celery role measures its own replica rather than reusing the api verdict
+    monkeypatch.setattr(session_mod, "REPLICA_LAG_SQL", text("SELECT 0"))
+    with session_mod.engine_role("celery"):
+        assert session_mod.get_read_engine() is session_mod._engines["celery:replica"]
+    with session_mod.engine_role("api"):
+        assert session_mod.get_read_engine() is api_primary
+    assert set(session_mod._replica_state) == {"api", "celery"}
+    for engine in session_mod._engines.values():
+        engine.dispose()
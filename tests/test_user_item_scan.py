@@ -0,0 +1,49 @@
+from sqlalchemy import text
+
+from backend import tasks
+from backend.utils.alerts import create_alerts_for_user_items
+from backend.utils.watermarks import get_watermark
+
+
+def _seed(conn):
+    conn.execute(
+        text(
+            "INSERT INTO user_items (user_id, upc) VALUES "
+            "(1, '111'), (2, '111'), (2, '222'), (3, '333')"
+        )
+    )
+    conn.execute(
+        text(
+            "INSERT INTO recalls (id, product, source, fetched_at) VALUES "
+            "('R1', '111', 'cpsc', '2024-01-02T00:00:00'), "
+            "('R2', '222', 'fda', '2024-01-02T00:00:00'), "
+            "('R3', '333', 'cpsc', '2023-12-01T00:00:00')"
+        )
+    )
+    conn.execute(text("INSERT INTO sent_notifications (user_id, recall_id) VALUES (2, 'R2')"))
+
+
+def test_scan_joins_changed_recalls_and_dedups(db_session, monkeypatch):
+    monkeypatch.setattr("backend.utils.alerts.ALERT_BATCH_SIZE", 1)
+    conn = db_session.connection()
+    _seed(conn)
+    ids = create_alerts_for_user_items(conn, "2024-01-01", "2024-02-01")
+    pairs = conn.execute(text("SELECT user_id, recall_id FROM alerts ORDER BY user_id")).fetchall()
+    assert len(ids) == 2
+    assert [tuple(p) for p in pairs] == [(1, "R1"), (2, "R1")]
+    assert conn.execute(text("SELECT COUNT(*) FROM sent_notifications")).scalar() == 3
+    assert create_alerts_for_user_items(conn, "2024-01-01", "2024-02-01") == []
+
+
+def test_task_advances_watermark(db_session, monkeypatch):
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    dispatched = []
+    monkeypatch.setattr(tasks, "dispatch_alerts", lambda ids, priority: dispatched.extend(ids))
+    _seed(db_session.connection())
+    db_session.commit()
+    assert tasks.check_user_items_and_alert() == 3
+    # sent inline when no broker is configured
+    assert len(dispatched) == 3
+    with tasks.SessionLocal() as db:
+        assert get_watermark(db, tasks.USER_ITEM_SCAN)
+    assert tasks.check_user_items_and_alert() == 0
@@ -2,6 +2,7 @@ import requests_mock
 from backend.api.app import create_app
 from backend.db import init_db
 from backend.utils.db import connect
+from sqlalchemy import text
 
 
 def test_vin_route(tmp_path, monkeypatch):
@@ -55,3 +56,214 @@ def test_vin_route(tmp_path, monkeypatch):
     ).fetchone()[0]
     conn.close()
     assert count == 1
+
+
+def test_vin_cache_serves_repeat_lookups(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from backend.utils import vin_cache
+    from backend.utils.nhtsa_vin import get_recalls_for_vin
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin2.db'}")
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    init_db()
+    vin, sibling = "1FTFW1E50LFA00001", "1FTFW1E51LFA99999"
+    decode = {"Results": [{"Make": "Ford", "Model": "F150", "ModelYear": "2020"}]}
+    campaigns = {"results": [{"NHTSACampaignNumber": "20V123", "Summary": "Issue"}]}
+
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json={})
+        m.get(f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVinValuesExtended/{vin}?format=json", json=decode)
+        m.get(f"https://api.nhtsa.gov/recalls/recallcampaigns?vin={vin}", json=campaigns)
+        m.get(f"https://api.nhtsa.gov/recalls/recallcampaigns?vin={sibling}", json=campaigns)
+        first = get_recalls_for_vin(vin)
+        assert get_recalls_for_vin(vin) == first
+        assert m.call_count == 2
+
+        # same WMI/VDS/year, different serial: decode comes from the cache
+        assert get_recalls_for_vin(sibling)[0]["product"] == "Ford F150 2020"
+        assert m.call_count == 3
+
+        # expired campaigns are refetched; the decode is not
+        conn = connect()
+        stale = (datetime.utcnow() - vin_cache.VIN_CAMPAIGN_TTL - timedelta(minutes=1)).isoformat()
+        conn.execute(text("UPDATE vin_campaigns SET fetched_at=:f"), {"f": stale})
+        conn.commit()
+        conn.close()
+        get_recalls_for_vin(vin)
+        assert m.call_count == 4
+        assert "recallcampaigns" in m.request_history[-1].url
+
+
+def test_stale_vin_entry_is_refreshed_once(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from backend import tasks
+    from backend.utils import vin_cache
+    from backend.utils.nhtsa_vin import get_recalls_for_vin
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin_claim.db'}")
+    monkeypatch.setenv("CELERY_BROKER_URL", "memory://")
+    init_db()
+    vin = "1FTFW1E50LFA00001"
+    stale = (datetime.utcnow() - vin_cache.VIN_CAMPAIGN_TTL - timedelta(minutes=1)).isoformat()
+    conn = connect()
+    conn.execute(
+        text("INSERT INTO vin_campaigns (vin, recalls, fetched_at) VALUES (:v, '[]', :f)"),
+        {"v": vin, "f": stale},
+    )
+    conn.commit()
+    conn.close()
+    queued = []
+    monkeypatch.setattr(tasks.refresh_vin_campaigns, "delay", queued.append)
+
+    # a reader that saw the stale entry before it was claimed loses the race
+    conn = connect()
+    seen = vin_cache.get_campaigns(conn, vin)
+    conn.close()
+    assert get_recalls_for_vin(vin) == []
+    conn = connect()
+    with conn.begin():
+        assert not vin_cache.claim_campaign_refresh(conn, vin, seen.fetched_at)
+    conn.close()
+    # later readers see the claimed entry as fresh
+    assert get_recalls_for_vin(vin) == []
+    assert queued == [vin]
+
+
+def test_bulk_vin_route_batches_and_upserts(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin3.db'}")
+    init_db()
+    vins = ["1FTFW1E50LFA00001", "1FTFW1E50LFA00002", "5YJ3E1EA1KF000003"]
+
+    def batch_decode(request, context):
+        assert request.text.count("%3B") == 1  # two prefixes, one request
+        return {
+            "Results": [
+                {"VIN": vins[0], "Make": "Ford", "Model": "F150", "ModelYear": "2020"},
+                {"VIN": vins[2], "Make": "Tesla", "Model": "Model 3", "ModelYear": "2019"},
+            ]
+        }
+
+    with requests_mock.Mocker() as m:
+        batch = m.post("https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVINValuesBatch/", json=batch_decode)
+        for vin in vins[:2]:
+            m.get(
+                f"https://api.nhtsa.gov/recalls/recallcampaigns?vin={vin}",
+                json={"results": [{"NHTSACampaignNumber": "20V123", "Summary": "Fire risk"}]},
+            )
+        m.get(f"https://api.nhtsa.gov/recalls/recallcampaigns?vin={vins[2]}", status_code=500)
+        monkeypatch.setattr("backend.utils.nhtsa_vin.time.sleep", lambda s: None)
+        client = create_app().test_client()
+        token = client.post(
+            "/api/auth/login", json={"email": "user@example.com", "password": "password"}
+        ).get_json()["token"]
+        resp = client.post(
+            "/api/recalls/vin/bulk",
+            json={"vins": vins + [vins[0].lower()]},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert sorted(data["recalls"]) == vins[:2]
+        assert data["recalls"][vins[1]][0]["product"] == "Ford F150 2020"
+        assert data["failed"] == [vins[2]]
+        assert batch.call_count == 1
+
+        bad = client.post(
+            "/api/recalls/vin/bulk", json={"vins": ["nope"]}, headers={"Authorization": f"Bearer {token}"}
+        )
+        assert bad.status_code == 400
+
+    conn = connect()
+    rows = conn.execute(text("SELECT id, priority FROM recalls WHERE source='NHTSA_VIN'")).fetchall()
+    conn.close()
+    assert [tuple(r) for r in rows] == [("20V123", "urgent")]
+
+
+def test_bulk_vin_survives_decode_failures_and_deadline(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    from backend.utils import nhtsa_vin
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin4.db'}")
+    init_db()
+    vins = ["1FTFW1E50LFA00001", "5YJ3E1EA1KF000003"]
+    release = threading.Event()
+
+    def campaigns(vin, policy=None):
+        if vin == vins[1]:
+            release.wait(5)
+        return [{"NHTSACampaignNumber": "20V123", "Summary": "Fire risk"}]
+
+    def decode_batch(url, data=None, policy=None):
+        raise nhtsa_vin.requests.ConnectionError("vPIC down")
+
+    monkeypatch.setattr(nhtsa_vin, "_fetch_campaigns", campaigns)
+    monkeypatch.setattr(nhtsa_vin, "_request", decode_batch)
+    start = time.monotonic()
+    try:
+        results = nhtsa_vin.get_recalls_for_vins(vins, deadline=0.3)
+    finally:
+        release.set()
+    assert time.monotonic() - start < 2
+    # answered without a decode, and the slow VIN is reported as failed
+    assert results[vins[0]][0]["product"] == ""
+    assert results[vins[1]] is None
+
+    conn = connect()
+    cached = conn.execute(text("SELECT COUNT(*) FROM vin_campaigns")).scalar()
+    stored = conn.execute(text("SELECT COUNT(*) FROM recalls WHERE source='NHTSA_VIN'")).scalar()
+    conn.close()
+    assert cached == 0 and stored == 0
+
+
+def test_bulk_vin_cancels_fetches_past_the_deadline(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    from backend.utils import nhtsa_vin
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin5.db'}")
+    init_db()
+    # two workers, 0.2s per call: a 0.3s deadline covers about two rounds
+    monkeypatch.setattr(nhtsa_vin, "VIN_FETCH_WORKERS", 2)
+    vins = [f"1FTFW1E50LFA{i:05d}" for i in range(20)]
+    started = []
+    lock = threading.Lock()
+
+    def campaigns(vin, policy=None):
+        with lock:
+            started.append(vin)
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(nhtsa_vin, "_fetch_campaigns", campaigns)
+    monkeypatch.setattr(nhtsa_vin, "_fetch_decodes", lambda vins, end: ({}, []))
+    start = time.monotonic()
+    results = nhtsa_vin.get_recalls_for_vins(vins, deadline=0.3)
+    assert time.monotonic() - start < 1
+    assert sum(r is not None for r in results.values()) == 2
+    # abandoned fetches finish, but nothing queued behind them starts
+    time.sleep(0.5)
+    assert len(started) == 4
+
+
+def test_bulk_vin_cap_follows_the_deadline(tmp_path, monkeypatch):
+    from backend.api import app as app_mod
+    from backend.utils import nhtsa_vin
+
+    assert nhtsa_vin.VIN_BULK_MAX == int(
+        nhtsa_vin.VIN_FETCH_WORKERS * nhtsa_vin.VIN_BULK_DEADLINE / nhtsa_vin.VIN_FETCH_SECONDS
+    )
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'vin6.db'}")
+    init_db()
+    client = app_mod.create_app().test_client()
+    token = client.post(
+        "/api/auth/login", json={"email": "user@example.com", "password": "password"}
+    ).get_json()["token"]
+    vins = [f"1FTFW1E50L{i:07d}" for i in range(app_mod.VIN_BULK_MAX + 1)]
+    resp = client.post("/api/recalls/vin/bulk", json={"vins": vins}, headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 400
+    assert str(app_mod.VIN_BULK_MAX) in resp.get_json()["error"]